@@ -0,0 +1,132 @@
+# PIL-EditorGUI - Encaixe e guias de alinhamento
+# Ao arrastar, as bordas e os centros da seleção encaixam nas bordas e nos
+# centros dos outros itens e nas guias do canvas (bordas e centro da cena).
+# As posições candidatas ficam em duas listas ordenadas (x e y), montadas uma
+# vez no início do arraste; cada evento de movimento acha o alvo mais próximo
+# de cada borda com bisect, em O(log n), sem percorrer os itens.
+#
+# O índice com todos os itens fica guardado junto da cena (ver
+# Editor.build_snap_index): cada arraste tira as bordas da seleção de uma
+# cópia e, ao soltar, devolve as novas, sem reordenar a cena inteira.
+
+from bisect import bisect_left, insort
+from collections import Counter
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNAP_DISTANCE = 6  # Pixels da tela: a distância de encaixe não muda com o zoom
+SMALL_EDIT = 64  # Até quantas posições por eixo são tiradas ou postas uma a uma (cada uma move a lista)
+
+
+def _edges(box):
+    """Posições (esquerda, centro, direita) e (topo, centro, base) de uma caixa."""
+    return ((box[0], (box[0] + box[2]) / 2, box[2]),
+            (box[1], (box[1] + box[3]) / 2, box[3]))
+
+
+def _nearest(values, position):
+    """Valor de `values` (ordenado) mais próximo de `position`, ou None."""
+    index = bisect_left(values, position)
+    candidates = values[max(0, index - 1):index + 1]
+    return min(candidates, key=lambda value: abs(value - position)) if candidates else None
+
+
+def _remove(values, removed):
+    """Cópia da lista ordenada `values` sem uma ocorrência de cada valor de `removed`."""
+    if len(removed) <= SMALL_EDIT:
+        values = list(values)
+        for value in removed:
+            index = bisect_left(values, value)
+            if index < len(values) and values[index] == value:
+                del values[index]
+        return values
+    pending = Counter(removed)
+    kept = []
+    for value in values:
+        if pending[value]:
+            pending[value] -= 1
+        else:
+            kept.append(value)
+    return kept
+
+
+def _add(values, added):
+    """Insere `added` na lista ordenada `values`, no lugar."""
+    if len(added) <= SMALL_EDIT:
+        for value in added:
+            insort(values, value)
+    else:
+        values.extend(added)
+        values.sort()
+
+
+class SnapIndex:
+    """Bordas e centros candidatos a encaixe, em listas ordenadas por eixo."""
+    def __init__(self, items=(), size=None):
+        xs, ys = [], []
+        for item in items:
+            item_xs, item_ys = _edges(item.get_bounding_box())
+            xs.extend(item_xs)
+            ys.extend(item_ys)
+        if size is not None:  # Guias do canvas
+            canvas_xs, canvas_ys = _edges((0, 0, size[0], size[1]))
+            xs.extend(canvas_xs)
+            ys.extend(canvas_ys)
+        self.xs = sorted(xs)
+        self.ys = sorted(ys)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def without(self, boxes):
+        """Cópia do índice sem as bordas e centros de `boxes`."""
+        removed = [_edges(box) for box in boxes]
+        copy = SnapIndex()
+        copy.xs = _remove(self.xs, [value for box_xs, _ in removed for value in box_xs])
+        copy.ys = _remove(self.ys, [value for _, box_ys in removed for value in box_ys])
+        return copy
+
+    def add_boxes(self, boxes):
+        """Acrescenta as bordas e centros de `boxes`."""
+        added = [_edges(box) for box in boxes]
+        _add(self.xs, [value for box_xs, _ in added for value in box_xs])
+        _add(self.ys, [value for _, box_ys in added for value in box_ys])
+
+    def add_guide(self, x=None, y=None):
+        """Acrescenta uma guia vertical (x) e/ou horizontal (y)."""
+        if x is not None:
+            insort(self.xs, x)
+        if y is not None:
+            insort(self.ys, y)
+
+    @staticmethod
+    def _axis(values, positions, distance):
+        """(ajuste, alvo) do encaixe mais próximo de alguma das `positions` num eixo."""
+        best = None
+        for position in positions:
+            target = _nearest(values, position)
+            if target is not None and abs(target - position) <= distance \
+                    and (best is None or abs(target - position) < abs(best[0])):
+                best = (target - position, target)
+        return best or (0, None)
+
+    def snap_box(self, box, distance):
+        """Ajuste (dx, dy) que encaixa `box` e as guias atingidas (x, y; None se não houver)."""
+        box_xs, box_ys = _edges(box)
+        dx, guide_x = self._axis(self.xs, box_xs, distance)
+        dy, guide_y = self._axis(self.ys, box_ys, distance)
+        return dx, dy, (guide_x, guide_y)
+
+    def snap_point(self, x, y, distance):
+        """Ponto (x, y) encaixado, usado para o canto que está sendo redimensionado."""
+        dx, guide_x = self._axis(self.xs, (x,), distance)
+        dy, guide_y = self._axis(self.ys, (y,), distance)
+        return x + dx, y + dy, (guide_x, guide_y)
+
+
+def union_box(items):
+    """Caixa que contém todos os `items`."""
+    boxes = [item.get_bounding_box() for item in items]
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
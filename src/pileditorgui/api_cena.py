@@ -0,0 +1,215 @@
+# PIL-EditorGUI - API de script
+# Interface Python para montar e alterar cenas sem a interface gráfica (por
+# exemplo, gerar modelos a partir de uma especificação). Alterações feitas
+# dentro de `with api.batch():` formam uma transação: o histórico, a
+# invalidação dos tiles e a renderização acontecem uma única vez, no commit;
+# uma exceção desfaz a transação inteira.
+#
+#     api = SceneAPI()
+#     with api.batch():
+#         api.add_image("img/fundo.png")
+#         for i, nome in enumerate(nomes):
+#             api.add_text(40, 40 + i * 30, nome, fill="#ffffff")
+#     api.save("cartoes.png")
+#
+# Os itens retornados podem ficar desatualizados depois de uma edição (cópia
+# na escrita); os métodos aceitam qualquer versão do item e o localizam pelo
+# id permanente. Um item removido nunca tem o id reaproveitado: usar uma
+# referência a ele gera KeyError em vez de alterar outro item.
+
+import contextlib
+import logging
+import os
+
+try:
+    from .cache_pixels import PixelCache
+    from .cena import SceneDocument
+    from .colecao_formas import ShapeCollection
+    from .composicao_processos import export_png_parallel
+    from .editor import TILED_EXPORT_MIN_PIXELS, ImageLayer, Shape, TextShape
+    from .historico import History
+    from .renderizacao import canvas_size, render_region
+except ImportError:  # Executado como script
+    from cache_pixels import PixelCache
+    from cena import SceneDocument
+    from colecao_formas import ShapeCollection
+    from composicao_processos import export_png_parallel
+    from editor import TILED_EXPORT_MIN_PIXELS, ImageLayer, Shape, TextShape
+    from historico import History
+    from renderizacao import canvas_size, render_region
+
+logger = logging.getLogger(__name__)
+
+# Atributos que mudam o tamanho calculado de um texto
+_TEXT_METRICS = ("text", "font_path", "font_size")
+
+
+def item_kind(item):
+    """Tipo de um item da cena: 'group', 'image', 'collection', 'text' ou 'shape'."""
+    if hasattr(item, "shapes"):
+        return "group"
+    if hasattr(item, "image"):
+        return "image"
+    if hasattr(item, "fills"):
+        return "collection"
+    if hasattr(item, "text"):
+        return "text"
+    return "shape"
+
+
+class SceneAPI:
+    """Fachada pública sobre um SceneDocument.
+
+    Fora de um `batch()`, cada chamada que altera a cena é sua própria
+    transação. `on_commit`, se dado, é chamado a cada commit (o editor salva
+    o estado e redesenha); sem ele, a API guarda o próprio histórico.
+    """
+    def __init__(self, document=None, on_commit=None, pixel_cache=None):
+        self.document = document or SceneDocument()
+        self.on_commit = on_commit
+        self.pixel_cache = pixel_cache or PixelCache()
+        self.history = History() if on_commit is None else None
+        self._depth = 0
+        self._begin = None
+        if self.history is not None:
+            self.history.push(self.document.snapshot())
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Agrupa as alterações num único commit; transações aninhadas se juntam à externa."""
+        if self._depth == 0:
+            self._begin = self.document.current
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.document.restore(self._begin)
+                logger.info("Transação desfeita")
+            raise
+        self._depth -= 1
+        if self._depth == 0 and self.document.current is not self._begin:
+            self._commit()
+
+    def _commit(self):
+        if self.on_commit is not None:
+            self.on_commit()
+        else:
+            self.history.push(self.document.snapshot())
+        logger.info(f"Transação aplicada ({len(self.document.current)} itens na cena)")
+
+    def undo(self):
+        """Desfaz o último commit (só sem `on_commit`; no editor use o Ctrl+Z)."""
+        if self.history is None:
+            raise RuntimeError("O histórico pertence ao editor; use Editor.undo")
+        if len(self.history) > 1:
+            self.history.pop()
+            self.document.restore(self.history.peek())
+
+    # Consulta
+
+    @property
+    def items(self):
+        """Itens da cena em ordem de desenho (do fundo para o topo)."""
+        return self.document.shapes
+
+    def find(self, kind=None, **attrs):
+        """Itens do tipo `kind` (ver item_kind) cujos atributos são iguais a `attrs`."""
+        return [item for item in self.document.shapes
+                if (kind is None or item_kind(item) == kind)
+                and all(getattr(item, name, None) == value for name, value in attrs.items())]
+
+    def find_one(self, kind=None, **attrs):
+        """Primeiro item (de baixo para cima) que atende a find(), ou None."""
+        found = self.find(kind, **attrs)
+        return found[0] if found else None
+
+    def _live(self, item):
+        """Versão atual de `item` na cena, pelo id permanente."""
+        item_id = getattr(item, "_id", None)
+        live = self.document.current.find(item_id) if item_id is not None else None
+        if live is None:
+            raise KeyError(f"{item.__class__.__name__} não está na cena")
+        return live
+
+    # Alteração
+
+    def add(self, item):
+        """Adiciona um item já construído no topo da cena."""
+        with self.batch():
+            return self.document.add(item)
+
+    def add_image(self, source, x=0, y=0, opacity=100, file_path=None):
+        """Adiciona uma camada a partir de um caminho ou de uma imagem PIL."""
+        if isinstance(source, (str, os.PathLike)):
+            file_path = file_path or os.fspath(source)
+            source = self.pixel_cache.open_image(file_path, mode=None)
+        return self.add(ImageLayer(source, file_path or "imagem.png", x=x, y=y, opacity=opacity))
+
+    def add_shape(self, x, y, width=100, height=100, fill="blue", opacity=100, outline_width=1, corner_radius=0):
+        return self.add(Shape(x, y, width, height, fill=fill, opacity=opacity,
+                              outline_width=outline_width, corner_radius=corner_radius))
+
+    def add_text(self, x, y, text, font_path=None, font_size=20, fill="black", opacity=100):
+        return self.add(TextShape(x, y, text, font_path=font_path, font_size=font_size, fill=fill, opacity=opacity))
+
+    def add_collection(self, rects, x=0, y=0, opacity=100, name="Coleção"):
+        """Adiciona uma ShapeCollection com `rects` (x, y, largura, altura, cor, opacidade)."""
+        collection = ShapeCollection(x, y, opacity=opacity, name=name)
+        collection.extend(rects)
+        return self.add(collection)
+
+    def update(self, item, **changes):
+        """Altera atributos de `item` e retorna a versão atual dele.
+
+        Mudar o texto, a fonte ou o tamanho da fonte recalcula a caixa do texto.
+        """
+        with self.batch():
+            live = self.document.edit(self._live(item))
+            for name, value in changes.items():
+                if not hasattr(live, name):
+                    raise AttributeError(f"{live.__class__.__name__} não tem o atributo '{name}'")
+                setattr(live, name, value)
+            if item_kind(live) == "text" and any(name in _TEXT_METRICS for name in changes):
+                live.width, live.height = live.get_text_size()
+            return live
+
+    def remove(self, item):
+        with self.batch():
+            self.document.remove(self._live(item))
+
+    def move_to(self, item, index):
+        """Leva `item` para a posição `index` da ordem de desenho (0 = fundo)."""
+        with self.batch():
+            return self.document.move(self._live(item), index)
+
+    # Saída
+
+    def size(self):
+        return canvas_size(self.document.current.images)
+
+    def render(self, scale=1.0):
+        """Imagem RGBA da cena atual."""
+        scene = self.document.snapshot()
+        width, height = self.size()
+        return render_region(scene.images, scene.shapes, (0, 0, int(width * scale), int(height * scale)), scale)
+
+    def save(self, file_path, compress_level=6, png_filter="up", verify=False):
+        """Salva a cena como imagem; PNGs grandes são compostos em vários processos.
+
+        `png_filter` e `verify` valem para esses PNGs grandes, codificados em
+        faixas (ver png_paralelo.write_png_stripes e verify_png).
+        """
+        scene = self.document.snapshot()
+        size = self.size()
+        if file_path.lower().endswith(".png") and size[0] * size[1] >= TILED_EXPORT_MIN_PIXELS:
+            export_png_parallel(scene.images, scene.shapes, size, file_path, level=compress_level,
+                                png_filter=png_filter, verify=verify)
+            return
+        image = self.render()
+        if file_path.lower().endswith((".jpg", ".jpeg")):
+            image.convert("RGB").save(file_path)
+        else:
+            image.save(file_path, compress_level=compress_level)
+        logger.info(f"Cena salva: {file_path}")
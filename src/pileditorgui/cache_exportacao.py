@@ -0,0 +1,181 @@
+# PIL-EditorGUI - Cache de exportação por hash de conteúdo
+# O hash da cena combina hashes parciais de cada camada (pixels, geometria,
+# cor, opacidade, fonte, texto) com as opções de exportação. Uma cena sem
+# alterações vira uma cópia do arquivo já codificado; rasters de camadas são
+# reaproveitados entre projetos que usam os mesmos assets.
+
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import shutil
+
+try:
+    from .composicao import apply_opacity
+except ImportError:  # Executado como script
+    from composicao import apply_opacity
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = "2"  # Mude ao alterar a renderização para invalidar o cache
+
+
+def default_cache_dir():
+    """Diretório de cache do usuário (respeita XDG_CACHE_HOME)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pileditorgui")
+
+
+def hash_image(img):
+    """Hash estável dos pixels decodificados de uma imagem."""
+    digest = hashlib.sha256(f"{img.mode}:{img.width}x{img.height}:".encode())
+    if img.mode == "P":
+        digest.update(bytes(img.getpalette("RGBA")))  # Os índices sozinhos não definem as cores
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+_font_hashes = {}
+
+
+def hash_font(font_path):
+    """Hash do arquivo de fonte, memorizado por (caminho, mtime, tamanho)."""
+    if not font_path:
+        return "default"
+    try:
+        stat = os.stat(font_path)
+    except OSError:
+        return f"missing:{font_path}"
+    key = (font_path, stat.st_mtime_ns, stat.st_size)
+    if key not in _font_hashes:
+        with open(font_path, "rb") as f:
+            _font_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+    return _font_hashes[key]
+
+
+def _digest(*parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def raster_key(img_layer):
+    """Hash do raster preparado de uma camada (pixels + opacidade), sem posição."""
+    return _digest("raster", img_layer.content_hash(), img_layer.width, img_layer.height, img_layer.opacity)
+
+
+def item_key(item):
+    """Hash parcial de um item da cena (camada, forma ou texto)."""
+    # Itens sem transformação mantêm as chaves de antes dela existir; o rascunho
+    # da rotação interativa tem outro filtro e outra chave
+    transform = () if getattr(item, "transform", None) is None else (item.transform, getattr(item, "_draft", False))
+    if getattr(item, "clip", False):  # Máscara de recorte: a base entra na chave da cena pela própria chave
+        transform += ("clip",)
+    if hasattr(item, "image") or hasattr(item, "shapes"):
+        extra = () if getattr(item, "visible", True) else ("hidden",)  # Grupos ocultos
+        if getattr(item, "blend_mode", "normal") != "normal":
+            extra += (item.blend_mode,)
+        return _digest("image", raster_key(item), int(item.x), int(item.y), *extra, *transform)
+    if hasattr(item, "fills"):  # Coleção de formas
+        return _digest("collection", item.content_hash(), item.x, item.y, item.opacity)
+    if hasattr(item, "text"):
+        return _digest("text", item.text, hash_font(item.font_path), item.font_size, item.fill,
+                       item.opacity, item.x, item.y, *transform)
+    return _digest("shape", item.x, item.y, item.width, item.height, item.fill, item.opacity,
+                   item.outline_width, item.corner_radius, *transform)
+
+
+def scene_hash(images, shapes, size, options=""):
+    """Hash da cena inteira e os hashes parciais de cada item.
+
+    Retorna (hash_total, {id(item): hash_parcial}). `options` descreve as
+    opções de exportação (formato, escala, compressão...).
+    """
+    partial = {}
+    for item in images:
+        partial[id(item)] = item_key(item)
+    drawn_shapes = [shape for shape in shapes if id(shape) not in partial]
+    for shape in drawn_shapes:
+        partial[id(shape)] = item_key(shape)
+    # As camadas de imagem (e grupos) sempre vêm antes das formas na composição
+    ordered = [partial[id(item)] for item in images]
+    ordered += [partial[id(shape)] for shape in drawn_shapes]
+    total = _digest(CACHE_FORMAT_VERSION, size, options, *ordered)
+    return total, partial
+
+
+class ExportCache:
+    """Cache em disco de saídas codificadas e, em memória, de rasters de camadas."""
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024, max_layer_rasters=32):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.outputs_dir = os.path.join(self.cache_dir, "exports")
+        self.max_bytes = max_bytes
+        self.max_layer_rasters = max_layer_rasters
+        self._layer_rasters = OrderedDict()  # LRU em memória
+
+    def _output_path(self, key, ext):
+        return os.path.join(self.outputs_dir, f"{key}{ext}")
+
+    def fetch(self, key, file_path):
+        """Copia a saída em cache para `file_path`. Retorna False se não houver."""
+        cached = self._output_path(key, os.path.splitext(file_path)[1].lower())
+        if not os.path.exists(cached):
+            return False
+        shutil.copyfile(cached, file_path)
+        os.utime(cached)  # Marca como usado recentemente
+        logger.info(f"Exportação reaproveitada do cache: {file_path}")
+        return True
+
+    def store(self, key, file_path):
+        """Guarda no cache uma saída recém-codificada."""
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        cached = self._output_path(key, os.path.splitext(file_path)[1].lower())
+        temp_path = f"{cached}.tmp"
+        shutil.copyfile(file_path, temp_path)
+        os.replace(temp_path, cached)  # Escrita atômica, seguro entre processos
+        self.prune()
+
+    def prune(self):
+        """Remove as saídas usadas há mais tempo até caber em `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.outputs_dir):
+            path = os.path.join(self.outputs_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def memory_usage(self):
+        """Bytes ocupados pelos rasters de camadas em memória."""
+        return sum(raster.width * raster.height * 4 for raster in self._layer_rasters.values())
+
+    def release(self, nbytes):
+        """Descarta rasters menos usados até liberar `nbytes`. Retorna o liberado."""
+        freed = 0
+        while self._layer_rasters and freed < nbytes:
+            _, raster = self._layer_rasters.popitem(last=False)
+            freed += raster.width * raster.height * 4
+        return freed
+
+    def layer_raster(self, img_layer):
+        """Raster da camada com opacidade aplicada, compartilhado entre projetos.
+
+        Fica só em memória: decodificar um PNG do disco custa mais do que
+        reaplicar a opacidade, então o ganho vem de lotes que exportam vários
+        projetos no mesmo processo com os mesmos assets.
+        """
+        key = raster_key(img_layer)
+        if key in self._layer_rasters:
+            self._layer_rasters.move_to_end(key)
+            return self._layer_rasters[key]
+
+        raster = img_layer.image
+        if img_layer.opacity < 100:
+            raster = apply_opacity(raster if raster.mode == "RGBA" else raster.convert("RGBA"), img_layer.opacity)
+
+        self._layer_rasters[key] = raster
+        while len(self._layer_rasters) > self.max_layer_rasters:
+            self._layer_rasters.popitem(last=False)
+        return raster
@@ -0,0 +1,172 @@
+# PIL-EditorGUI - Cache persistente de pixels decodificados
+# Cada imagem decodificada é guardada como arquivo bruto (cabeçalho + pixels)
+# e aberta com mmap. Image.frombuffer cria a camada sem copiar os pixels, e as
+# páginas são compartilhadas pelo sistema entre o editor, o visualizador e
+# processos em lote que abrem o mesmo asset.
+
+from PIL import Image
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+
+try:
+    from .registro_assets import compact_image
+except ImportError:  # Executado como script
+    from registro_assets import compact_image
+
+logger = logging.getLogger(__name__)
+
+RAW_MAGIC = b"PILR"
+RAW_HEADER = struct.Struct("<4s8sII")  # magic, modo, largura, altura
+RAW_HEADER_SIZE = 32  # Cabeçalho com padding para alinhar os pixels
+MMAP_MODES = ("L", "P", "RGBA", "RGBX")  # Modos que o Pillow mapeia sem cópia
+PALETTE_SIZE = 1024  # Paleta RGBA gravada após o cabeçalho nas imagens P
+
+
+def default_cache_dir():
+    """Diretório do cache de pixels (respeita XDG_CACHE_HOME)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pileditorgui", "pixels")
+
+
+class PixelCache:
+    """Cache em disco de pixels decodificados, com LRU limitado por tamanho."""
+    def __init__(self, cache_dir=None, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self._index = None  # (caminho, tamanho, mtime) -> hash do conteúdo
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+            if self._prune_index():
+                try:
+                    self._save_index()
+                except OSError as e:
+                    logger.warning(f"Não foi possível gravar o índice do cache de pixels: {e}")
+        return self._index
+
+    def _prune_index(self):
+        """Tira do índice as entradas sem arquivo bruto ou cujo arquivo de origem mudou. Retorna quantas."""
+        try:
+            cached = {name.split(".", 1)[0] for name in os.listdir(self.cache_dir) if name.endswith(".raw")}
+        except OSError:
+            cached = set()
+        stale = []
+        for file_key, content_hash in self._index.items():
+            path, size, mtime_ns = file_key.rsplit("|", 2)
+            try:
+                stat = os.stat(path)
+                current = (str(stat.st_size), str(stat.st_mtime_ns)) == (size, mtime_ns)
+            except OSError:
+                current = False
+            if not current or content_hash not in cached:
+                stale.append(file_key)
+        for file_key in stale:
+            del self._index[file_key]
+        if stale:
+            logger.debug(f"{len(stale)} entradas antigas removidas do índice do cache de pixels")
+        return len(stale)
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+    def content_hash(self, path):
+        """Hash do arquivo, reaproveitado enquanto caminho, tamanho e mtime não mudarem."""
+        stat = os.stat(path)
+        file_key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        index = self._load_index()
+        if file_key not in index:
+            with open(path, "rb") as f:
+                index[file_key] = hashlib.sha256(f.read()).hexdigest()
+            self._save_index()
+        return index[file_key]
+
+    def _raw_path(self, content_hash, mode):
+        return os.path.join(self.cache_dir, f"{content_hash}.{mode}.raw")
+
+    def _write_raw(self, raw_path, img):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{raw_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            header = RAW_HEADER.pack(RAW_MAGIC, img.mode.encode().ljust(8, b"\0"), img.width, img.height)
+            f.write(header.ljust(RAW_HEADER_SIZE, b"\0"))
+            if img.mode == "P":
+                f.write(bytes(img.getpalette("RGBA")).ljust(PALETTE_SIZE, b"\0"))
+            f.write(img.tobytes())
+        os.replace(temp_path, raw_path)  # Outros processos nunca veem arquivo parcial
+        self.prune()
+
+    def _map_raw(self, raw_path):
+        """Abre o arquivo bruto com mmap e cria a imagem sobre ele, sem cópia."""
+        with open(raw_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, mode, width, height = RAW_HEADER.unpack_from(mapped, 0)
+        if magic != RAW_MAGIC:
+            raise ValueError(f"Arquivo de cache inválido: {raw_path}")
+        mode = mode.rstrip(b"\0").decode()
+        offset = RAW_HEADER_SIZE + (PALETTE_SIZE if mode == "P" else 0)
+        pixels = memoryview(mapped)[offset:]
+        if mode in MMAP_MODES:
+            img = Image.frombuffer(mode, (width, height), pixels, "raw", mode, 0, 1)
+        else:
+            img = Image.frombytes(mode, (width, height), pixels)
+        if mode == "P":
+            img.putpalette(mapped[RAW_HEADER_SIZE:offset], rawmode="RGBA")
+        return img
+
+    def open_image(self, path, mode="RGBA"):
+        """Retorna a imagem de `path` no modo pedido, decodificando só na primeira vez.
+
+        Com `mode=None` a imagem fica no modo compacto sem perda (L, P ou
+        RGBA; ver compact_image). A imagem retornada é somente leitura
+        (mapeada do cache); operações do Pillow que alteram pixels fazem uma
+        cópia antes.
+        """
+        raw_path = self._raw_path(self.content_hash(path), mode or "compact")
+        if os.path.exists(raw_path):
+            try:
+                img = self._map_raw(raw_path)
+                os.utime(raw_path)  # Marca como usado recentemente (LRU)
+                logger.debug(f"Pixels de {path} mapeados do cache")
+                return img
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cache de pixels corrompido para {path}: {e}, decodificando novamente")
+
+        with Image.open(path) as source:
+            img = source.convert(mode) if mode else compact_image(source)
+        try:
+            self._write_raw(raw_path, img)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de pixels: {e}")
+        return img
+
+    def prune(self):
+        """Remove os arquivos usados há mais tempo até caber em `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".raw"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # No Windows, arquivos mapeados por outro processo não podem ser removidos
+            total -= size
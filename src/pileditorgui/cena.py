@@ -0,0 +1,189 @@
+# PIL-EditorGUI - Cena persistente com cópia na escrita
+# Um Scene é um instantâneo imutável: uma única ordem de desenho persistente
+# (ordem_z.ZOrder) com todos os itens. Tirar um instantâneo é O(1): o
+# histórico, a exportação e a renderização guardam o mesmo objeto. Editar um
+# item já congelado copia só esse item (cópia rasa, que compartilha os pixels
+# do asset) e o caminho da árvore até ele, em O(log n).
+#
+# Cada item recebe ao entrar na cena um `_id` permanente, nunca reutilizado,
+# que é mantido pelas cópias de edição: ele identifica o item em qualquer
+# instantâneo, mesmo depois de mover ou de outros itens serem removidos.
+
+import copy
+import itertools
+import logging
+
+try:
+    from .ordem_z import ZOrder
+except ImportError:  # Executado como script
+    from ordem_z import ZOrder
+
+logger = logging.getLogger(__name__)
+
+_item_ids = itertools.count(1)
+
+
+class Scene:
+    """Instantâneo imutável da cena.
+
+    `shapes` é a ordem de desenho de todos os itens, incluindo as camadas, e
+    `images` são as camadas de imagem e grupos (definem o tamanho do canvas),
+    na mesma ordem. As duas tuplas são derivadas da árvore e montadas uma vez
+    por instantâneo, na primeira leitura.
+    """
+    __slots__ = ("order", "_shapes", "_images")
+
+    def __init__(self, order=None):
+        object.__setattr__(self, "order", order or ZOrder())
+        object.__setattr__(self, "_shapes", None)
+        object.__setattr__(self, "_images", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Scene é imutável; use SceneDocument para editar")
+
+    def __getstate__(self):
+        return self.shapes
+
+    def __setstate__(self, state):
+        self.__init__(ZOrder.from_items(state))
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, item):
+        item_id = getattr(item, "_id", None)
+        return item_id is not None and self.order.find(item_id) is item
+
+    @property
+    def shapes(self):
+        if self._shapes is None:
+            object.__setattr__(self, "_shapes", tuple(self.order))
+        return self._shapes
+
+    @property
+    def images(self):
+        if self._images is None:
+            object.__setattr__(self, "_images", tuple(item for item in self.shapes
+                                                         if hasattr(item, "image") or hasattr(item, "shapes")))
+        return self._images
+
+    def find(self, item_id):
+        """Versão nesta cena do item com o id permanente `item_id`, ou None."""
+        return self.order.find(item_id)
+
+    def index(self, item):
+        """Posição de `item` na ordem de desenho (0 = fundo), em O(log n)."""
+        if item not in self:
+            raise ValueError(f"{item!r} não está na cena")
+        return self.order.rank(item._id)
+
+    def added(self, item, index=None):
+        """Nova cena com `item` na posição `index` (None = topo)."""
+        return Scene(self.order.insert(len(self) if index is None else index, [item]))
+
+    def removed(self, item):
+        return Scene(self.order.remove(item._id))
+
+    def replaced(self, new):
+        """Nova cena com o item de mesmo `_id` trocado por `new`."""
+        return Scene(self.order.replace(new))
+
+    def grouped(self, members, group):
+        """Nova cena com `members` (em ordem de desenho) trocados por `group`, na posição do mais alto."""
+        index = self.index(members[-1]) - (len(members) - 1)
+        order = self.order
+        for member in members:
+            order = order.remove(member._id)
+        return Scene(order.insert(index, [group]))
+
+    def ungrouped(self, group, items):
+        """Nova cena com `group` trocado por `items`, na posição dele."""
+        index = self.index(group)
+        return Scene(self.order.remove(group._id).insert(index, items))
+
+
+class SceneDocument:
+    """Cena atual editável, com cópia na escrita por geração.
+
+    Cada `snapshot()` de uma cena alterada avança a geração. Itens marcados
+    com a geração atual ainda não foram vistos por nenhum instantâneo e podem
+    ser alterados no lugar; os demais são copiados por `edit()` antes da
+    alteração.
+    """
+    def __init__(self, scene=None):
+        self.current = scene or Scene()
+        self.generation = 0
+        self._frozen = None  # Última cena entregue por snapshot() ou restore()
+
+    @property
+    def images(self):
+        return self.current.images
+
+    @property
+    def shapes(self):
+        return self.current.shapes
+
+    def snapshot(self):
+        """Congela e retorna a cena atual (O(1), sem copiar itens nem pixels).
+
+        Se a cena não mudou desde o último instantâneo, a geração fica como
+        está: todos os itens dela já são copiados na próxima edição.
+        """
+        if self.current is not self._frozen:
+            self.generation += 1
+            self._frozen = self.current
+        return self.current
+
+    def restore(self, scene):
+        """Volta para um instantâneo anterior; as próximas edições o copiam."""
+        self.generation += 1
+        self.current = self._frozen = scene
+
+    def _identify(self, item):
+        """Dá um `_id` novo a `item` se ele não tiver um ou se o id já estiver na cena."""
+        if getattr(item, "_id", None) is None or self.current.find(item._id) is not None:
+            item._id = next(_item_ids)
+        item._generation = self.generation
+
+    def add(self, item):
+        """Adiciona um item novo no topo, editável no lugar até o próximo instantâneo."""
+        self._identify(item)
+        self.current = self.current.added(item)
+        return item
+
+    def edit(self, item):
+        """Retorna uma versão de `item` que pode ser alterada sem afetar instantâneos."""
+        if item is None or getattr(item, "_generation", None) == self.generation:
+            return item
+        clone = copy.copy(item)
+        clone._generation = self.generation
+        self.current = self.current.replaced(clone)
+        logger.debug(f"{item.__class__.__name__} copiado para edição (geração {self.generation})")
+        return clone
+
+    def remove(self, item):
+        """Tira `item` da cena (instantâneos anteriores continuam com ele)."""
+        self.current = self.current.removed(item)
+
+    def move(self, item, index):
+        """Leva `item` para a posição `index` da ordem de desenho (0 = fundo), em O(log n)."""
+        item = self.edit(item)
+        without = self.current.removed(item)
+        index = max(0, min(len(without), index))
+        self.current = without.added(item, index)
+        logger.debug(f"{item.__class__.__name__} movido para a posição {index}")
+        return item
+
+    def group(self, members, group):
+        """Substitui `members` (em ordem de desenho) pelo grupo novo, na posição do mais alto."""
+        self._identify(group)
+        self.current = self.current.grouped(members, group)
+        return group
+
+    def ungroup(self, group):
+        """Devolve os membros de `group` à cena, em coordenadas absolutas, no lugar do grupo."""
+        _, shapes = group.ungrouped_items()
+        for item in shapes:  # Os membros voltam com o id que tinham antes do agrupamento
+            self._identify(item)
+        self.current = self.current.ungrouped(group, shapes)
+        return shapes
@@ -0,0 +1,270 @@
+# PIL-EditorGUI - Coleções de formas em massa
+# Milhares de retângulos (grades, gráficos, códigos de barras) como um único
+# item da cena. Posição, tamanho, cor e opacidade ficam em arrays contíguos
+# (módulo array) em vez de um objeto Python por forma. Com NumPy, mover,
+# recolorir e recortar pela área visível são operações vetorizadas sobre os
+# mesmos buffers, sem cópia; sem ele, laços simples sobre os arrays.
+#
+# O Pillow não tem primitiva de vários retângulos numa chamada. O desenho em
+# lote recorta e transforma as coordenadas de uma vez, resolve a cor só uma
+# vez por sequência de membros com a mesma cor e emite uma chamada em C por
+# retângulo visível.
+
+from array import array
+import functools
+import hashlib
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional; sem ele as operações percorrem os arrays em Python
+    np = None
+
+try:
+    from .composicao import opacity_alpha
+except ImportError:  # Executado como script
+    from composicao import opacity_alpha
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILL = 0x0000FF  # Azul, como Shape com cor inválida
+
+
+@functools.lru_cache(maxsize=256)
+def member_opacity(opacity, collection_opacity):
+    """Opacidade (0-100, sem arredondar) de um membro com a da coleção aplicada.
+
+    Usada no desenho e em members(): o alfa final é sempre
+    opacity_alpha(member_opacity(...)), com ou sem a exportação item a item.
+    """
+    return opacity * collection_opacity / 100
+
+
+def parse_fill(fill):
+    """Cor '#rrggbb' (ou inteiro 0xRRGGBB) como inteiro."""
+    if isinstance(fill, int):
+        return fill & 0xFFFFFF
+    if isinstance(fill, str) and fill.startswith("#") and len(fill) == 7:
+        return int(fill[1:], 16)
+    return DEFAULT_FILL
+
+
+class CollectionRect:
+    """Retângulo avulso de uma coleção, com a interface de Shape usada pelos exportadores."""
+    __slots__ = ("x", "y", "width", "height", "fill", "opacity")
+    outline_width = 0
+    corner_radius = 0
+
+    def __init__(self, x, y, width, height, fill, opacity):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.fill = fill
+        self.opacity = opacity
+
+    def get_bounding_box(self):
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+
+class ShapeCollection:
+    """Retângulos sem contorno nem cantos arredondados guardados em arrays.
+
+    As coordenadas dos membros são relativas a (x, y); mover a coleção
+    inteira só altera x e y. `opacity` multiplica a opacidade de cada membro.
+    Membros se sobrepõem na ordem em que foram adicionados.
+    """
+    __slots__ = ("x", "y", "opacity", "name", "xs", "ys", "widths", "heights", "fills", "opacities",
+                 "_extent", "_hash", "_id", "_generation")
+
+    def __init__(self, x=0, y=0, opacity=100, name="Coleção"):
+        self.x = x
+        self.y = y
+        self.opacity = opacity
+        self.name = name
+        self.xs = array("d")
+        self.ys = array("d")
+        self.widths = array("d")
+        self.heights = array("d")
+        self.fills = array("I")  # 0xRRGGBB
+        self.opacities = array("B")  # 0-100
+        self._changed()
+
+    @classmethod
+    def grid(cls, x, y, columns, rows, cell=10, gap=2, fill="#0000FF", opacity=100, name="Grade"):
+        """Grade de `columns` x `rows` células quadradas de lado `cell`."""
+        collection = cls(x, y, name=name)
+        step = cell + gap
+        count = columns * rows
+        collection.xs = array("d", [column * step for column in range(columns)]) * rows
+        collection.ys = array("d", [row * step for row in range(rows) for _ in range(columns)])
+        collection.widths = array("d", [cell]) * count
+        collection.heights = array("d", [cell]) * count
+        collection.fills = array("I", [parse_fill(fill)]) * count
+        collection.opacities = array("B", [max(0, min(100, int(opacity)))]) * count
+        return collection
+
+    def __len__(self):
+        return len(self.xs)
+
+    def _changed(self):
+        self._extent = None
+        self._hash = None
+
+    def add(self, x, y, width, height, fill="#0000FF", opacity=100):
+        """Adiciona um retângulo (coordenadas relativas à coleção) e retorna seu índice."""
+        self.extend(((x, y, width, height, fill, opacity),))
+        return len(self) - 1
+
+    def extend(self, rects):
+        """Adiciona vários retângulos (x, y, largura, altura, cor, opacidade) de uma vez."""
+        rects = list(rects)
+        self.xs.extend([rect[0] for rect in rects])
+        self.ys.extend([rect[1] for rect in rects])
+        self.widths.extend([rect[2] for rect in rects])
+        self.heights.extend([rect[3] for rect in rects])
+        self.fills.extend([parse_fill(rect[4]) for rect in rects])
+        self.opacities.extend([max(0, min(100, int(rect[5]))) for rect in rects])
+        self._changed()
+
+    def _views(self):
+        """Visões NumPy (sem cópia) dos arrays; não podem sobreviver a um `extend`."""
+        return (np.frombuffer(self.xs, dtype=np.float64), np.frombuffer(self.ys, dtype=np.float64),
+                np.frombuffer(self.widths, dtype=np.float64), np.frombuffer(self.heights, dtype=np.float64))
+
+    def _indices(self, indices):
+        return range(len(self)) if indices is None else indices
+
+    def translate(self, dx, dy, indices=None):
+        """Move os membros em `indices` (todos, se None) por (dx, dy)."""
+        if np is not None:
+            xs, ys, _, _ = self._views()
+            selection = slice(None) if indices is None else np.asarray(indices, dtype=np.intp)
+            xs[selection] += dx
+            ys[selection] += dy
+        else:
+            for index in self._indices(indices):
+                self.xs[index] += dx
+                self.ys[index] += dy
+        self._changed()
+
+    def recolor(self, fill=None, opacity=None, indices=None):
+        """Troca a cor e/ou a opacidade dos membros em `indices` (todos, se None)."""
+        if np is not None:
+            selection = slice(None) if indices is None else np.asarray(indices, dtype=np.intp)
+            if fill is not None:
+                np.frombuffer(self.fills, dtype=np.uint32)[selection] = parse_fill(fill)
+            if opacity is not None:
+                np.frombuffer(self.opacities, dtype=np.uint8)[selection] = max(0, min(100, int(opacity)))
+        else:
+            for index in self._indices(indices):
+                if fill is not None:
+                    self.fills[index] = parse_fill(fill)
+                if opacity is not None:
+                    self.opacities[index] = max(0, min(100, int(opacity)))
+        self._changed()
+
+    def cull(self, box):
+        """Índices dos membros que interceptam `box` (coordenadas da cena), em ordem de desenho."""
+        left, top, right, bottom = box[0] - self.x, box[1] - self.y, box[2] - self.x, box[3] - self.y
+        if np is not None:
+            xs, ys, widths, heights = self._views()
+            inside = (xs + widths >= left) & (ys + heights >= top) & (xs <= right) & (ys <= bottom)
+            return np.flatnonzero(inside).tolist()
+        return [index for index, (x, y, width, height) in enumerate(zip(self.xs, self.ys, self.widths, self.heights))
+                if x + width >= left and y + height >= top and x <= right and y <= bottom]
+
+    def hit_test(self, x, y):
+        """Índice do membro mais alto sob o ponto (x, y) da cena, ou None."""
+        hits = self.cull((x, y, x, y))
+        return hits[-1] if hits else None
+
+    def set_fill(self, color):
+        self.recolor(fill=color)
+        logger.info(f"Cor da coleção '{self.name}' ajustada para {color}")
+
+    def set_opacity(self, opacity):
+        self.opacity = max(0, min(100, opacity))
+        logger.info(f"Opacidade da coleção '{self.name}' ajustada para {self.opacity}")
+
+    @property
+    def width(self):
+        return self._bounds()[0]
+
+    @property
+    def height(self):
+        return self._bounds()[1]
+
+    def _bounds(self):
+        if self._extent is None:
+            if not len(self):
+                self._extent = (0, 0)
+            elif np is not None:
+                xs, ys, widths, heights = self._views()
+                self._extent = (float((xs + widths).max()), float((ys + heights).max()))
+            else:
+                self._extent = (max(x + w for x, w in zip(self.xs, self.widths)),
+                                max(y + h for y, h in zip(self.ys, self.heights)))
+        return self._extent
+
+    def get_bounding_box(self):
+        width, height = self._bounds()
+        return (self.x, self.y, self.x + width, self.y + height)
+
+    def content_hash(self):
+        """Hash dos arrays (em coordenadas locais), calculado uma vez por alteração."""
+        if self._hash is None:
+            digest = hashlib.sha256()
+            for values in (self.xs, self.ys, self.widths, self.heights, self.fills, self.opacities):
+                digest.update(values)
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    def members(self):
+        """Membros como CollectionRect em coordenadas absolutas (exportação item a item)."""
+        return [CollectionRect(self.x + x, self.y + y, width, height, f"#{fill:06x}", member_opacity(member, self.opacity))
+                for x, y, width, height, fill, member
+                in zip(self.xs, self.ys, self.widths, self.heights, self.fills, self.opacities)]
+
+    def __copy__(self):
+        """Cópia para edição: os arrays são duplicados (memcpy), não compartilhados."""
+        clone = self.__class__.__new__(self.__class__)
+        for name in self.__slots__:
+            if hasattr(self, name):
+                value = getattr(self, name)
+                setattr(clone, name, value[:] if isinstance(value, array) else value)
+        return clone
+
+    def _visible_rects(self, scale, offset, width, height):
+        """(x0, y0, x1, y1, cor, opacidade) dos membros dentro de uma imagem width x height."""
+        origin_x = self.x * scale + offset[0]
+        origin_y = self.y * scale + offset[1]
+        if np is not None:
+            xs, ys, widths, heights = self._views()
+            x0 = xs * scale + origin_x
+            y0 = ys * scale + origin_y
+            x1 = x0 + widths * scale
+            y1 = y0 + heights * scale
+            visible = np.flatnonzero((x1 >= 0) & (y1 >= 0) & (x0 < width) & (y0 < height))
+            return zip(x0[visible].tolist(), y0[visible].tolist(), x1[visible].tolist(), y1[visible].tolist(),
+                       np.frombuffer(self.fills, dtype=np.uint32)[visible].tolist(),
+                       np.frombuffer(self.opacities, dtype=np.uint8)[visible].tolist())
+        rects = []
+        for x, y, w, h, fill, opacity in zip(self.xs, self.ys, self.widths, self.heights, self.fills, self.opacities):
+            x0 = x * scale + origin_x
+            y0 = y * scale + origin_y
+            x1 = x0 + w * scale
+            y1 = y0 + h * scale
+            if x1 >= 0 and y1 >= 0 and x0 < width and y0 < height:
+                rects.append((x0, y0, x1, y1, fill, opacity))
+        return rects
+
+    def draw(self, image, draw, scale=1.0, offset=(0, 0)):
+        """Desenha os membros visíveis sobre `image` (via `draw`, o ImageDraw dela) com escala e `offset`."""
+        width, height = image.size
+        run = None
+        for x0, y0, x1, y1, fill, opacity in self._visible_rects(scale, offset, width, height):
+            if run != (fill, opacity):  # Cor resolvida uma vez por sequência de mesma cor
+                run = (fill, opacity)
+                color = (fill >> 16, (fill >> 8) & 0xFF, fill & 0xFF, opacity_alpha(member_opacity(opacity, self.opacity)))
+            draw.rectangle((x0, y0, x1, y1), fill=color)
@@ -0,0 +1,153 @@
+# PIL-EditorGUI - Modos de mesclagem
+# Composição separável do W3C (Compositing and Blending Level 1) aplicada
+# só sobre a área da camada:
+#   Cs' = (1 - αb)·Cs + αb·B(Cb, Cs)     -> Image.composite com o alfa do fundo
+#   resultado = Cs' "over" fundo          -> Image.alpha_composite
+# A função B vem do ImageChops quando o Pillow a oferece; color-dodge,
+# color-burn e soft-light usam NumPy, se estiver instalado. Os nomes seguem o
+# CSS / Canvas (globalCompositeOperation), usados também na exportação JS.
+#
+# O modo normal é o operador "over" com alfa pré-multiplicado, que o Pillow
+# calcula em C no alpha_composite (o resize de RGBA também pré-multiplica
+# internamente). As camadas ficam em RGBA; converter para RGBa e voltar a
+# cada composição custaria mais do que a própria composição.
+
+from PIL import Image, ImageChops
+import functools
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional; sem ele os modos que dependem dele ficam indisponíveis
+    np = None
+
+logger = logging.getLogger(__name__)
+
+BLEND_MODES = (
+    "normal", "multiply", "screen", "overlay", "darken", "lighten", "color-dodge",
+    "color-burn", "hard-light", "soft-light", "difference", "exclusion",
+)
+
+# B(Cb, Cs) com o fundo (backdrop) como primeira imagem, em RGB
+_CHOPS_MODES = {
+    "multiply": ImageChops.multiply,
+    "screen": ImageChops.screen,
+    "overlay": ImageChops.overlay,  # Condição no fundo
+    "darken": ImageChops.darker,
+    "lighten": ImageChops.lighter,
+    "hard-light": ImageChops.hard_light,  # Condição na camada
+    "difference": ImageChops.difference,
+    "exclusion": lambda cb, cs: ImageChops.subtract(ImageChops.screen(cb, cs), ImageChops.multiply(cb, cs)),
+}
+
+
+def _color_dodge(cb, cs):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.minimum(1.0, cb / (1.0 - cs))
+    return np.where(cb == 0, 0.0, np.where(cs == 1, 1.0, result))
+
+
+def _color_burn(cb, cs):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = 1.0 - np.minimum(1.0, (1.0 - cb) / cs)
+    return np.where(cb == 1, 1.0, np.where(cs == 0, 0.0, result))
+
+
+def _soft_light(cb, cs):
+    d = np.where(cb <= 0.25, ((16 * cb - 12) * cb + 4) * cb, np.sqrt(cb))
+    return np.where(cs <= 0.5, cb - (1 - 2 * cs) * cb * (1 - cb), cb + (2 * cs - 1) * (d - cb))
+
+
+_NUMPY_MODES = {
+    "color-dodge": _color_dodge,
+    "color-burn": _color_burn,
+    "soft-light": _soft_light,
+}
+
+
+@functools.lru_cache(maxsize=128)
+def _opacity_lut(opacity):
+    return tuple(range(256)) * 3 + tuple(int(p * opacity / 100) for p in range(256))
+
+
+def opacity_alpha(opacity):
+    """Alfa (0-255) da cor de uma forma ou texto com opacidade 0-100."""
+    return int(opacity * 255 / 100)
+
+
+def apply_opacity(img, opacity):
+    """Retorna `img` (RGBA) com o alfa multiplicado pela opacidade (0-100), numa única passada."""
+    if opacity >= 100:
+        return img
+    return img.point(_opacity_lut(opacity))
+
+
+def available_blend_modes():
+    """Modos suportados neste ambiente (os de NumPy só com NumPy instalado)."""
+    return tuple(mode for mode in BLEND_MODES if mode not in _NUMPY_MODES or np is not None)
+
+
+def blend_colors(backdrop, source, mode):
+    """B(Cb, Cs) para duas imagens RGB do mesmo tamanho."""
+    if mode in _CHOPS_MODES:
+        return _CHOPS_MODES[mode](backdrop, source)
+    if mode in _NUMPY_MODES:
+        if np is None:
+            raise ValueError(f"O modo '{mode}' requer NumPy")
+        cb = np.asarray(backdrop, dtype=np.float32) / 255
+        cs = np.asarray(source, dtype=np.float32) / 255
+        result = _NUMPY_MODES[mode](cb, cs)
+        return Image.fromarray(np.rint(np.clip(result, 0, 1) * 255).astype(np.uint8), "RGB")
+    raise ValueError(f"Modo de mesclagem desconhecido: {mode}")
+
+
+def _clip(base, source, dest):
+    """Parte de `source` que cai dentro de `base`: (recorte, destino) ou None."""
+    box = (max(0, dest[0]), max(0, dest[1]),
+           min(base.width, dest[0] + source.width), min(base.height, dest[1] + source.height))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+    if box != (dest[0], dest[1], dest[0] + source.width, dest[1] + source.height):
+        # Camada parcialmente fora da base (ex.: visualizador, posições negativas)
+        source = source.crop((box[0] - dest[0], box[1] - dest[1], box[2] - dest[0], box[3] - dest[1]))
+    return source, box[:2]
+
+
+def blend_onto(base, source, dest, mode):
+    """Mescla `source` (RGBA) sobre `base` (RGBA) na posição `dest`, no lugar."""
+    clipped = _clip(base, source, dest)
+    if clipped is None:
+        return
+    source, dest = clipped
+    box = dest + (dest[0] + source.width, dest[1] + source.height)
+    # Pixels totalmente transparentes da camada não alteram o fundo
+    opaque = source.getchannel("A").getbbox()
+    if opaque is None:
+        return
+    if opaque != (0, 0) + source.size:
+        source = source.crop(opaque)
+        dest = (dest[0] + opaque[0], dest[1] + opaque[1])
+        box = dest + (dest[0] + source.width, dest[1] + source.height)
+    backdrop = base.crop(box)
+    source_rgb = source.convert("RGB")
+    # Onde o fundo é transparente vale a cor da camada; onde é opaco, B(Cb, Cs)
+    mixed = Image.composite(blend_colors(backdrop.convert("RGB"), source_rgb, mode),
+                            source_rgb, backdrop.getchannel("A"))
+    mixed.putalpha(source.getchannel("A"))
+    base.alpha_composite(mixed, dest)
+
+
+def composite_layer(base, layer, dest, mode="normal"):
+    """Compõe `layer` (RGBA) sobre `base` (RGBA) na posição `dest`, no lugar.
+
+    `normal` é o "over" do alpha_composite. A colagem antiga com a própria
+    camada como máscara (`paste(layer, dest, layer)`) aplicava o alfa duas
+    vezes: sobre fundo transparente as bordas ficavam com α²/255.
+    """
+    if mode != "normal":
+        blend_onto(base, layer, dest, mode)
+        return
+    clipped = _clip(base, layer, dest)
+    if clipped is not None:
+        base.alpha_composite(*clipped)
+
@@ -0,0 +1,150 @@
+# PIL-EditorGUI - Composição em vários processos
+# Para exportações grandes a cena é dividida em faixas renderizadas por um
+# pool de processos, contornando o GIL nos laços por camada. Os pixels dos
+# assets ficam em multiprocessing.shared_memory e os processos os mapeiam
+# sem cópia (Image.frombuffer); a cena viaja em pickle só com os hashes dos
+# assets. Cada processo escreve sua faixa direto num buffer de saída
+# compartilhado, organizado como anel: apenas as faixas em andamento ocupam
+# memória, não o canvas inteiro.
+#
+# Os processos são criados com "spawn": o fork copiaria o estado da thread
+# pool dos tiles, inclusive locks que estejam presos no momento. Cada
+# processo monta seu estado só com o que recebe em _init_worker.
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from PIL import Image
+import io
+import logging
+import multiprocessing
+import os
+
+try:
+    from .historico import _StatePickler, _StateUnpickler
+    from .png_paralelo import verify_png, write_png_stripes
+    from .registro_assets import Asset
+    from .renderizacao import DEFAULT_STRIPE_HEIGHT, export_png_tiled, render_region
+except ImportError:  # Executado como script
+    from historico import _StatePickler, _StateUnpickler
+    from png_paralelo import verify_png, write_png_stripes
+    from registro_assets import Asset
+    from renderizacao import DEFAULT_STRIPE_HEIGHT, export_png_tiled, render_region
+
+logger = logging.getLogger(__name__)
+
+# Modos que o Image.frombuffer mapeia sem cópia; os demais vão como RGBA
+SHAREABLE_MODES = ("L", "P", "RGBA")
+# Faixas no anel de saída por processo (uma renderizando, outra aguardando a leitura)
+SLOTS_PER_WORKER = 2
+
+_worker = {}  # Estado de cada processo do pool, preenchido por _init_worker
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _share_assets(assets):
+    """Copia os pixels de cada asset para um bloco de memória compartilhada.
+
+    Retorna (blocos, descritores), com descritor = (nome, modo, tamanho, paleta).
+    """
+    blocks, descriptors = [], {}
+    for content_hash, asset in assets.items():
+        image = asset.image
+        if image.mode not in SHAREABLE_MODES:
+            image = image.convert("RGBA")
+        data = image.tobytes()
+        block = SharedMemory(create=True, size=max(1, len(data)))
+        block.buf[:len(data)] = data
+        blocks.append(block)
+        palette = (image.palette.mode, image.palette.tobytes()) if image.mode == "P" else None
+        descriptors[content_hash] = (block.name, image.mode, image.size, palette)
+    return blocks, descriptors
+
+
+def _init_worker(scene_data, descriptors, output_name, slot_bytes):
+    """Mapeia os assets e o anel de saída e reconstrói a cena no processo."""
+    blocks, assets = [], {}
+    for content_hash, (name, mode, size, palette) in descriptors.items():
+        block = SharedMemory(name=name)
+        blocks.append(block)
+        image = Image.frombuffer(mode, size, block.buf, "raw", mode, 0, 1)
+        if palette is not None:
+            image.putpalette(palette[1], rawmode=palette[0])
+        assets[content_hash] = Asset(image, content_hash)
+    images, shapes = _StateUnpickler(io.BytesIO(scene_data), assets).load()
+    _worker.update(images=images, shapes=shapes, blocks=blocks,
+                   output=SharedMemory(name=output_name), slot_bytes=slot_bytes)
+
+
+def _render_stripe(region, slot):
+    """Renderiza uma faixa e a grava na posição `slot` do anel de saída."""
+    data = render_region(_worker["images"], _worker["shapes"], region).tobytes()
+    offset = slot * _worker["slot_bytes"]
+    _worker["output"].buf[offset:offset + len(data)] = data
+    return region
+
+
+def iter_render_stripes_parallel(images, shapes, size, stripe_height=DEFAULT_STRIPE_HEIGHT, workers=None):
+    """Gera a cena em faixas horizontais, em ordem, renderizadas por `workers` processos."""
+    workers = workers or default_workers()
+    width, height = size
+    regions = [(0, top, width, min(top + stripe_height, height)) for top in range(0, height, stripe_height)]
+    slots = min(len(regions), workers * SLOTS_PER_WORKER)
+    slot_bytes = width * stripe_height * 4
+
+    assets = {}
+    scene_data = io.BytesIO()
+    _StatePickler(scene_data, assets).dump((images, shapes))
+    blocks, descriptors = _share_assets(assets)
+    output = SharedMemory(create=True, size=max(1, slots * slot_bytes))
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker,
+                                   initargs=(scene_data.getvalue(), descriptors, output.name, slot_bytes))
+    logger.info(f"Compondo {len(regions)} faixas em {workers} processos ({len(assets)} assets compartilhados)")
+    try:
+        pending = deque(executor.submit(_render_stripe, region, index) for index, region in enumerate(regions[:slots]))
+        for index in range(len(regions)):
+            left, top, right, bottom = pending.popleft().result()
+            offset = (index % slots) * slot_bytes
+            stripe = Image.frombytes("RGBA", (right - left, bottom - top),
+                                     output.buf[offset:offset + (right - left) * (bottom - top) * 4])
+            if index + slots < len(regions):  # A posição lida fica livre para a próxima faixa
+                pending.append(executor.submit(_render_stripe, regions[index + slots], index % slots))
+            yield stripe
+    finally:
+        executor.shutdown(cancel_futures=True)
+        for block in blocks + [output]:
+            block.close()
+            block.unlink()
+
+
+def render_parallel(images, shapes, size, workers=None, stripe_height=DEFAULT_STRIPE_HEIGHT):
+    """Compõe a cena inteira com o pool de processos (ex.: exportação JPG grande)."""
+    result = Image.new("RGBA", size, (0, 0, 0, 0))
+    for index, stripe in enumerate(iter_render_stripes_parallel(images, shapes, size, stripe_height, workers)):
+        result.paste(stripe, (0, index * stripe_height))
+    return result
+
+
+def export_png_parallel(images, shapes, size, file_path, level=6, workers=None,
+                        stripe_height=DEFAULT_STRIPE_HEIGHT, png_filter="up", verify=False):
+    """Como renderizacao.export_png_tiled, mas com as faixas compostas em vários processos.
+
+    Com um único núcleo não há o que distribuir e a exportação em faixas na
+    thread principal é usada.
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        export_png_tiled(images, shapes, size, file_path, level=level, stripe_height=stripe_height,
+                         png_filter=png_filter, verify=verify)
+        return
+    with open(file_path, "wb") as fp:
+        write_png_stripes(fp, size, "RGBA",
+                          iter_render_stripes_parallel(images, shapes, size, stripe_height, workers),
+                          level=level, workers=workers, png_filter=png_filter)
+    if verify:
+        verify_png(file_path, iter_render_stripes_parallel(images, shapes, size, stripe_height, workers))
+    logger.info(f"PNG exportado com composição em {workers} processos: {file_path}")
@@ -15,8 +15,52 @@ from tkinter import filedialog, colorchooser, simpledialog, messagebox
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import logging
 import copy
+import math
 import os
 
+try:
+    from .alinhamento import SNAP_DISTANCE, SnapIndex, union_box
+    from .cache_exportacao import ExportCache, scene_hash
+    from .cache_pixels import PixelCache
+    from .cena import SceneDocument
+    from .colecao_formas import ShapeCollection
+    from .composicao import apply_opacity, available_blend_modes, composite_layer, opacity_alpha
+    from .composicao_processos import export_png_parallel, render_parallel
+    from .exportacao import generate_javascript, generate_lua_dx, generate_lua_gui, unsupported_effects
+    from .grafo_renderizacao import RenderGraph
+    from .grupos import LayerGroup, flatten_leaves
+    from .mascaras import mask_cache
+    from .historico import History
+    from .memoria import MB, PRIORITY_PREVIEWS, PRIORITY_SPRITES, MemoryGovernor
+    from .mosaico import TileRenderer
+    from .perfil_exportacao import ExportProfile, export_profile
+    from .png_paralelo import PNG_FILTERS
+    from .registro_assets import asset_registry
+    from .renderizacao import canvas_size, intersect, render_region
+    from .transformacao import (compose, contains_point, corners, draw_composited, draw_transformed, from_params,
+                                normalized, rotation, to_params, transform_cache, transformed_box)
+except ImportError:  # Executado como script (python editor.py)
+    from alinhamento import SNAP_DISTANCE, SnapIndex, union_box
+    from cache_exportacao import ExportCache, scene_hash
+    from cache_pixels import PixelCache
+    from cena import SceneDocument
+    from colecao_formas import ShapeCollection
+    from composicao import apply_opacity, available_blend_modes, composite_layer, opacity_alpha
+    from composicao_processos import export_png_parallel, render_parallel
+    from exportacao import generate_javascript, generate_lua_dx, generate_lua_gui, unsupported_effects
+    from grafo_renderizacao import RenderGraph
+    from grupos import LayerGroup, flatten_leaves
+    from mascaras import mask_cache
+    from historico import History
+    from memoria import MB, PRIORITY_PREVIEWS, PRIORITY_SPRITES, MemoryGovernor
+    from mosaico import TileRenderer
+    from perfil_exportacao import ExportProfile, export_profile
+    from png_paralelo import PNG_FILTERS
+    from registro_assets import asset_registry
+    from renderizacao import canvas_size, intersect, render_region
+    from transformacao import (compose, contains_point, corners, draw_composited, draw_transformed, from_params,
+                               normalized, rotation, to_params, transform_cache, transformed_box)
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,42 +69,132 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Acima deste número de pixels o PNG é renderizado e comprimido em faixas paralelas
+TILED_EXPORT_MIN_PIXELS = 4_000_000
+# Limites e passo do zoom da área de trabalho (roda do mouse)
+MIN_ZOOM = 0.05
+MAX_ZOOM = 32.0
+ZOOM_STEP = 1.25
+# Estimativa de memória por estado do histórico: os itens e a árvore da ordem de
+# desenho são compartilhados entre instantâneos, então cada estado custa o item
+# alterado mais o caminho copiado na árvore (~2 log2 n nós)
+HISTORY_OBJECT_BYTES = 1024
+HISTORY_NODE_BYTES = 96
+# Modificadores em event.state do Tk
+EVENT_SHIFT = 0x0001
+EVENT_CONTROL = 0x0004
+# Handle de rotação: distância acima do item (pixels da tela) e passo com Shift (graus)
+ROTATE_HANDLE_OFFSET = 24
+ROTATE_SNAP_DEGREES = 15
+
 #############################
 #### Classe ImageLayer ####
 #############################
 
 class ImageLayer:
-    """Classe para camadas de imagem com posição, opacidade e nome do arquivo."""
+    """Classe para camadas de imagem com posição, opacidade e nome do arquivo.
+
+    Os pixels ficam num Asset compartilhado do registro (flyweight); a camada
+    guarda só a referência, o tamanho exibido e a opacidade.
+    """
+    __slots__ = ("asset", "file_path", "x", "y", "opacity", "blend_mode", "width", "height", "transform", "clip", "_scaled", "_draft",
+                 "_id", "_generation")
+
     def __init__(self, image, file_path, x=0, y=0, opacity=100):
-        self.image = image
+        self.asset = asset_registry.acquire(image)
         self.file_path = file_path  # Armazena o caminho original do arquivo
         self.x = x
         self.y = y
         self.opacity = opacity
+        self.blend_mode = "normal"  # Modo de mesclagem com as camadas abaixo (ver composicao.py)
         self.width, self.height = image.size
-
-    def draw(self, draw, scale=1.0):
-        """Desenha a imagem na camada com escala aplicada."""
-        img = self.image.copy()
-        if self.opacity < 100:
-            alpha = img.split()[3]
-            new_alpha = alpha.point(lambda p: int(p * self.opacity / 100))
-            img.putalpha(new_alpha)
+        self.transform = None  # Parte linear da transformação afim em torno do centro (ver transformacao.py)
+        self.clip = False  # Recortado pelo alfa do item logo abaixo (ver mascaras.py)
+        self._scaled = None  # (tamanho, imagem) redimensionada a partir do asset
+
+    @property
+    def image(self):
+        """Pixels no tamanho atual da camada, redimensionados do asset original."""
+        if (self.width, self.height) == self.asset.size:
+            return self.asset.image
+        if self._scaled is None or self._scaled[0] != (self.width, self.height):
+            # Assets compactos (L, P) são reamostrados em RGBA para manter o filtro LANCZOS
+            resized = self.asset.image.convert("RGBA").resize((self.width, self.height), Image.Resampling.LANCZOS)
+            self._scaled = ((self.width, self.height), resized)
+        return self._scaled[1]
+
+    @image.setter
+    def image(self, image):
+        """Substitui os pixels da camada (copy-on-write: o asset antigo não é alterado)."""
+        self.asset = asset_registry.acquire(image)
+        self.width, self.height = image.size
+        self._scaled = None
+
+    def content_hash(self):
+        """Hash dos pixels do asset da camada (o tamanho entra separado nas chaves)."""
+        return self.asset.content_hash
+
+    def memory_usage(self):
+        """Retorna (bytes no modo guardado, bytes se o asset fosse RGBA)."""
+        return self.asset.nbytes, self.asset.rgba_nbytes
+
+    def __copy__(self):
+        """Cópia rasa para edição: compartilha o asset e a prévia redimensionada (imutáveis)."""
+        clone = self.__class__.__new__(self.__class__)
+        for name in self.__slots__:
+            if hasattr(self, name):
+                setattr(clone, name, getattr(self, name))
+        return clone
+
+    def __deepcopy__(self, memo):
+        """Cópia profunda: duplica a posição e opacidade, compartilha os pixels."""
+        clone = copy.copy(self)
+        memo[id(self)] = clone
+        return clone
+
+    def __getstate__(self):
+        """A prévia redimensionada não vai para cópias nem para o disco; é refeita sob demanda."""
+        state = {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+        state["_scaled"] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def preview_bytes(self):
+        """Memória da prévia redimensionada em cache (0 se não houver)."""
+        return self._scaled[1].width * self._scaled[1].height * 4 if self._scaled else 0
+
+    def drop_preview(self):
+        """Descarta a prévia redimensionada e retorna os bytes liberados."""
+        freed = self.preview_bytes()
+        self._scaled = None
+        return freed
+
+    def draw(self, image, scale=1.0):
+        """Desenha a imagem sobre `image` (RGBA) com escala aplicada."""
+        img = apply_opacity(self.image.convert("RGBA"), self.opacity)
         scaled_img = img.resize((int(self.width * scale), int(self.height * scale)), Image.Resampling.LANCZOS)
-        draw._image.paste(scaled_img, (int(self.x * scale), int(self.y * scale)), scaled_img)
+        composite_layer(image, scaled_img, (int(self.x * scale), int(self.y * scale)), self.blend_mode)
 
     def resize(self, width, height):
         """Redimensiona a imagem."""
         self.width = max(10, int(width))
         self.height = max(10, int(height))
-        self.image = self.image.resize((self.width, self.height), Image.Resampling.LANCZOS)
         logger.info(f"Imagem redimensionada para {self.width}x{self.height}")
 
     def set_opacity(self, opacity):
         self.opacity = max(0, min(100, opacity))
         logger.info(f"Opacidade da imagem ajustada para {self.opacity}")
 
+    def set_blend_mode(self, mode):
+        self.blend_mode = mode
+        logger.info(f"Modo de mesclagem da imagem ajustado para {mode}")
+
     def get_bounding_box(self):
+        if self.transform is not None:
+            return transformed_box(self)
         return (self.x, self.y, self.x + self.width, self.y + self.height)
 
 #############################
@@ -69,6 +203,9 @@ class ImageLayer:
 
 class Shape:
     """Classe para formas geométricas com personalização."""
+    __slots__ = ("x", "y", "width", "height", "fill", "opacity", "outline_width", "corner_radius", "transform", "clip", "_draft",
+                 "_id", "_generation")
+
     def __init__(self, x, y, width=100, height=100, fill="blue", opacity=100, outline_width=1, corner_radius=0):
         self.x = x
         self.y = y
@@ -78,29 +215,44 @@ class Shape:
         self.opacity = opacity
         self.outline_width = outline_width
         self.corner_radius = corner_radius
-
-    def draw(self, draw):
-        """Desenha a forma (retângulo) na imagem com personalizações."""
+        self.transform = None  # Parte linear da transformação afim em torno do centro (ver transformacao.py)
+        self.clip = False  # Recortado pelo alfa do item logo abaixo (ver mascaras.py)
+
+    def draw(self, image, draw, scale=1.0, offset=(0, 0)):
+        """Desenha a forma (retângulo) sobre `image` (via `draw`, o ImageDraw dela) com escala e `offset`."""
+        if self.transform is not None:
+            draw_transformed(self, image, scale, offset, self._paint)
+        elif self.opacity < 100:
+            draw_composited(self, image, scale, offset, self._paint)
+        else:  # Opaca e sem antisserrilhado: trocar os pixels já é compor por cima
+            self._paint(draw, scale, offset)
+
+    def _paint(self, draw, scale, offset):
         if self.fill.startswith('#'):
             fill_rgb = tuple(int(self.fill[i:i+2], 16) for i in (1, 3, 5))
         else:
             fill_rgb = (0, 0, 255)
-        fill_rgba = fill_rgb + (int(self.opacity * 255 / 100),)
-
-        if self.corner_radius > 0:
+        fill_rgba = fill_rgb + (opacity_alpha(self.opacity),)
+        x = self.x * scale + offset[0]
+        y = self.y * scale + offset[1]
+        width = self.width * scale
+        height = self.height * scale
+        radius = int(self.corner_radius * scale)
+
+        if radius > 0:
             draw.rounded_rectangle(
-                [self.x, self.y, self.x + self.width, self.y + self.height],
-                radius=self.corner_radius,
+                [x, y, x + width, y + height],
+                radius=radius,
                 fill=fill_rgba,
                 outline="black" if self.outline_width > 0 else None,
-                width=self.outline_width
+                width=int(self.outline_width * scale)
             )
         else:
             draw.rectangle(
-                [self.x, self.y, self.x + self.width, self.y + self.height],
+                [x, y, x + width, y + height],
                 fill=fill_rgba,
                 outline="black" if self.outline_width > 0 else None,
-                width=self.outline_width
+                width=int(self.outline_width * scale)
             )
 
     def resize(self, width, height):
@@ -126,6 +278,8 @@ class Shape:
         logger.info(f"Cor ajustada para {self.fill}")
 
     def get_bounding_box(self):
+        if self.transform is not None:
+            return transformed_box(self)
         return (self.x, self.y, self.x + self.width, self.y + self.height)
 
 #############################
@@ -134,6 +288,9 @@ class Shape:
 
 class TextShape:
     """Classe para textos com personalização."""
+    __slots__ = ("x", "y", "text", "font_path", "font_size", "fill", "opacity", "width", "height", "transform", "clip", "_draft",
+                 "_id", "_generation")
+
     def __init__(self, x, y, text, font_path=None, font_size=20, fill="black", opacity=100):
         self.x = x
         self.y = y
@@ -143,6 +300,8 @@ class TextShape:
         self.fill = fill
         self.opacity = opacity
         self.width, self.height = self.get_text_size()
+        self.transform = None  # Parte linear da transformação afim em torno do centro (ver transformacao.py)
+        self.clip = False  # Recortado pelo alfa do item logo abaixo (ver mascaras.py)
 
     def get_font(self, size=None):
         """Retorna o objeto ImageFont baseado no caminho e tamanho."""
@@ -165,12 +324,18 @@ class TextShape:
         buffer = max(10, self.font_size // 2)
         return (width + buffer, height + buffer)
 
-    def draw(self, draw, scale=1.0):
-        """Desenha o texto na imagem com escala aplicada."""
+    def draw(self, image, draw, scale=1.0, offset=(0, 0)):
+        """Desenha o texto sobre `image` (via `draw`, o ImageDraw dela) com escala e `offset`."""
+        if self.transform is not None:
+            draw_transformed(self, image, scale, offset, self._paint)
+        else:  # As bordas dos glifos são parcialmente transparentes: sempre composto por cima
+            draw_composited(self, image, scale, offset, self._paint)
+
+    def _paint(self, draw, scale, offset):
         fill_rgb = tuple(int(self.fill[i:i+2], 16) for i in (1, 3, 5)) if self.fill.startswith('#') else (0, 0, 0)
-        fill_rgba = fill_rgb + (int(self.opacity * 255 / 100),)
+        fill_rgba = fill_rgb + (opacity_alpha(self.opacity),)
         font = self.get_font(int(self.font_size * scale))
-        draw.text((self.x, self.y), self.text, font=font, fill=fill_rgba)
+        draw.text((self.x * scale + offset[0], self.y * scale + offset[1]), self.text, font=font, fill=fill_rgba)
 
     def resize(self, size):
         """Redimensiona o tamanho da fonte do texto."""
@@ -193,8 +358,13 @@ class TextShape:
         logger.info(f"Fonte ajustada para {font_path}, tamanho {self.font_size}")
 
     def get_bounding_box(self):
+        if self.transform is not None:
+            return transformed_box(self)
         return (self.x, self.y, self.x + self.width, self.y + self.height)
 
+# Itens que aceitam transformação afim
+TRANSFORMABLE = (ImageLayer, Shape, TextShape)
+
 #############################
 #### Classe Editor ####
 #############################
@@ -210,34 +380,89 @@ class Editor:
         self.canvas = tk.Canvas(self.root, width=600, height=600, bg="#3c3f41", highlightthickness=0)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        self.images = []  # Lista de camadas de imagens
-        self.shapes = []  # Lista de formas, textos e imagens
-        self.selected_shape = None
+        self.document = SceneDocument()  # Cena atual; instantâneos são imutáveis e compartilhados
+        self.selection = []  # Itens selecionados; o último é o principal (handles e diálogos)
         self.is_dragging = False
         self.resize_handle = None
+        self.band_start = None  # Canto inicial da seleção por retângulo (coordenadas da cena)
+        self.drag_changed = False
+        self.snap_index = None  # Bordas dos outros itens e guias do canvas, montadas no primeiro movimento
+        self.snap_start = None  # (cena, caixas da seleção) no clique que iniciou o arraste
+        self.snap_base = None  # (cena, tamanho, SnapIndex com todos os itens), reaproveitado entre arrastes
+        self.snap_offset = (0, 0)  # Ajuste de encaixe já aplicado à seleção, além do movimento do mouse
+        self.snap_guides = (None, None)  # Guias (x, y) atingidas, desenhadas durante o arraste
+        self.rotate_start = None  # (ângulo inicial do ponteiro, transformação inicial) durante a rotação
         self.last_x = 0
         self.last_y = 0
         self.display_image = None
-
-        self.history = []
+        self.zoom = None  # None: a cena inteira se ajusta à janela
+        self.view_offset = (0, 0)  # Posição do canto da cena no canvas quando há zoom
+        self.pan_start = None
+        self.export_profile = ExportProfile.default()  # Saídas geradas por "Export All"
+        self.export_profile_edited = False  # Perfil ajustado nesta sessão: prevalece sobre o .export.json
+        self.export_cache = ExportCache()  # Saídas já codificadas, por hash da cena
+        self.pixel_cache = PixelCache()  # Pixels decodificados mapeados do disco
+        self.render_graph = RenderGraph()  # Saídas memorizadas de cada etapa da renderização
+        self.tile_renderer = TileRenderer(self.render_graph)  # Tiles do canvas por nível de zoom
+
+        # Orçamento único para prévias, caches e histórico
+        self.memory = MemoryGovernor()
+        self.history = History(limit=100, estimate=self._state_bytes)
+        self.memory.register("previews", self._preview_bytes, self._release_previews, PRIORITY_PREVIEWS)
+        self.memory.register("render", self.render_graph.memory_usage, self.render_graph.release, PRIORITY_PREVIEWS)
+        self.memory.register("tiles", self.tile_renderer.memory_usage, self.tile_renderer.release, PRIORITY_PREVIEWS)
+        self.memory.register("transforms", transform_cache.memory_usage, transform_cache.release, PRIORITY_PREVIEWS)
+        self.memory.register("masks", mask_cache.memory_usage, mask_cache.release, PRIORITY_PREVIEWS)
+        self.memory.register("sprites", self.export_cache.memory_usage, self.export_cache.release, PRIORITY_SPRITES)
+        self.memory.register("history", self.history.memory_usage)  # Só contabilizado (ver historico.History)
+        self.memory.register("assets", asset_registry.total_bytes)
         self.save_state()
 
+        # API de script sobre a mesma cena; cada transação vira um estado do histórico
+        try:  # Importado aqui: api_cena importa as classes deste módulo
+            from .api_cena import SceneAPI
+        except ImportError:  # Executado como script
+            from api_cena import SceneAPI
+        self.api = SceneAPI(self.document, on_commit=self._script_committed, pixel_cache=self.pixel_cache)
+
         self.sidebar = tk.Frame(self.root, bg="#2d2d2d", width=200)
         self.sidebar.pack(side=tk.RIGHT, fill=tk.Y)
         tk.Button(self.sidebar, text="Load Image", command=self.load_image, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Add Shape", command=self.add_shape, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Add Text", command=self.add_text, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Add Grid", command=self.add_grid, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Set Color", command=self.set_color, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Set Opacity", command=self.set_opacity, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Set Corner Radius", command=self.set_corner_radius, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Set Outline Width", command=self.set_outline_width, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Set Transparency", command=self.set_transparency, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Transform", command=self.set_transform, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Clip to Below", command=self.toggle_clip, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Blend Mode", command=self.set_blend_mode, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Set Font", command=self.set_font, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Bring Forward", command=self.raise_selected, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Send Backward", command=self.lower_selected, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Group Layers", command=self.group_layers, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Ungroup", command=self.ungroup, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Show/Hide Group", command=self.toggle_group_visibility, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
         tk.Button(self.sidebar, text="Save Project", command=self.save_project, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Export Profile", command=self.edit_export_profile, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="PNG Options", command=self.set_png_options, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Export All", command=self.export_all, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        tk.Button(self.sidebar, text="Memory Budget", command=self.set_memory_budget, bg="#4a4a4a", fg="white").pack(pady=5, padx=10)
+        self.memory_label = tk.Label(self.sidebar, text=self.memory.summary(), bg="#2d2d2d", fg="#b0b0b0")
+        self.memory_label.pack(pady=5, padx=10)
 
         self.canvas.bind("<ButtonPress-1>", self.on_mouse_press)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_release)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)  # Windows e macOS
+        self.canvas.bind("<Button-4>", self.on_mouse_wheel)  # Linux (X11)
+        self.canvas.bind("<Button-5>", self.on_mouse_wheel)
+        self.canvas.bind("<ButtonPress-2>", self.on_pan_start)
+        self.canvas.bind("<B2-Motion>", self.on_pan_drag)
+        self.canvas.bind("<ButtonRelease-2>", self.on_pan_end)
+        self.root.bind("<Control-0>", self.fit_view)
         self.root.bind("<Configure>", self.on_resize)
         self.root.bind("<Up>", self.move_up)
         self.root.bind("<Down>", self.move_down)
@@ -246,20 +471,27 @@ class Editor:
         self.root.bind("<plus>", self.increase_size)
         self.root.bind("<minus>", self.decrease_size)
         self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Prior>", self.raise_selected)  # Page Up
+        self.root.bind("<Next>", self.lower_selected)  # Page Down
 
         self.update_canvas()
         logger.info("Editor inicializado")
 
+    def _script_committed(self):
+        """Fim de uma transação da API: um estado no histórico e um redesenho."""
+        self.selection = [item for item in self.selection if item in self.document.current]
+        self.save_state()
+        self.update_canvas()
+
     def save_state(self):
         """Salva o estado atual no histórico."""
+        scene = self.document.snapshot()  # O(1): itens e pixels são compartilhados
         state = {
-            'images': [copy.deepcopy(img) for img in self.images],
-            'shapes': [copy.deepcopy(shape) for shape in self.shapes],
-            'selected_shape_index': self.shapes.index(self.selected_shape) if self.selected_shape in self.shapes else None
+            'scene': scene,
+            'selection_ids': [item._id for item in self.selection if item in scene]  # O(log n) cada
         }
-        self.history.append(state)
-        if len(self.history) > 10:
-            self.history.pop(0)
+        self.history.push(state)
+        self.memory.enforce()
         logger.debug("Estado salvo no histórico")
 
     def undo(self, event):
@@ -267,69 +499,139 @@ class Editor:
         logger.debug("Tentativa de desfazer ação")
         if len(self.history) > 1:
             self.history.pop()
-            previous_state = self.history[-1]
-            self.images = [copy.deepcopy(img) for img in previous_state['images']]
-            self.shapes = [copy.deepcopy(shape) for shape in previous_state['shapes']]
-            self.selected_shape = self.shapes[previous_state['selected_shape_index']] if previous_state['selected_shape_index'] is not None else None
+            previous_state = self.history.peek()
+            self.document.restore(previous_state['scene'])
+            self.selection = [self.document.current.find(item_id) for item_id in previous_state['selection_ids']]
             self.update_canvas()
             logger.info("Última ação desfeita")
         else:
             logger.info("Nenhum estado anterior para desfazer")
 
+    def _state_bytes(self, state):
+        """Estimativa de memória de um estado do histórico (itens e pixels são compartilhados)."""
+        return 2 * len(state['scene']).bit_length() * HISTORY_NODE_BYTES + HISTORY_OBJECT_BYTES
+
+    @property
+    def images(self):
+        """Camadas de imagem da cena atual (tupla; edite via `document`)."""
+        return self.document.images
+
+    @property
+    def shapes(self):
+        """Itens da cena atual em ordem de desenho (tupla; edite via `document`)."""
+        return self.document.shapes
+
+    @property
+    def selected_shape(self):
+        """Item principal da seleção (o último escolhido), ou None."""
+        return self.selection[-1] if self.selection else None
+
+    @selected_shape.setter
+    def selected_shape(self, item):
+        """Seleciona só `item` (None limpa a seleção)."""
+        self.selection = [item] if item is not None else []
+
+    def edit_selected(self):
+        """Prepara o item principal para alteração (copia se algum instantâneo o usa)."""
+        if self.selection:
+            self.selection[-1] = self.document.edit(self.selection[-1])
+        return self.selected_shape
+
+    def edit_selection(self):
+        """Prepara todos os itens selecionados para alteração, como uma única operação.
+
+        Quem chama altera os itens retornados e termina com um só save_state()
+        e um só update_canvas(): uma entrada no histórico e um redesenho só
+        dos tiles atingidos pelos itens alterados.
+        """
+        self.selection = [self.document.edit(item) for item in self.selection]
+        return self.selection
+
+    def _preview_bytes(self):
+        """Memória das prévias redimensionadas e da imagem exibida no canvas."""
+        total = sum(img_layer.preview_bytes() for img_layer in self.images if not hasattr(img_layer, "shapes"))
+        if self.display_image is not None:
+            total += self.display_image.width() * self.display_image.height() * 4
+        return total
+
+    def _release_previews(self, nbytes):
+        """Descarta prévias redimensionadas; são refeitas no próximo desenho."""
+        freed = 0
+        for img_layer in self.images:
+            if freed >= nbytes:
+                break
+            if not hasattr(img_layer, "shapes"):  # Grupos não têm prévia
+                freed += img_layer.drop_preview()
+        return freed
+
+    def set_memory_budget(self):
+        """Define o orçamento de memória (MB) compartilhado por caches e histórico."""
+        budget = simpledialog.askinteger("Orçamento de Memória", "Memória máxima em MB:",
+                                         initialvalue=self.memory.budget_bytes // MB, minvalue=64)
+        if budget is not None:
+            self.memory.set_budget(budget * MB)
+            self.memory_label.config(text=self.memory.summary())
+
     def move_up(self, event):
-        """Move o item selecionado para cima."""
-        if self.selected_shape:
-            self.selected_shape.y -= 5
+        """Move os itens selecionados para cima."""
+        if self.selection:
+            for item in self.edit_selection():
+                item.y -= 5
             self.save_state()
             self.update_canvas()
-            logger.info("Item movido para cima")
+            logger.info(f"{len(self.selection)} item(ns) movido(s) para cima")
 
     def move_down(self, event):
-        """Move o item selecionado para baixo."""
-        if self.selected_shape:
-            self.selected_shape.y += 5
+        """Move os itens selecionados para baixo."""
+        if self.selection:
+            for item in self.edit_selection():
+                item.y += 5
             self.save_state()
             self.update_canvas()
-            logger.info("Item movido para baixo")
+            logger.info(f"{len(self.selection)} item(ns) movido(s) para baixo")
 
     def move_left(self, event):
-        """Move o item selecionado para a esquerda."""
-        if self.selected_shape:
-            self.selected_shape.x -= 5
+        """Move os itens selecionados para a esquerda."""
+        if self.selection:
+            for item in self.edit_selection():
+                item.x -= 5
             self.save_state()
             self.update_canvas()
-            logger.info("Item movido para a esquerda")
+            logger.info(f"{len(self.selection)} item(ns) movido(s) para a esquerda")
 
     def move_right(self, event):
-        """Move o item selecionado para a direita."""
-        if self.selected_shape:
-            self.selected_shape.x += 5
+        """Move os itens selecionados para a direita."""
+        if self.selection:
+            for item in self.edit_selection():
+                item.x += 5
             self.save_state()
             self.update_canvas()
-            logger.info("Item movido para a direita")
+            logger.info(f"{len(self.selection)} item(ns) movido(s) para a direita")
 
     def increase_size(self, event):
-        """Aumenta o tamanho do item selecionado."""
-        if self.selected_shape:
-            if isinstance(self.selected_shape, Shape):
-                self.selected_shape.resize(self.selected_shape.width + 10, self.selected_shape.height + 10)
-            elif isinstance(self.selected_shape, TextShape):
-                self.selected_shape.resize(self.selected_shape.font_size + 5)
-            elif isinstance(self.selected_shape, ImageLayer):
-                self.selected_shape.resize(self.selected_shape.width + 10, self.selected_shape.height + 10)
+        """Aumenta o tamanho dos itens selecionados."""
+        if self.selection:
+            for shape in self.edit_selection():
+                if isinstance(shape, Shape):
+                    shape.resize(shape.width + 10, shape.height + 10)
+                elif isinstance(shape, TextShape):
+                    shape.resize(shape.font_size + 5)
+                elif isinstance(shape, ImageLayer):
+                    shape.resize(shape.width + 10, shape.height + 10)
             self.save_state()
             self.update_canvas()
             logger.info("Tamanho aumentado")
 
     def decrease_size(self, event):
-        """Diminui o tamanho do item selecionado."""
-        if self.selected_shape:
-            if isinstance(self.selected_shape, Shape):
-                self.selected_shape.resize(self.selected_shape.width - 10, self.selected_shape.height - 10)
-            elif isinstance(self.selected_shape, TextShape):
-                self.selected_shape.resize(self.selected_shape.font_size - 5)
-            elif isinstance(self.selected_shape, ImageLayer):
-                self.selected_shape.resize(self.selected_shape.width - 10, self.selected_shape.height - 10)
+        """Diminui o tamanho dos itens selecionados."""
+        if self.selection:
+            for shape in self.edit_selection():
+                if isinstance(shape, Shape):
+                    shape.resize(shape.width - 10, shape.height - 10)
+                elif isinstance(shape, TextShape):
+                    shape.resize(shape.font_size - 5)
+                elif isinstance(shape, ImageLayer):
+                    shape.resize(shape.width - 10, shape.height - 10)
             self.save_state()
             self.update_canvas()
             logger.info("Tamanho diminuído")
@@ -338,52 +640,70 @@ class Editor:
         """Carrega uma imagem como uma nova camada."""
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.png *.jpg *.jpeg")])
         if file_path:
-            img = Image.open(file_path).convert("RGBA")
+            img = self.pixel_cache.open_image(file_path, mode=None)  # Mantém o modo compacto (L, P, RGBA)
             image_layer = ImageLayer(img, file_path, x=0, y=0, opacity=100)  # Passa o file_path para ImageLayer
-            self.images.append(image_layer)
-            self.shapes.append(image_layer)
+            self.document.add(image_layer)
             self.selected_shape = image_layer
             self.save_state()
             self.update_canvas()
-            logger.info(f"Imagem carregada: {file_path}")
+            used, as_rgba = image_layer.memory_usage()
+            logger.info(f"Imagem carregada: {file_path} (modo {img.mode}, {used / 1e6:.2f} MB, "
+                        f"economia de {(as_rgba - used) / 1e6:.2f} MB frente a RGBA; "
+                        f"{len(asset_registry)} assets distintos, {asset_registry.total_bytes() / 1e6:.1f} MB)")
 
     def add_shape(self):
         """Adiciona uma forma ao canvas."""
         if self.images:
             shape = Shape(50, 50, 100, 100, fill="#0000FF", opacity=100, outline_width=1, corner_radius=0)
-            self.shapes.append(shape)
+            self.document.add(shape)
             self.selected_shape = shape
             self.save_state()
             self.update_canvas()
             logger.info("Forma adicionada")
 
+    def add_grid(self):
+        """Adiciona uma grade de marcadores como uma única coleção de formas."""
+        if self.images:
+            columns = simpledialog.askinteger("Grade", "Número de colunas:", minvalue=1, maxvalue=2000)
+            rows = simpledialog.askinteger("Grade", "Número de linhas:", minvalue=1, maxvalue=2000) if columns else None
+            if rows:
+                grid = ShapeCollection.grid(50, 50, columns, rows)
+                self.document.add(grid)
+                self.selected_shape = grid
+                self.save_state()
+                self.update_canvas()
+                logger.info(f"Grade {columns}x{rows} adicionada ({len(grid)} formas)")
+
     def add_text(self):
         """Adiciona texto ao canvas com fonte padrão, já selecionado."""
         if self.images:
             text = simpledialog.askstring("Texto", "Digite o texto:")
             if text:
                 text_shape = TextShape(50, 50, text, font_path=None, font_size=20, fill="#000000", opacity=100)
-                self.shapes.append(text_shape)
+                self.document.add(text_shape)
                 self.selected_shape = text_shape
                 self.save_state()
                 self.update_canvas()
                 logger.info(f"Texto adicionado: {text}")
 
     def set_color(self):
-        """Define a cor do item selecionado."""
-        if self.selected_shape and isinstance(self.selected_shape, (Shape, TextShape)):
+        """Define a cor dos itens selecionados que têm cor (formas, textos e coleções)."""
+        if any(isinstance(item, (Shape, TextShape, ShapeCollection)) for item in self.selection):
             color = colorchooser.askcolor(title="Escolha a cor")[1]
             if color:
-                self.selected_shape.set_fill(color)
+                for item in self.edit_selection():
+                    if isinstance(item, (Shape, TextShape, ShapeCollection)):
+                        item.set_fill(color)
                 self.save_state()
                 self.update_canvas()
 
     def set_opacity(self):
-        """Define a opacidade do item selecionado."""
-        if self.selected_shape:
+        """Define a opacidade dos itens selecionados."""
+        if self.selection:
             opacity = simpledialog.askinteger("Opacidade", "Digite a opacidade (0-100):", minvalue=0, maxvalue=100)
             if opacity is not None:
-                self.selected_shape.set_opacity(opacity)
+                for item in self.edit_selection():
+                    item.set_opacity(opacity)
                 self.save_state()
                 self.update_canvas()
 
@@ -392,7 +712,7 @@ class Editor:
         if self.selected_shape and isinstance(self.selected_shape, Shape):
             radius = simpledialog.askinteger("Raio das Bordas", "Digite o raio (0-100):", minvalue=0, maxvalue=100)
             if radius is not None:
-                self.selected_shape.set_corner_radius(radius)
+                self.edit_selected().set_corner_radius(radius)
                 self.save_state()
                 self.update_canvas()
 
@@ -401,19 +721,20 @@ class Editor:
         if self.selected_shape and isinstance(self.selected_shape, Shape):
             width = simpledialog.askinteger("Espessura do Contorno", "Digite a espessura (0-100):", minvalue=0, maxvalue=100)
             if width is not None:
-                self.selected_shape.set_outline_width(width)
+                self.edit_selected().set_outline_width(width)
                 self.save_state()
                 self.update_canvas()
 
     def set_transparency(self):
-        """Define a transparência do item selecionado ou da última imagem."""
+        """Define a transparência dos itens selecionados ou da última imagem."""
         transparency = simpledialog.askinteger("Transparência", "Digite a transparência (0-100):", minvalue=0, maxvalue=100)
         if transparency is not None:
-            if self.selected_shape:
-                self.selected_shape.set_opacity(transparency)
-                logger.info(f"Transparência do item ajustada para {transparency}")
+            if self.selection:
+                for item in self.edit_selection():
+                    item.set_opacity(transparency)
+                logger.info(f"Transparência de {len(self.selection)} item(ns) ajustada para {transparency}")
             elif self.images:
-                self.images[-1].set_opacity(transparency)
+                self.document.edit(self.images[-1]).set_opacity(transparency)
                 logger.info(f"Transparência da última imagem ajustada para {transparency}")
             self.save_state()
             self.update_canvas()
@@ -445,7 +766,7 @@ class Editor:
                 if font_path:
                     try:
                         ImageFont.truetype(font_path, size_var.get())
-                        self.selected_shape.set_font(font_path, size_var.get())
+                        self.edit_selected().set_font(font_path, size_var.get())
                         self.save_state()
                         self.update_canvas()
                         font_dialog.destroy()
@@ -453,13 +774,102 @@ class Editor:
                         logger.error(f"Erro ao carregar fonte: {e}")
                         tk.messagebox.showerror("Erro", "Fonte inválida ou não suportada.")
                 else:
-                    self.selected_shape.set_font(None, size_var.get())
+                    self.edit_selected().set_font(None, size_var.get())
                     self.save_state()
                     self.update_canvas()
                     font_dialog.destroy()
 
             tk.Button(font_dialog, text="Aplicar", command=apply_font).pack(pady=10)
 
+    def set_blend_mode(self):
+        """Define o modo de mesclagem da camada de imagem ou grupo selecionado."""
+        if isinstance(self.selected_shape, (ImageLayer, LayerGroup)):
+            modes = available_blend_modes()
+            mode = simpledialog.askstring("Modo de Mesclagem", f"Modo ({', '.join(modes)}):",
+                                          initialvalue=getattr(self.selected_shape, "blend_mode", "normal"))
+            if mode is None:
+                return
+            mode = mode.strip().lower()
+            if mode not in modes:
+                messagebox.showerror("Erro", f"Modo de mesclagem inválido: {mode}")
+                return
+            self.edit_selected().set_blend_mode(mode)
+            self.save_state()
+            self.update_canvas()
+
+    def raise_selected(self, event=None):
+        """Sobe o item selecionado uma posição na ordem de desenho.
+
+        As camadas de imagem continuam compostas abaixo das formas; a ordem
+        vale entre itens do mesmo tipo.
+        """
+        self._move_selected(1)
+
+    def lower_selected(self, event=None):
+        """Desce o item selecionado uma posição na ordem de desenho."""
+        self._move_selected(-1)
+
+    def _move_selected(self, step):
+        if self.selected_shape not in self.document.current:
+            return
+        index = self.document.current.index(self.selected_shape) + step
+        if not 0 <= index < len(self.shapes):
+            return
+        self.selected_shape = self.document.move(self.selected_shape, index)
+        self.save_state()
+        self.update_canvas()
+        logger.info(f"{self.selected_shape.__class__.__name__} movido para a posição {index + 1} da ordem de desenho")
+
+    def group_layers(self):
+        """Agrupa os itens selecionados ou, com um só, um intervalo da ordem de desenho (1 = fundo)."""
+        if not self.shapes:
+            return
+        if len(self.selection) > 1:
+            members = sorted(self.selection, key=self.document.current.index)
+            self.selected_shape = self.document.group(members, LayerGroup.from_items(members))
+            self.save_state()
+            self.update_canvas()
+            logger.info(f"Grupo criado com {len(members)} itens selecionados")
+            return
+        current = self.document.current.index(self.selected_shape) + 1 if self.selected_shape in self.document.current else len(self.shapes)
+        spec = simpledialog.askstring("Agrupar Camadas",
+                                      f"Itens a agrupar pela ordem de desenho (1-{len(self.shapes)}), ex.: 1-3:",
+                                      initialvalue=str(current))
+        if not spec:
+            return
+        try:
+            first, _, last = spec.partition("-")
+            first, last = int(first), int(last or first)
+            if not 1 <= first <= last <= len(self.shapes):
+                raise ValueError(spec)
+        except ValueError:
+            messagebox.showerror("Erro", f"Intervalo inválido: {spec}")
+            return
+        members = self.shapes[first - 1:last]
+        name = simpledialog.askstring("Agrupar Camadas", "Nome do grupo:", initialvalue="Grupo") or "Grupo"
+        self.selected_shape = self.document.group(members, LayerGroup.from_items(members, name))
+        self.save_state()
+        self.update_canvas()
+        logger.info(f"Grupo '{name}' criado com {len(members)} itens")
+
+    def ungroup(self):
+        """Desfaz o grupo selecionado, devolvendo os membros à cena."""
+        if isinstance(self.selected_shape, LayerGroup):
+            name = self.selected_shape.name
+            self.document.ungroup(self.selected_shape)
+            self.selected_shape = None
+            self.save_state()
+            self.update_canvas()
+            logger.info(f"Grupo '{name}' desfeito")
+
+    def toggle_group_visibility(self):
+        """Mostra ou esconde o grupo selecionado (continua selecionável pela caixa)."""
+        if isinstance(self.selected_shape, LayerGroup):
+            group = self.edit_selected()
+            group.set_visible(not group.visible)
+            self.save_state()
+            self.update_canvas()
+
     def save_project(self):
         """Salva o projeto em formato de imagem ou código, preservando nomes reais das imagens."""
         if not self.images:
@@ -482,209 +892,216 @@ class Editor:
             return
 
         ext = os.path.splitext(file_path)[1].lower()
+        scene = self.document.snapshot()  # Vista fixa da cena durante a exportação
 
-        # Gera a imagem composta para salvamento
-        max_width = max(img.width for img in self.images)
-        max_height = max(img.height for img in self.images)
-        base_layer = Image.new("RGBA", (max_width, max_height), (0, 0, 0, 0))
-        base_draw = ImageDraw.Draw(base_layer)
-        for img_layer in self.images:
-            img = img_layer.image.copy()
-            if img_layer.opacity < 100:
-                alpha = img.split()[3]
-                new_alpha = alpha.point(lambda p: int(p * img_layer.opacity / 100))
-                img.putalpha(new_alpha)
-            x = int(img_layer.x)
-            y = int(img_layer.y)
-            base_layer.paste(img, (x, y), img)
-
-        shape_layer = Image.new("RGBA", (max_width, max_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(shape_layer)
-        for shape in self.shapes:
-            if isinstance(shape, Shape):
-                shape.draw(draw)
-            elif isinstance(shape, TextShape):
-                shape.draw(draw, scale=1.0)
-
-        final_img = Image.alpha_composite(base_layer, shape_layer)
+        max_width, max_height = canvas_size(scene.images)
+
+        if ext in [".js", ".py", ".lua"]:
+            effects = unsupported_effects(scene.images, scene.shapes)
+            if effects:
+                # O código gerado desenha os itens sem esses efeitos
+                logger.warning(f"Exportação {ext} ignora: {', '.join(effects)}")
+                messagebox.showwarning("Aviso", f"O código exportado não reproduz: {', '.join(effects)}.\n"
+                                                "Esses itens serão desenhados sem o efeito.")
 
         if ext in [".png", ".jpg"]:
-            # Salva como imagem
-            if ext == ".jpg":
-                final_img = final_img.convert("RGB")  # Remove canal alfa para JPG
-            final_img.save(file_path)
+            # Salva como imagem; uma cena inalterada vira cópia da saída em cache
+            size = (max_width, max_height)
+            profile = self.export_profile
+            level = profile.png_compress_level
+            cache_key = scene_hash(scene.images, scene.shapes, size, f"{ext}:{level}:{profile.png_filter}")[0]
+            if self.export_cache.fetch(cache_key, file_path):
+                return
+            large = max_width * max_height >= TILED_EXPORT_MIN_PIXELS
+            if ext == ".png" and large:
+                # Canvas grande: faixas compostas em vários processos e comprimidas em
+                # seguida, sem compor a imagem inteira
+                export_png_parallel(scene.images, scene.shapes, size, file_path, level=level,
+                                    png_filter=profile.png_filter, verify=profile.verify_png)
+            else:
+                if large:
+                    final_img = render_parallel(scene.images, scene.shapes, size)
+                else:
+                    final_img = render_region(scene.images, scene.shapes, (0, 0) + size,
+                                              layer_raster=self.export_cache.layer_raster)
+                if ext == ".jpg":
+                    final_img = final_img.convert("RGB")  # Remove canal alfa para JPG
+                    final_img.save(file_path)
+                else:
+                    final_img.save(file_path, compress_level=level)
+            self.export_cache.store(cache_key, file_path)
             logger.info(f"Projeto salvo como imagem: {file_path}")
         elif ext == ".js":
-            # Salva como JavaScript (Canvas API)
-            js_code = "const canvas = document.createElement('canvas');\n"
-            js_code += f"canvas.width = {max_width};\ncanvas.height = {max_height};\n"
-            js_code += "const ctx = canvas.getContext('2d');\n\n"
-            for i, img_layer in enumerate(self.images):
-                js_code += f"// Imagem {i}: {img_layer.file_path}\n"
-                js_code += f"const img{i} = new Image();\n"
-                js_code += f"img{i}.src = '{img_layer.file_path}';\n"
-                js_code += f"ctx.globalAlpha = {img_layer.opacity / 100};\n"
-                js_code += f"ctx.drawImage(img{i}, {int(img_layer.x)}, {int(img_layer.y)}, {img_layer.width}, {img_layer.height});\n"
-            js_code += "ctx.globalAlpha = 1.0;\n\n"
-            for i, shape in enumerate(self.shapes):
-                if isinstance(shape, Shape):
-                    js_code += f"// Forma {i}\n"
-                    js_code += f"ctx.fillStyle = '{shape.fill}';\n"
-                    js_code += f"ctx.globalAlpha = {shape.opacity / 100};\n"
-                    if shape.corner_radius > 0:
-                        js_code += f"ctx.beginPath();\n"
-                        js_code += f"ctx.moveTo({int(shape.x + shape.corner_radius)}, {int(shape.y)});\n"
-                        js_code += f"ctx.arcTo({int(shape.x + shape.width)}, {int(shape.y)}, {int(shape.x + shape.width)}, {int(shape.y + shape.height)}, {shape.corner_radius});\n"
-                        js_code += f"ctx.arcTo({int(shape.x + shape.width)}, {int(shape.y + shape.height)}, {int(shape.x)}, {int(shape.y + shape.height)}, {shape.corner_radius});\n"
-                        js_code += f"ctx.arcTo({int(shape.x)}, {int(shape.y + shape.height)}, {int(shape.x)}, {int(shape.y)}, {shape.corner_radius});\n"
-                        js_code += f"ctx.arcTo({int(shape.x)}, {int(shape.y)}, {int(shape.x + shape.width)}, {int(shape.y)}, {shape.corner_radius});\n"
-                        js_code += f"ctx.closePath();\nctx.fill();\n"
-                    else:
-                        js_code += f"ctx.fillRect({int(shape.x)}, {int(shape.y)}, {shape.width}, {shape.height});\n"
-                    if shape.outline_width > 0:
-                        js_code += f"ctx.strokeStyle = 'black';\n"
-                        js_code += f"ctx.lineWidth = {shape.outline_width};\n"
-                        js_code += f"ctx.strokeRect({int(shape.x)}, {int(shape.y)}, {shape.width}, {shape.height});\n"
-                elif isinstance(shape, TextShape):
-                    js_code += f"// Texto {i}\n"
-                    js_code += f"ctx.fillStyle = '{shape.fill}';\n"
-                    js_code += f"ctx.globalAlpha = {shape.opacity / 100};\n"
-                    js_code += f"ctx.font = '{shape.font_size}px Arial'; // Substitua pela fonte real\n"
-                    js_code += f"ctx.fillText('{shape.text}', {int(shape.x)}, {int(shape.y + shape.font_size)});\n"
-            js_code += "\ndocument.body.appendChild(canvas);"
-            with open(file_path, "w") as f:
+            # Salva como JavaScript (Canvas API), com pré-carregamento das imagens
+            js_code = generate_javascript(scene.images, scene.shapes, max_width, max_height)
+            with open(file_path, "w", encoding="utf-8") as f:
                 f.write(js_code)
             logger.info(f"Projeto salvo como JavaScript: {file_path}")
         elif ext == ".py":
             # Salva como Python (PIL)
-            py_code = "from PIL import Image, ImageDraw\n\n"
-            py_code += f"img = Image.new('RGBA', ({max_width}, {max_height}), (0, 0, 0, 0))\n"
+            images, shapes = flatten_leaves(scene.images, scene.shapes)  # Grupos e coleções viram seus membros
+            py_code = "from PIL import Image, ImageDraw\n"
+            if any(getattr(img_layer, "blend_mode", "normal") != "normal" for img_layer in images):
+                # Os modos de mesclagem usam a mesma composição do editor
+                py_code += "from pileditorgui.composicao import composite_layer\n"
+            py_code += f"\nimg = Image.new('RGBA', ({max_width}, {max_height}), (0, 0, 0, 0))\n"
             py_code += "draw = ImageDraw.Draw(img)\n\n"
-            for i, img_layer in enumerate(self.images):
+            for i, img_layer in enumerate(images):
+                x, y = int(img_layer.x), int(img_layer.y)
+                blend_mode = getattr(img_layer, "blend_mode", "normal")
                 py_code += f"# Imagem {i}: {img_layer.file_path}\n"
-                py_code += f"img_layer_{i} = Image.open('{img_layer.file_path}').convert('RGBA')\n"
-                py_code += f"img_layer_{i} = img_layer_{i}.resize(({img_layer.width}, {img_layer.height}))\n"
-                py_code += f"if {img_layer.opacity} < 100:\n"
-                py_code += f"    alpha = img_layer_{i}.split()[3]\n"
-                py_code += f"    new_alpha = alpha.point(lambda p: int(p * {img_layer.opacity} / 100))\n"
-                py_code += f"    img_layer_{i}.putalpha(new_alpha)\n"
-                py_code += f"img.paste(img_layer_{i}, ({int(img_layer.x)}, {int(img_layer.y)}), img_layer_{i})\n"
-            for i, shape in enumerate(self.shapes):
-                if isinstance(shape, Shape):
+                py_code += f"img_layer_{i} = Image.open({img_layer.file_path!r}).convert('RGBA')\n"
+                py_code += f"img_layer_{i} = img_layer_{i}.resize(({img_layer.width}, {img_layer.height}), Image.Resampling.LANCZOS)\n"
+                if img_layer.opacity < 100:
+                    # Opacidade numa única passada, com a mesma tabela do editor (composicao.apply_opacity)
+                    py_code += (f"img_layer_{i} = img_layer_{i}.point(list(range(256)) * 3"
+                                f" + [int(p * {img_layer.opacity} / 100) for p in range(256)])\n")
+                if blend_mode != "normal":
+                    py_code += f"composite_layer(img, img_layer_{i}, ({x}, {y}), {blend_mode!r})\n"
+                else:
+                    # "over" com alfa pré-multiplicado; a parte fora do canvas (x ou y negativos) é descartada
+                    source = f", ({max(0, -x)}, {max(0, -y)})" if x < 0 or y < 0 else ""
+                    py_code += f"img.alpha_composite(img_layer_{i}, ({max(0, x)}, {max(0, y)}){source})\n"
+            for i, shape in enumerate(shapes):
+                if hasattr(shape, "corner_radius"):  # Shape ou retângulo de coleção
                     py_code += f"# Forma {i}\n"
                     py_code += f"draw.rectangle([{int(shape.x)}, {int(shape.y)}, {int(shape.x + shape.width)}, {int(shape.y + shape.height)}], "
-                    py_code += f"fill='{shape.fill}' + '{int(shape.opacity * 255 / 100):02x}', "
+                    py_code += f"fill='{shape.fill}' + '{opacity_alpha(shape.opacity):02x}', "
                     py_code += f"outline='black' if {shape.outline_width} > 0 else None, width={shape.outline_width})\n"
                 elif isinstance(shape, TextShape):
                     py_code += f"# Texto {i}\n"
                     py_code += f"draw.text(({int(shape.x)}, {int(shape.y)}), '{shape.text}', "
-                    py_code += f"fill='{shape.fill}' + '{int(shape.opacity * 255 / 100):02x}', font=None)  # Substitua pela fonte real\n"
+                    py_code += f"fill='{shape.fill}' + '{opacity_alpha(shape.opacity):02x}', font=None)  # Substitua pela fonte real\n"
             py_code += "\nimg.show()\nimg.save('output.png')"
             with open(file_path, "w") as f:
                 f.write(py_code)
             logger.info(f"Projeto salvo como Python: {file_path}")
         elif ext == ".lua":
-            # Salva como Lua (MTA GUI)
-            lua_code = "-- Script MTA GUI\n"
-            lua_code += "addEventHandler('onClientResourceStart', resourceRoot, function()\n"
-            lua_code += "    local screenW, screenH = guiGetScreenSize()\n"
-            for i, img_layer in enumerate(self.images):
-                # Usa apenas o nome do arquivo para MTA (sem caminho completo)
-                file_name = os.path.basename(img_layer.file_path)
-                lua_code += f"    -- Imagem {i}: {img_layer.file_path}\n"
-                lua_code += f"    local img_{i} = guiCreateStaticImage({int(img_layer.x)}, {int(img_layer.y)}, {img_layer.width}, {img_layer.height}, '{file_name}', false)\n"
-                lua_code += f"    guiSetAlpha(img_{i}, {img_layer.opacity / 100})\n"
-            for i, shape in enumerate(self.shapes):
-                if isinstance(shape, Shape):
-                    lua_code += f"    -- Forma {i}\n"
-                    lua_code += f"    local rect_{i} = guiCreateStaticImage({int(shape.x)}, {int(shape.y)}, {shape.width}, {shape.height}, ':guieditor/images/rect.png', false)\n"
-                    lua_code += f"    guiSetProperty(rect_{i}, 'ImageColours', 'tl:{shape.fill[1:]}FF tr:{shape.fill[1:]}FF bl:{shape.fill[1:]}FF br:{shape.fill[1:]}FF')\n"
-                    lua_code += f"    guiSetAlpha(rect_{i}, {shape.opacity / 100})\n"
-                elif isinstance(shape, TextShape):
-                    lua_code += f"    -- Texto {i}\n"
-                    lua_code += f"    local label_{i} = guiCreateLabel({int(shape.x)}, {int(shape.y)}, {shape.width}, {shape.height}, '{shape.text}', false)\n"
-                    lua_code += f"    guiLabelSetColor(label_{i}, {int(shape.fill[1:3], 16)}, {int(shape.fill[3:5], 16)}, {int(shape.fill[5:7], 16)})\n"
-                    lua_code += f"    guiSetAlpha(label_{i}, {shape.opacity / 100})\n"
-            lua_code += "end)"
-            with open(file_path, "w") as f:
+            # Salva como Lua (MTA): DX com render target em cache ou GUI tradicional
+            use_dx = messagebox.askyesno(
+                "Exportar Lua",
+                "Usar o backend DX (texturas únicas e render target em cache)?\n"
+                "Escolha 'Não' para gerar elementos GUI (guiCreateStaticImage)."
+            )
+            if use_dx:
+                lua_code = generate_lua_dx(scene.images, scene.shapes, max_width, max_height)
+            else:
+                lua_code = generate_lua_gui(scene.images, scene.shapes)
+            with open(file_path, "w", encoding="utf-8") as f:
                 f.write(lua_code)
             logger.info(f"Projeto salvo como Lua: {file_path}")
 
+    def edit_export_profile(self):
+        """Edita as saídas do perfil de exportação (ex.: '2x:png, 1x:png, thumb256:webp')."""
+        spec = simpledialog.askstring(
+            "Perfil de Exportação",
+            "Saídas (escala ou thumbN : png/jpg/webp), separadas por vírgula:",
+            initialvalue=self.export_profile.to_spec()
+        )
+        if spec:
+            try:
+                profile = self.export_profile
+                self.export_profile = ExportProfile.from_spec(spec, profile.png_compress_level,
+                                                              profile.png_filter, profile.verify_png)
+                self.export_profile_edited = True
+                logger.info(f"Perfil de exportação ajustado para {self.export_profile.to_spec()}")
+            except ValueError as e:
+                logger.error(f"Perfil de exportação inválido: {e}")
+                messagebox.showerror("Erro", f"Perfil inválido:\n{e}")
+
+    def set_png_options(self):
+        """Filtro e verificação dos PNGs grandes, codificados em faixas (guardados no perfil)."""
+        profile = self.export_profile
+        png_filter = simpledialog.askstring("Opções de PNG", f"Filtro das linhas ({', '.join(PNG_FILTERS)}):",
+                                            initialvalue=profile.png_filter)
+        if png_filter is None:
+            return
+        if png_filter.strip().lower() not in PNG_FILTERS:
+            messagebox.showerror("Erro", f"Filtro PNG desconhecido: {png_filter}")
+            return
+        profile.png_filter = png_filter.strip().lower()
+        profile.verify_png = messagebox.askyesno(
+            "Opções de PNG", "Reler o PNG exportado e comparar com a cena (mais lento)?")
+        self.export_profile_edited = True
+        logger.info(f"PNG em faixas: filtro {profile.png_filter}, verificação "
+                    f"{'ligada' if profile.verify_png else 'desligada'}")
+
+    def export_all(self):
+        """Exporta todas as saídas do perfil com uma única composição."""
+        if not self.images:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada para salvar.")
+            return
+        file_path = filedialog.asksaveasfilename(title="Exportar Perfil (nome base)")
+        if not file_path:
+            return
+        base_path = os.path.splitext(file_path)[0]
+        # O perfil fica salvo ao lado das saídas; reexportar o mesmo projeto reutiliza-o,
+        # a menos que ele tenha sido ajustado nesta sessão (aí o arquivo é sobrescrito)
+        profile_path = f"{base_path}.export.json"
+        if os.path.exists(profile_path):
+            if self.export_profile_edited:
+                logger.info(f"Perfil ajustado nesta sessão substitui {profile_path}")
+            else:
+                self.export_profile = ExportProfile.load(profile_path)
+                logger.info(f"Perfil de exportação carregado de {profile_path}")
+
+        scene = self.document.snapshot()
+        max_width, max_height = canvas_size(scene.images)
+        export_profile(scene.images, scene.shapes, (max_width, max_height), self.export_profile, base_path,
+                       cache=self.export_cache)
+
     def update_canvas(self):
         """Atualiza a renderização do canvas."""
         self.canvas.delete("all")
+        if hasattr(self, "memory_label"):  # O primeiro desenho acontece antes da barra lateral
+            self.memory_label.config(text=self.memory.summary())
         if not self.images:
             self.canvas.create_text(300, 300, text="Carregue uma imagem", fill="white", font=("Arial", 14))
             return
 
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
-        max_width = max(img.width for img in self.images)
-        max_height = max(img.height for img in self.images)
-        scale = min(canvas_width / max_width, canvas_height / max_height)
+        max_width, max_height = self.scene_size()
+        scale, offset_x, offset_y = self.view_transform()
         new_width = int(max_width * scale)
         new_height = int(max_height * scale)
 
-        # Camada base composta por todas as imagens
-        base_layer = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
-        base_draw = ImageDraw.Draw(base_layer)
-        for img_layer in self.images:
-            img = img_layer.image.copy()
-            if img_layer.opacity < 100:
-                alpha = img.split()[3]
-                new_alpha = alpha.point(lambda p: int(p * img_layer.opacity / 100))
-                img.putalpha(new_alpha)
-            scaled_img = img.resize((int(img_layer.width * scale), int(img_layer.height * scale)), Image.Resampling.LANCZOS)
-            base_layer.paste(scaled_img, (int(img_layer.x * scale), int(img_layer.y * scale)), scaled_img)
-
-        # Camada de formas e textos
-        shape_layer = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(shape_layer)
-        for shape in self.shapes:
-            if isinstance(shape, Shape):
-                scaled_x = int(shape.x * scale)
-                scaled_y = int(shape.y * scale)
-                scaled_width = int(shape.width * scale)
-                scaled_height = int(shape.height * scale)
-                scaled_radius = int(shape.corner_radius * scale)
-                fill_rgb = tuple(int(shape.fill[i:i+2], 16) for i in (1, 3, 5)) if shape.fill.startswith('#') else (0, 0, 255)
-                fill_rgba = fill_rgb + (int(shape.opacity * 255 / 100),)
-                if scaled_radius > 0:
-                    draw.rounded_rectangle(
-                        [scaled_x, scaled_y, scaled_x + scaled_width, scaled_y + scaled_height],
-                        radius=scaled_radius,
-                        fill=fill_rgba,
-                        outline="black" if shape.outline_width > 0 else None,
-                        width=int(shape.outline_width * scale)
-                    )
-                else:
-                    draw.rectangle(
-                        [scaled_x, scaled_y, scaled_x + scaled_width, scaled_y + scaled_height],
-                        fill=fill_rgba,
-                        outline="black" if shape.outline_width > 0 else None,
-                        width=int(shape.outline_width * scale)
-                    )
-            elif isinstance(shape, TextShape):
-                shape.draw(draw, scale)
-
-        # Composição final
-        final_img = Image.alpha_composite(base_layer, shape_layer)
-        self.display_image = ImageTk.PhotoImage(final_img)
-        offset_x = (canvas_width - new_width) // 2
-        offset_y = (canvas_height - new_height) // 2
-        self.canvas.create_image(offset_x, offset_y, image=self.display_image, anchor=tk.NW)
-
-        # Desenha handles para o item selecionado
-        if self.selected_shape:
-            bbox = self.selected_shape.get_bounding_box()
+        # Só a parte visível da cena é composta, na escala atual: o custo acompanha
+        # o tamanho da janela, não o zoom. A região vem de tiles em cache; só os
+        # expostos pelo arraste da vista ou atingidos por uma edição são refeitos.
+        visible = intersect((-offset_x, -offset_y, canvas_width - offset_x, canvas_height - offset_y),
+                            (0, 0, new_width, new_height))
+        # Durante um arraste a cena atual é desenhada sem ser congelada: os itens
+        # arrastados são copiados uma vez, no primeiro movimento, e depois
+        # alterados no lugar, com as caixas marcadas no cache de tiles (damage).
+        scene = self.document.current if self.drag_changed else self.document.snapshot()
+        self.display_image = None
+        if visible is not None:
+            final_img = self.tile_renderer.render(scene, visible, scale)
+            self.display_image = ImageTk.PhotoImage(final_img)
+            self.canvas.create_image(visible[0] + offset_x, visible[1] + offset_y,
+                                     image=self.display_image, anchor=tk.NW)
+
+        # Contorno de cada item selecionado (o contorno girado, se transformado); handles só com um único item
+        for item in self.selection:
+            bbox = item.get_bounding_box()
             scaled_bbox = (
                 int(bbox[0] * scale) + offset_x,
                 int(bbox[1] * scale) + offset_y,
                 int(bbox[2] * scale) + offset_x,
                 int(bbox[3] * scale) + offset_y
             )
-            self.canvas.create_rectangle(scaled_bbox, outline="yellow", dash=(4, 4), tags="selection")
-            if isinstance(self.selected_shape, (Shape, ImageLayer)):
+            if getattr(item, "transform", None) is not None:
+                points = [coord for x, y in corners(item) for coord in (x * scale + offset_x, y * scale + offset_y)]
+                self.canvas.create_polygon(points, outline="yellow", fill="", dash=(4, 4), tags="selection")
+            else:
+                self.canvas.create_rectangle(scaled_bbox, outline="yellow", dash=(4, 4), tags="selection")
+        if len(self.selection) == 1:
+            if isinstance(self.selected_shape, TRANSFORMABLE):
+                x, y = self.rotate_handle()
+                self.canvas.create_line(x, y, x, scaled_bbox[1], fill="white", tags="handle")
+                self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="green", outline="white", tags="handle")
+            if isinstance(self.selected_shape, (Shape, ImageLayer)) and self.selected_shape.transform is None:
                 handles = [
                     (scaled_bbox[2], scaled_bbox[3]),  # bottom_right
                     (scaled_bbox[0], scaled_bbox[3]),  # bottom_left
@@ -694,46 +1111,126 @@ class Editor:
                 for x, y in handles:
                     self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="red", outline="white", tags="handle")
 
+        # Guias de alinhamento atingidas pelo arraste
+        guide_x, guide_y = self.snap_guides
+        if guide_x is not None:
+            x = int(guide_x * scale) + offset_x
+            self.canvas.create_line(x, offset_y, x, offset_y + new_height, fill="magenta", tags="guide")
+        if guide_y is not None:
+            y = int(guide_y * scale) + offset_y
+            self.canvas.create_line(offset_x, y, offset_x + new_width, y, fill="magenta", tags="guide")
+
         logger.debug("Canvas atualizado")
 
     def on_mouse_press(self, event):
-        """Seleciona um item ou inicia redimensionamento/movimento."""
-        self.selected_shape = None
+        """Seleciona um item ou inicia redimensionamento/movimento.
+
+        Shift+clique acrescenta ou retira o item da seleção. Ctrl+arrastar, ou
+        arrastar a partir de uma área sem itens, seleciona por retângulo.
+        Arrastar um item já selecionado move a seleção inteira.
+        """
         if not self.images:
             return
+        shift = event.state & EVENT_SHIFT
+        x_orig, y_orig = self.to_scene(event.x, event.y, outside=(-1, -1))
+
+        if len(self.selection) == 1 and isinstance(self.selected_shape, TRANSFORMABLE):
+            handle_x, handle_y = self.rotate_handle()
+            if abs(event.x - handle_x) < 10 and abs(event.y - handle_y) < 10:
+                self.rotate_start = (self.pointer_angle(event), self.selected_shape.transform)
+                logger.debug("Rotação iniciada")
+                return
 
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        max_width = max(img.width for img in self.images)
-        max_height = max(img.height for img in self.images)
-        scale = min(canvas_width / max_width, canvas_height / max_height)
-        offset_x = (canvas_width - int(max_width * scale)) // 2
-        offset_y = (canvas_height - int(max_height * scale)) // 2
-        x_orig = (event.x - offset_x) / scale if offset_x <= event.x <= offset_x + int(max_width * scale) else -1
-        y_orig = (event.y - offset_y) / scale if offset_y <= event.y <= offset_y + int(max_height * scale) else -1
-
-        for shape in reversed(self.shapes):
-            bbox = shape.get_bounding_box()
-            logger.debug(f"Verificando {shape.__class__.__name__} em {bbox} contra clique em ({x_orig}, {y_orig})")
-            if bbox[0] <= x_orig <= bbox[2] and bbox[1] <= y_orig <= bbox[3]:
-                self.selected_shape = shape
-                logger.info(f"{shape.__class__.__name__} selecionado")
-                break
-
-        if self.selected_shape:
-            if isinstance(self.selected_shape, (Shape, ImageLayer)):
+        hit = None
+        if not event.state & EVENT_CONTROL:
+            for shape in reversed(self.shapes):
+                logger.debug(f"Verificando {shape.__class__.__name__} em {shape.get_bounding_box()} contra clique em ({x_orig}, {y_orig})")
+                if contains_point(shape, x_orig, y_orig):  # Itens transformados usam a geometria girada
+                    hit = shape
+                    break
+
+        if hit is None:
+            if not shift:
+                self.selection = []
+            scale, offset_x, offset_y = self.view_transform()
+            self.band_start = ((event.x - offset_x) / scale, (event.y - offset_y) / scale)
+        elif shift:
+            if hit in self.selection:
+                self.selection.remove(hit)
+            else:
+                self.selection.append(hit)
+            logger.info(f"{len(self.selection)} item(ns) selecionado(s)")
+        else:
+            if hit in self.selection:
+                self.selection.remove(hit)
+                self.selection.append(hit)  # Passa a ser o principal, sem desfazer a seleção
+            else:
+                self.selected_shape = hit
+            logger.info(f"{hit.__class__.__name__} selecionado")
+            if len(self.selection) == 1 and isinstance(hit, (Shape, ImageLayer)):
                 self.check_resize_handle(x_orig, y_orig)
                 self.is_dragging = not self.resize_handle
-            else:  # TextShape
+            else:
                 self.is_dragging = True
             self.last_x, self.last_y = x_orig, y_orig
+            self.begin_snap()
         self.update_canvas()
 
+    def begin_snap(self):
+        """Prepara o encaixe do arraste; o índice só é montado no primeiro movimento (build_snap_index)."""
+        self.snap_start = (self.document.current, [item.get_bounding_box() for item in self.selection])
+        self.snap_index = None
+        self.snap_offset = (0, 0)
+        self.snap_guides = (None, None)
+
+    def build_snap_index(self):
+        """Índice de encaixe sem a seleção, tirado do índice com todos os itens da cena.
+
+        O índice completo só é remontado (O(n log n)) quando a cena mudou por
+        outra edição; ao fim de um arraste ele recebe as novas bordas da
+        seleção (end_snap).
+        """
+        scene, boxes = self.snap_start
+        size = self.scene_size()
+        if self.snap_base is None or self.snap_base[0] is not scene or self.snap_base[1] != size:
+            self.snap_base = (scene, size, SnapIndex(scene.shapes, size))
+            logger.debug(f"Índice de encaixe com {len(self.snap_base[2])} posições por eixo")
+        self.snap_index = self.snap_base[2].without(boxes)
+        return self.snap_index
+
+    def end_snap(self):
+        """Guarda o índice da cena resultante do arraste (chamado depois de save_state)."""
+        if self.drag_changed:
+            if self.snap_index is not None and self.snap_base[1] == self.scene_size():
+                self.snap_index.add_boxes([item.get_bounding_box() for item in self.selection])
+                self.snap_base = (self.document.current, self.snap_base[1], self.snap_index)
+            else:  # Encaixe desligado ou canvas com outro tamanho: remonta no próximo arraste
+                self.snap_base = None
+        self.snap_start = None
+        self.snap_index = None
+        self.snap_guides = (None, None)
+
+    def rotate_handle(self):
+        """Posição (no canvas) do handle de rotação do item selecionado, acima do centro."""
+        scale, offset_x, offset_y = self.view_transform()
+        bbox = self.selected_shape.get_bounding_box()
+        return (bbox[0] + bbox[2]) / 2 * scale + offset_x, bbox[1] * scale + offset_y - ROTATE_HANDLE_OFFSET
+
+    def pointer_angle(self, event):
+        """Ângulo (graus, anti-horário) do ponteiro em torno do centro do item selecionado."""
+        scale, offset_x, offset_y = self.view_transform()
+        item = self.selected_shape
+        center_x = (item.x + item.width / 2) * scale + offset_x
+        center_y = (item.y + item.height / 2) * scale + offset_y
+        return math.degrees(math.atan2(center_y - event.y, event.x - center_x))
+
     def check_resize_handle(self, x, y):
         """Verifica se o clique foi em um handle de redimensionamento."""
         self.resize_handle = None
         if not self.selected_shape or not isinstance(self.selected_shape, (Shape, ImageLayer)):
             return
+        if self.selected_shape.transform is not None:
+            return  # Itens transformados só giram pelo handle ou mudam pelo diálogo
         bbox = self.selected_shape.get_bounding_box()
         handles = {
             "bottom_right": (bbox[2], bbox[3]),
@@ -748,23 +1245,37 @@ class Editor:
                 return
 
     def on_mouse_drag(self, event):
-        """Move ou redimensiona o item selecionado."""
+        """Move a seleção, redimensiona o item selecionado ou estica o retângulo de seleção.
+
+        Bordas e centros encaixam nos dos outros itens e nas guias do canvas;
+        segurar Ctrl durante o arraste desliga o encaixe. Ctrl já pressionado
+        no clique inicia a seleção por retângulo (on_mouse_press), então deve
+        ser apertado depois de o arraste começar.
+        """
+        if self.band_start is not None:
+            scale, offset_x, offset_y = self.view_transform()
+            self.canvas.delete("band")
+            self.canvas.create_rectangle(self.band_start[0] * scale + offset_x, self.band_start[1] * scale + offset_y,
+                                         event.x, event.y, outline="white", dash=(2, 2), tags="band")
+            return
         if not self.selected_shape or not self.images:
             return
+        if self.rotate_start is not None:
+            self.rotate_selected(event)
+            return
 
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        max_width = max(img.width for img in self.images)
-        max_height = max(img.height for img in self.images)
-        scale = min(canvas_width / max_width, canvas_height / max_height)
-        offset_x = (canvas_width - int(max_width * scale)) // 2
-        offset_y = (canvas_height - int(max_height * scale)) // 2
-        x_orig = (event.x - offset_x) / scale if offset_x <= event.x <= offset_x + int(max_width * scale) else self.last_x
-        y_orig = (event.y - offset_y) / scale if offset_y <= event.y <= offset_y + int(max_height * scale) else self.last_y
+        x_orig, y_orig = self.to_scene(event.x, event.y, outside=(self.last_x, self.last_y))
         dx = x_orig - self.last_x
         dy = y_orig - self.last_y
+        snapping = self.snap_start is not None and not event.state & EVENT_CONTROL
+        distance = SNAP_DISTANCE / self.view_transform()[0]
+        self.last_x, self.last_y = x_orig, y_orig
 
         if self.resize_handle and isinstance(self.selected_shape, (Shape, ImageLayer)):
+            if snapping:
+                snap_index = self.snap_index if self.snap_index is not None else self.build_snap_index()
+                x_orig, y_orig, self.snap_guides = snap_index.snap_point(x_orig, y_orig, distance)
+            self.tile_renderer.damage([self.selected_shape])
             bbox = self.selected_shape.get_bounding_box()
             if "right" in self.resize_handle:
                 width = x_orig - bbox[0]
@@ -774,20 +1285,183 @@ class Editor:
                 height = y_orig - bbox[1]
             else:
                 height = bbox[3] - bbox[1]
-            self.selected_shape.resize(int(width), int(height))
+            self.edit_selected().resize(int(width), int(height))
+            self.tile_renderer.damage([self.selected_shape])
         elif self.is_dragging:
-            self.selected_shape.x += dx
-            self.selected_shape.y += dy
-        self.last_x, self.last_y = x_orig, y_orig
-        self.save_state()
+            # O encaixe parte da posição sem ajuste, para a seleção poder sair de uma guia
+            old_x, old_y = self.snap_offset
+            if snapping:
+                box = union_box(self.selection)
+                raw = (box[0] + dx - old_x, box[1] + dy - old_y, box[2] + dx - old_x, box[3] + dy - old_y)
+                snap_index = self.snap_index if self.snap_index is not None else self.build_snap_index()
+                snap_x, snap_y, self.snap_guides = snap_index.snap_box(raw, distance)
+            else:
+                snap_x, snap_y, self.snap_guides = 0, 0, (None, None)
+            self.snap_offset = (snap_x, snap_y)
+            dx += snap_x - old_x
+            dy += snap_y - old_y
+            self.tile_renderer.damage(self.selection)
+            for shape in self.edit_selection():
+                shape.x += dx
+                shape.y += dy
+            self.tile_renderer.damage(self.selection)
+        else:
+            return
+        self.drag_changed = True
         self.update_canvas()
 
     def on_mouse_release(self, event):
-        """Finaliza o movimento ou redimensionamento."""
+        """Finaliza o movimento, o redimensionamento ou a seleção por retângulo.
+
+        O arraste inteiro vira uma única entrada no histórico.
+        """
+        if self.band_start is not None:
+            self.select_band(event)
+        if self.rotate_start is not None:
+            self.rotate_start = None
+            if self.drag_changed:
+                self.edit_selected()._draft = False  # Refaz o raster com o filtro definitivo
+                self.tile_renderer.damage([self.selected_shape])
+        if self.drag_changed:
+            self.save_state()
+        self.end_snap()
         self.is_dragging = False
+        self.drag_changed = False
         self.resize_handle = None
         self.update_canvas()
 
+    def rotate_selected(self, event):
+        """Gira o item selecionado pelo handle; Shift gira em passos de ROTATE_SNAP_DEGREES.
+
+        Durante o arraste o item é um rascunho, desenhado com filtro barato.
+        """
+        start_angle, start_transform = self.rotate_start
+        angle = self.pointer_angle(event) - start_angle
+        if event.state & EVENT_SHIFT:
+            angle = round(angle / ROTATE_SNAP_DEGREES) * ROTATE_SNAP_DEGREES
+        self.tile_renderer.damage([self.selected_shape])
+        item = self.edit_selected()
+        # Voltar ao ângulo inicial devolve a identidade (None), que usa o caminho sem transformação
+        item.transform = normalized(compose(rotation(angle), start_transform) if start_transform else rotation(angle))
+        item._draft = True
+        self.tile_renderer.damage([item])
+        self.drag_changed = True
+        self.update_canvas()
+
+    def set_transform(self):
+        """Define rotação, escala e inclinação dos itens selecionados."""
+        items = [item for item in self.selection if isinstance(item, TRANSFORMABLE)]
+        if not items:
+            messagebox.showwarning("Aviso", "Selecione uma imagem, forma ou texto!")
+            return
+        current = ", ".join(f"{value:g}" for value in to_params(items[-1].transform))
+        answer = simpledialog.askstring("Transformação", "Rotação, escala X, escala Y, inclinação (graus):",
+                                        initialvalue=current)
+        if not answer:
+            return
+        try:
+            matrix = from_params(*(float(value) for value in answer.split(",")))
+        except (TypeError, ValueError) as e:
+            messagebox.showerror("Erro", f"Transformação inválida: {e}")
+            return
+        for item in self.edit_selection():
+            if isinstance(item, TRANSFORMABLE):
+                item.transform = matrix
+        self.save_state()
+        self.update_canvas()
+        logger.info(f"Transformação ajustada para {answer}")
+
+    def toggle_clip(self):
+        """Liga ou desliga a máscara de recorte: o item só aparece onde o item abaixo tem alfa."""
+        items = [item for item in self.selection if isinstance(item, TRANSFORMABLE)]
+        if not items:
+            messagebox.showwarning("Aviso", "Selecione uma imagem, forma ou texto!")
+            return
+        clip = not items[-1].clip
+        for item in self.edit_selection():
+            if isinstance(item, TRANSFORMABLE):
+                item.clip = clip
+        self.save_state()
+        self.update_canvas()
+        logger.info(f"Máscara de recorte {'ligada' if clip else 'desligada'} em {len(items)} item(ns)")
+
+    def select_band(self, event):
+        """Acrescenta à seleção os itens inteiramente dentro do retângulo arrastado."""
+        scale, offset_x, offset_y = self.view_transform()
+        x_end, y_end = (event.x - offset_x) / scale, (event.y - offset_y) / scale
+        left, right = sorted((self.band_start[0], x_end))
+        top, bottom = sorted((self.band_start[1], y_end))
+        self.band_start = None
+        self.canvas.delete("band")
+        for item in self.shapes:
+            bbox = item.get_bounding_box()
+            if left <= bbox[0] and top <= bbox[1] and bbox[2] <= right and bbox[3] <= bottom and item not in self.selection:
+                self.selection.append(item)
+        logger.info(f"{len(self.selection)} item(ns) selecionado(s)")
+
+    def scene_size(self):
+        """Tamanho da cena: a maior largura e a maior altura das camadas de imagem (ver canvas_size)."""
+        return canvas_size(self.images)
+
+    def view_transform(self):
+        """(escala, deslocamento x, deslocamento y), com canvas = cena * escala + deslocamento."""
+        if self.zoom is not None:
+            return self.zoom, self.view_offset[0], self.view_offset[1]
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        max_width, max_height = self.scene_size()
+        scale = min(canvas_width / max_width, canvas_height / max_height)
+        return scale, (canvas_width - int(max_width * scale)) // 2, (canvas_height - int(max_height * scale)) // 2
+
+    def to_scene(self, x, y, outside):
+        """Converte um ponto do canvas para a cena; fora da cena cada eixo usa `outside`."""
+        scale, offset_x, offset_y = self.view_transform()
+        max_width, max_height = self.scene_size()
+        x_scene = (x - offset_x) / scale if offset_x <= x <= offset_x + int(max_width * scale) else outside[0]
+        y_scene = (y - offset_y) / scale if offset_y <= y <= offset_y + int(max_height * scale) else outside[1]
+        return x_scene, y_scene
+
+    def on_mouse_wheel(self, event):
+        """Aproxima ou afasta mantendo fixo o ponto da cena sob o cursor."""
+        if not self.images:
+            return
+        if event.num == 4 or event.delta > 0:
+            factor = ZOOM_STEP
+        elif event.num == 5 or event.delta < 0:
+            factor = 1 / ZOOM_STEP
+        else:
+            return
+        scale, offset_x, offset_y = self.view_transform()
+        new_scale = min(MAX_ZOOM, max(MIN_ZOOM, scale * factor))
+        scene_x = (event.x - offset_x) / scale
+        scene_y = (event.y - offset_y) / scale
+        self.zoom = new_scale
+        self.view_offset = (round(event.x - scene_x * new_scale), round(event.y - scene_y * new_scale))
+        self.update_canvas()
+        logger.debug(f"Zoom: {new_scale:.2f}x")
+
+    def on_pan_start(self, event):
+        """Inicia o arrasto da área de trabalho (botão do meio)."""
+        if not self.images:
+            return
+        scale, offset_x, offset_y = self.view_transform()
+        self.zoom = scale
+        self.view_offset = (offset_x, offset_y)
+        self.pan_start = (event.x - offset_x, event.y - offset_y)
+
+    def on_pan_drag(self, event):
+        if self.pan_start:
+            self.view_offset = (event.x - self.pan_start[0], event.y - self.pan_start[1])
+            self.update_canvas()
+
+    def on_pan_end(self, event):
+        self.pan_start = None
+
+    def fit_view(self, event=None):
+        """Volta a ajustar a cena inteira à janela (Ctrl+0)."""
+        self.zoom = None
+        self.update_canvas()
+
     def on_resize(self, event):
         """Ajusta o canvas ao redimensionar a janela."""
         self.update_canvas()
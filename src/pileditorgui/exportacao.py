@@ -0,0 +1,345 @@
+# PIL-EditorGUI - Exportação para código
+# Geradores de código a partir das camadas do editor.
+
+import json
+import logging
+import os
+
+try:
+    from .grupos import flatten_leaves
+except ImportError:  # Executado como script
+    from grupos import flatten_leaves
+
+logger = logging.getLogger(__name__)
+
+
+def unsupported_effects(images, shapes):
+    """Efeitos da cena que o código exportado não reproduz (nomes para o aviso ao usuário)."""
+    images, shapes = flatten_leaves(images, shapes)
+    items = list(images) + list(shapes)
+    effects = []
+    if any(getattr(item, "transform", None) is not None for item in items):
+        effects.append("transformações (rotação/escala)")
+    if any(getattr(item, "clip", False) for item in items):
+        effects.append("máscaras de recorte")
+    return effects
+
+
+def _js(value):
+    """Serializa um valor como literal JavaScript seguro (strings escapadas)."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def build_js_scene(images, shapes, width, height):
+    """Monta a descrição da cena usada pelo código JavaScript exportado.
+
+    Os caminhos repetidos são deduplicados em `assets`, de forma que cada
+    arquivo seja carregado e decodificado uma única vez no navegador.
+    Grupos são desfeitos em seus membros (ver flatten_leaves).
+    """
+    images, shapes = flatten_leaves(images, shapes)
+    assets = []
+    asset_index = {}
+    items = []
+    for img_layer in images:
+        if img_layer.file_path not in asset_index:
+            asset_index[img_layer.file_path] = len(assets)
+            assets.append(img_layer.file_path)
+        items.append({
+            "type": "image",
+            "asset": asset_index[img_layer.file_path],
+            "x": int(img_layer.x),
+            "y": int(img_layer.y),
+            "width": img_layer.width,
+            "height": img_layer.height,
+            "alpha": img_layer.opacity / 100,
+            "blend": getattr(img_layer, "blend_mode", "normal"),
+        })
+    for shape in shapes:
+        if hasattr(shape, "corner_radius"):  # Shape
+            items.append({
+                "type": "rect",
+                "x": int(shape.x),
+                "y": int(shape.y),
+                "width": shape.width,
+                "height": shape.height,
+                "fill": shape.fill,
+                "alpha": shape.opacity / 100,
+                "radius": shape.corner_radius,
+                "outline": shape.outline_width,
+            })
+        elif hasattr(shape, "text"):  # TextShape
+            items.append({
+                "type": "text",
+                "text": shape.text,
+                "x": int(shape.x),
+                "y": int(shape.y + shape.font_size),
+                "width": shape.width,
+                "height": shape.height,
+                "size": shape.font_size,
+                "fill": shape.fill,
+                "alpha": shape.opacity / 100,
+            })
+    return {"width": width, "height": height, "assets": assets, "items": items}
+
+
+# Runtime emitido junto com a cena. Todas as imagens são decodificadas em
+# paralelo (Promise.all + createImageBitmap) antes do primeiro desenho, e tudo
+# o que vem antes do primeiro texto é composto uma única vez num fundo estático
+# (OffscreenCanvas quando disponível). Alterar um texto só redesenha o fundo
+# em cache e os itens dinâmicos.
+_JS_RUNTIME = """\
+const canvas = document.createElement('canvas');
+canvas.width = scene.width;
+canvas.height = scene.height;
+const ctx = canvas.getContext('2d');
+
+function loadBitmap(src) {
+    const img = new Image();
+    img.src = src;
+    return img.decode().then(() => createImageBitmap(img));
+}
+
+function createLayer(width, height) {
+    if (typeof OffscreenCanvas !== 'undefined') {
+        return new OffscreenCanvas(width, height);
+    }
+    const layer = document.createElement('canvas');
+    layer.width = width;
+    layer.height = height;
+    return layer;
+}
+
+function drawItem(target, item, bitmaps) {
+    target.globalAlpha = item.alpha;
+    // Os modos de mesclagem usam os mesmos nomes do Canvas (globalCompositeOperation)
+    target.globalCompositeOperation = item.blend && item.blend !== 'normal' ? item.blend : 'source-over';
+    if (item.type === 'image') {
+        target.drawImage(bitmaps[item.asset], item.x, item.y, item.width, item.height);
+    } else if (item.type === 'rect') {
+        target.beginPath();
+        if (item.radius > 0) {
+            const r = item.radius, x = item.x, y = item.y, w = item.width, h = item.height;
+            target.moveTo(x + r, y);
+            target.arcTo(x + w, y, x + w, y + h, r);
+            target.arcTo(x + w, y + h, x, y + h, r);
+            target.arcTo(x, y + h, x, y, r);
+            target.arcTo(x, y, x + w, y, r);
+            target.closePath();
+        } else {
+            target.rect(item.x, item.y, item.width, item.height);
+        }
+        target.fillStyle = item.fill;
+        target.fill();
+        if (item.outline > 0) {
+            target.strokeStyle = 'black';
+            target.lineWidth = item.outline;
+            target.stroke();
+        }
+    } else if (item.type === 'text') {
+        target.fillStyle = item.fill;
+        target.font = item.size + 'px Arial'; // Substitua pela fonte real
+        target.fillText(item.text, item.x, item.y);
+    }
+    target.globalAlpha = 1.0;
+    target.globalCompositeOperation = 'source-over';
+}
+
+// Itens antes do primeiro texto formam o fundo estático; o resto é redesenhado.
+const firstText = scene.items.findIndex(item => item.type === 'text');
+const staticItems = firstText < 0 ? scene.items : scene.items.slice(0, firstText);
+const dynamicItems = firstText < 0 ? [] : scene.items.slice(firstText);
+
+let bitmaps = null;
+let background = null;
+
+function render() {
+    if (!background) {
+        return;
+    }
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.drawImage(background, 0, 0);
+    for (const item of dynamicItems) {
+        drawItem(ctx, item, bitmaps);
+    }
+}
+
+function setText(index, text) {
+    const texts = dynamicItems.filter(item => item.type === 'text');
+    texts[index].text = text;
+    render();
+}
+
+const ready = Promise.all(scene.assets.map(loadBitmap)).then(loaded => {
+    bitmaps = loaded;
+    background = createLayer(scene.width, scene.height);
+    const bgCtx = background.getContext('2d');
+    for (const item of staticItems) {
+        drawItem(bgCtx, item, bitmaps);
+    }
+    render();
+});
+
+document.body.appendChild(canvas);
+window.pilEditor = { canvas, scene, ready, render, setText };
+"""
+
+
+def generate_javascript(images, shapes, width, height):
+    """Gera o código JavaScript (Canvas API) do projeto."""
+    scene = build_js_scene(images, shapes, width, height)
+    js_code = "// Gerado por PIL-EditorGUI\n"
+    for i, path in enumerate(scene["assets"]):
+        js_code += f"// Imagem {i}: {path}\n"
+    js_code += f"const scene = {_js(scene)};\n\n"
+    js_code += _JS_RUNTIME
+    return js_code
+
+
+def _hex_rgb(color, default=(0, 0, 0)):
+    """Converte '#RRGGBB' em tupla RGB, com cor padrão para outros formatos."""
+    if color.startswith('#') and len(color) == 7:
+        return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+    return default
+
+
+def _lua(value):
+    """Serializa uma string como literal Lua entre aspas."""
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'"{escaped}"'
+
+
+def generate_lua_gui(images, shapes):
+    """Gera o código Lua (MTA GUI) com um elemento CEGUI por camada."""
+    images, shapes = flatten_leaves(images, shapes)
+    lua_code = "-- Script MTA GUI\n"
+    lua_code += "addEventHandler('onClientResourceStart', resourceRoot, function()\n"
+    lua_code += "    local screenW, screenH = guiGetScreenSize()\n"
+    for i, img_layer in enumerate(images):
+        # Usa apenas o nome do arquivo para MTA (sem caminho completo)
+        file_name = os.path.basename(img_layer.file_path)
+        lua_code += f"    -- Imagem {i}: {img_layer.file_path}\n"
+        lua_code += f"    local img_{i} = guiCreateStaticImage({int(img_layer.x)}, {int(img_layer.y)}, {img_layer.width}, {img_layer.height}, '{file_name}', false)\n"
+        lua_code += f"    guiSetAlpha(img_{i}, {img_layer.opacity / 100})\n"
+    for i, shape in enumerate(shapes):
+        if hasattr(shape, "corner_radius"):  # Shape
+            lua_code += f"    -- Forma {i}\n"
+            lua_code += f"    local rect_{i} = guiCreateStaticImage({int(shape.x)}, {int(shape.y)}, {shape.width}, {shape.height}, ':guieditor/images/rect.png', false)\n"
+            lua_code += f"    guiSetProperty(rect_{i}, 'ImageColours', 'tl:{shape.fill[1:]}FF tr:{shape.fill[1:]}FF bl:{shape.fill[1:]}FF br:{shape.fill[1:]}FF')\n"
+            lua_code += f"    guiSetAlpha(rect_{i}, {shape.opacity / 100})\n"
+        elif hasattr(shape, "text"):  # TextShape
+            lua_code += f"    -- Texto {i}\n"
+            lua_code += f"    local label_{i} = guiCreateLabel({int(shape.x)}, {int(shape.y)}, {shape.width}, {shape.height}, '{shape.text}', false)\n"
+            lua_code += f"    guiLabelSetColor(label_{i}, {int(shape.fill[1:3], 16)}, {int(shape.fill[3:5], 16)}, {int(shape.fill[5:7], 16)})\n"
+            lua_code += f"    guiSetAlpha(label_{i}, {shape.opacity / 100})\n"
+    lua_code += "end)"
+    return lua_code
+
+
+def _texture_names(paths):
+    """Nome no recurso MTA de cada caminho de `paths` (distintos).
+
+    O nome é o do arquivo; caminhos com o mesmo nome de arquivo levam as
+    pastas finais necessárias para distingui-los ('a/logo.png', 'b/logo.png').
+    """
+    parts = [os.path.normpath(path).replace("\\", "/").split("/") for path in paths]
+    names = []
+    for path_parts in parts:
+        depth = 1
+        while depth < len(path_parts) and any(
+                other is not path_parts and other[-depth:] == path_parts[-depth:] for other in parts):
+            depth += 1
+        names.append("/".join(path_parts[-depth:]))
+    return names
+
+
+def _lua_dx_draw(item, textures):
+    """Retorna a chamada dx* que desenha um item da cena."""
+    alpha = int(item["alpha"] * 255)
+    if item["type"] == "image":
+        return (f"dxDrawImage({item['x']}, {item['y']}, {item['width']}, {item['height']}, "
+                f"textures[{textures[item['asset']]}], 0, 0, 0, tocolor(255, 255, 255, {alpha}))")
+    r, g, b = _hex_rgb(item["fill"], (0, 0, 255) if item["type"] == "rect" else (0, 0, 0))
+    if item["type"] == "rect":
+        return f"dxDrawRectangle({item['x']}, {item['y']}, {item['width']}, {item['height']}, tocolor({r}, {g}, {b}, {alpha}))"
+    # dxDrawText usa escala relativa à fonte 'default' (~15px); substitua pela fonte real com dxCreateFont
+    scale = round(item["size"] / 15, 2)
+    return (f"dxDrawText({_lua(item['text'])}, {item['x']}, {item['y'] - item['size']}, "
+            f"{item['x'] + item['width']}, {item['y'] - item['size'] + item['height']}, tocolor({r}, {g}, {b}, {alpha}), {scale}, 'default')")
+
+
+def _lua_dx_lines(item, textures):
+    """Linhas Lua de um item; avisa (comentário e log) o que o dxDrawRectangle não desenha."""
+    lines = []
+    if item["type"] == "rect" and (item["radius"] or item["outline"]):
+        logger.warning(f"Exportação DX: retângulo em ({item['x']}, {item['y']}) sem cantos arredondados e contorno")
+        lines.append(f"-- dxDrawRectangle não tem cantos arredondados (raio {item['radius']}) nem contorno (largura {item['outline']})")
+    lines.append(_lua_dx_draw(item, textures))
+    return lines
+
+
+def generate_lua_dx(images, shapes, width, height):
+    """Gera o código Lua (MTA DX) com texturas únicas e render target em cache.
+
+    Cada arquivo distinto vira uma única `dxCreateTexture` (ver
+    _texture_names). Tudo o que vem
+    antes do primeiro texto é desenhado uma vez num `dxCreateRenderTarget`;
+    a cada frame só o alvo é copiado e os itens variáveis são desenhados.
+    O DX não tem retângulo arredondado nem contorno: esses retângulos saem
+    lisos, com um comentário no código gerado.
+    """
+    scene = build_js_scene(images, shapes, width, height)
+
+    # Uma textura por arquivo de origem (os assets já vêm deduplicados pelo caminho)
+    texture_files = _texture_names(scene["assets"])
+    textures = {i: i + 1 for i in range(len(texture_files))}  # Tabelas Lua começam em 1
+
+    first_text = next((i for i, item in enumerate(scene["items"]) if item["type"] == "text"), len(scene["items"]))
+    static_items = scene["items"][:first_text]
+    dynamic_items = scene["items"][first_text:]
+
+    lua_code = "-- Script MTA DX (render target em cache)\n"
+    lua_code += f"local SCENE_W, SCENE_H = {width}, {height}\n"
+    lua_code += "local textures = {}\n"
+    lua_code += "local target = nil\n\n"
+
+    lua_code += "local function buildTarget()\n"
+    lua_code += "    if not target then\n"
+    lua_code += "        target = dxCreateRenderTarget(SCENE_W, SCENE_H, true)\n"
+    lua_code += "    end\n"
+    lua_code += "    dxSetRenderTarget(target, true)\n"
+    lua_code += "    dxSetBlendMode('modulate_add')\n"
+    for item in static_items:
+        for line in _lua_dx_lines(item, textures):
+            lua_code += f"    {line}\n"
+    lua_code += "    dxSetBlendMode('blend')\n"
+    lua_code += "    dxSetRenderTarget()\n"
+    lua_code += "end\n\n"
+
+    lua_code += "local function drawScene()\n"
+    lua_code += "    dxSetBlendMode('add')\n"
+    lua_code += "    dxDrawImage(0, 0, SCENE_W, SCENE_H, target)\n"
+    lua_code += "    dxSetBlendMode('blend')\n"
+    for i, item in enumerate(dynamic_items):
+        if item["type"] == "text":
+            lua_code += f"    -- Texto {i}\n"
+        for line in _lua_dx_lines(item, textures):
+            lua_code += f"    {line}\n"
+    lua_code += "end\n\n"
+
+    lua_code += "addEventHandler('onClientResourceStart', resourceRoot, function()\n"
+    for i, (file_name, path) in enumerate(zip(texture_files, scene["assets"]), start=1):
+        if file_name != os.path.basename(path):
+            lua_code += f"    -- {file_name}: {path}\n"
+        lua_code += f"    textures[{i}] = dxCreateTexture({_lua(file_name)})\n"
+    lua_code += "    buildTarget()\n"
+    lua_code += "    addEventHandler('onClientRender', root, drawScene)\n"
+    lua_code += "end)\n\n"
+
+    # O conteúdo do render target é perdido ao minimizar o jogo
+    lua_code += "addEventHandler('onClientRestore', root, function(didClearRenderTargets)\n"
+    lua_code += "    if didClearRenderTargets then\n"
+    lua_code += "        buildTarget()\n"
+    lua_code += "    end\n"
+    lua_code += "end)"
+    return lua_code
@@ -0,0 +1,415 @@
+# PIL-EditorGUI - Grafo de renderização com nós memorizados
+# A cena vira um grafo: fonte (asset) -> redimensionamento -> opacidade/efeitos
+# -> escala de exibição -> posicionamento -> composição das camadas -> formas
+# -> composição final. Fora da escala 1:1 só a parte visível é reamostrada:
+# aproximado, a partir dos pixels de origem; afastado, a partir do nível da
+# pirâmide (metades sucessivas) mais próximo. Cada nó tem uma chave de conteúdo derivada dos seus
+# parâmetros e das chaves das entradas; mudar um parâmetro muda só a chave
+# desse nó e dos que dependem dele, e o resto sai da memória. Os nós são
+# avaliados sob demanda e só para a região e a escala pedidas.
+
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+import logging
+import threading
+
+try:
+    from .cache_exportacao import item_key
+    from .composicao import apply_opacity, composite_layer
+    from .mascaras import clip_bases, clip_image, draw_clipped, drawn_with_shapes, mask_key
+    from .registro_assets import bytes_per_pixel
+    from .renderizacao import _shape_box, expand_groups, intersect
+    from .transformacao import place_layer
+except ImportError:  # Executado como script
+    from cache_exportacao import item_key
+    from composicao import apply_opacity, composite_layer
+    from mascaras import clip_bases, clip_image, draw_clipped, drawn_with_shapes, mask_key
+    from registro_assets import bytes_per_pixel
+    from renderizacao import _shape_box, expand_groups, intersect
+    from transformacao import place_layer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMO_BYTES = 128 * 1024 * 1024
+
+
+class Node:
+    """Nó do grafo. Subclasses definem `params()` e `compute()`.
+
+    Nós `regional` dependem da região e da escala pedidas; os demais
+    produzem sempre o mesmo raster e são memorizados só pela chave.
+    """
+    regional = False
+    memoize = True
+
+    def __init__(self, *inputs):
+        self.inputs = inputs
+        self._key = None
+
+    @property
+    def key(self):
+        """Chave de conteúdo: tipo, parâmetros e chaves das entradas."""
+        if self._key is None:
+            self._key = (self.__class__.__name__, self.params(), tuple(node.key for node in self.inputs))
+        return self._key
+
+    def params(self):
+        return ()
+
+    def compute(self, graph, region, scale):
+        raise NotImplementedError
+
+
+class SourceNode(Node):
+    """Pixels decodificados do asset (já estão em memória; não são memorizados de novo)."""
+    memoize = False
+
+    def __init__(self, asset):
+        super().__init__()
+        self.asset = asset
+
+    def params(self):
+        return (self.asset.content_hash,)
+
+    def compute(self, graph, region, scale):
+        return self.asset.image
+
+
+class ResizeNode(Node):
+    """Raster no tamanho da camada, em RGBA."""
+    def __init__(self, source, size):
+        super().__init__(source)
+        self.size = size
+
+    def params(self):
+        return (self.size,)
+
+    def compute(self, graph, region, scale):
+        img = graph.evaluate(self.inputs[0])
+        if img.size == self.size:
+            return img if img.mode == "RGBA" else img.convert("RGBA")
+        # Assets compactos (L, P) são reamostrados em RGBA para manter o filtro LANCZOS
+        return img.convert("RGBA").resize(self.size, Image.Resampling.LANCZOS)
+
+
+class OpacityNode(Node):
+    """Multiplica o alfa pela opacidade da camada (0-100)."""
+    def __init__(self, source, opacity):
+        super().__init__(source)
+        self.opacity = opacity
+
+    def params(self):
+        return (self.opacity,)
+
+    def compute(self, graph, region, scale):
+        img = graph.evaluate(self.inputs[0])
+        return apply_opacity(img, self.opacity)
+
+
+class PyramidNode(Node):
+    """Nível `level` da pirâmide da camada: cada nível tem metade do tamanho do anterior."""
+    def __init__(self, source, level):
+        super().__init__(source)
+        self.level = level
+
+    def params(self):
+        return (self.level,)
+
+    def compute(self, graph, region, scale):
+        previous = self.inputs[0] if self.level == 1 else PyramidNode(self.inputs[0], self.level - 1)
+        return graph.evaluate(previous).reduce(2)
+
+
+def pyramid_level(source, size, target_size):
+    """Menor nível da pirâmide ainda maior ou igual a `target_size` (a origem, se nenhum)."""
+    level = 0
+    width, height = size
+    while width // 2 >= max(1, target_size[0]) and height // 2 >= max(1, target_size[1]):
+        width, height = width // 2, height // 2
+        level += 1
+    return PyramidNode(source, level) if level else source
+
+
+class ZoomNode(Node):
+    """Parte visível da camada na escala de exibição: só a região pedida é reamostrada.
+
+    A região está em coordenadas locais da camada já escalada; o custo é
+    proporcional à área visível, não ao tamanho da camada. A entrada é a
+    origem (aproximado) ou um nível da pirâmide (afastado); o resultado é o
+    mesmo recorte de reamostrar a entrada inteira.
+    """
+    regional = True
+
+    def __init__(self, source, size):
+        super().__init__(source)
+        self.size = size
+
+    def params(self):
+        return (self.size,)
+
+    def compute(self, graph, region, scale):
+        raster = graph.evaluate(self.inputs[0])
+        scale_x = raster.width / self.size[0]
+        scale_y = raster.height / self.size[1]
+        source_box = (region[0] * scale_x, region[1] * scale_y, region[2] * scale_x, region[3] * scale_y)
+        return raster.resize((region[2] - region[0], region[3] - region[1]), Image.Resampling.LANCZOS, box=source_box)
+
+
+class LayerNode(Node):
+    """Parte da camada posicionada dentro da região: (caixa, recorte) ou None.
+
+    Não é memorizado: o recorte é barato e a posição muda a cada arrasto,
+    enquanto a origem e os níveis da pirâmide continuam na memória.
+    """
+    regional = True
+    memoize = False
+
+    def __init__(self, source, x, y, width, height, blend_mode="normal"):
+        super().__init__(source)
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.blend_mode = blend_mode
+
+    def params(self):
+        return (int(self.x), int(self.y), self.width, self.height, self.blend_mode)
+
+    def compute(self, graph, region, scale):
+        x, y = int(self.x * scale), int(self.y * scale)
+        width, height = self.width, self.height
+        if scale != 1.0:
+            width, height = int(width * scale), int(height * scale)
+        box = intersect((x, y, x + width, y + height), region)
+        if box is None or width <= 0 or height <= 0:
+            return None
+        local = (box[0] - x, box[1] - y, box[2] - x, box[3] - y)
+        source = self.inputs[0]
+        if scale == 1.0:
+            return box, graph.evaluate(source).crop(local)
+        if scale < 1.0:
+            source = pyramid_level(source, (self.width, self.height), (width, height))
+        return box, graph.evaluate(ZoomNode(source, (width, height)), local, scale)
+
+
+class TransformedLayerNode(Node):
+    """Parte de uma camada com transformação afim dentro da região: (caixa, recorte) ou None.
+
+    O raster transformado vem de transformacao.transform_cache, por (versão,
+    matriz, escala); a entrada é o raster da camada com a opacidade aplicada.
+    """
+    regional = True
+    memoize = False
+
+    def __init__(self, source, layer):
+        super().__init__(source)
+        self.layer = layer
+        self.blend_mode = getattr(layer, "blend_mode", "normal")
+
+    def params(self):
+        return (int(self.layer.x), int(self.layer.y), self.layer.width, self.layer.height, self.layer.transform,
+                getattr(self.layer, "_draft", False), self.blend_mode)
+
+    def compute(self, graph, region, scale):
+        x, y, img = place_layer(self.layer, scale, lambda: graph.evaluate(self.inputs[0]))
+        box = intersect((x, y, x + img.width, y + img.height), region)
+        if box is None:
+            return None
+        return box, img.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+
+
+class ClipNode(Node):
+    """Camada posicionada recortada pelo alfa da base (ver mascaras.py).
+
+    O alfa da base vem do cache de máscaras; a chave do nó muda quando a
+    base muda de conteúdo ou de posição.
+    """
+    regional = True
+    memoize = False
+
+    def __init__(self, layer, base):
+        super().__init__(layer)
+        self.base = base
+        self.blend_mode = layer.blend_mode
+
+    def params(self):
+        return (mask_key(self.base), self.base.x, self.base.y)
+
+    def compute(self, graph, region, scale):
+        placed = graph.evaluate(self.inputs[0], region, scale)
+        if placed is None:
+            return None
+        box, img = placed
+        return box, clip_image(img, box, self.base, scale)
+
+
+class CompositeNode(Node):
+    """Camadas de imagem coladas em ordem sobre um fundo transparente."""
+    regional = True
+
+    def compute(self, graph, region, scale):
+        left, top, right, bottom = region
+        base = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        for layer in self.inputs:
+            placed = graph.evaluate(layer, region, scale)
+            if placed is None:
+                continue
+            box, img = placed
+            composite_layer(base, img, (box[0] - left, box[1] - top), layer.blend_mode)
+        return base
+
+
+class ShapesNode(Node):
+    """Formas e textos desenhados numa camada própria, só os que tocam a região.
+
+    Camadas de imagem recortadas por uma forma ou texto também vêm aqui, na
+    ordem de desenho (ver mascaras.drawn_with_shapes).
+    """
+    regional = True
+
+    def __init__(self, shapes, bases=None):
+        super().__init__()
+        self.shapes = shapes
+        self.bases = bases or {}  # id(forma recortada) -> base
+
+    def params(self):
+        clips = tuple(item_key(self.bases[id(shape)]) for shape in self.shapes if id(shape) in self.bases)
+        return tuple(item_key(shape) for shape in self.shapes) + clips
+
+    def compute(self, graph, region, scale):
+        left, top, right, bottom = region
+        layer = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        for shape in self.shapes:
+            box = _shape_box(shape, scale)
+            if intersect(box, region) is None:
+                continue
+            if hasattr(shape, "image"):
+                placed = graph.evaluate(layer_node(shape, self.bases[id(shape)]), region, scale)
+                if placed is not None:
+                    layer.alpha_composite(placed[1], (placed[0][0] - left, placed[0][1] - top))
+            elif id(shape) in self.bases:
+                draw_clipped(layer, shape, self.bases[id(shape)], region, scale, box)
+            else:
+                shape.draw(layer, draw, scale=scale, offset=(-left, -top))
+        return layer
+
+
+class FinalNode(Node):
+    """Composição final: formas e textos sobre as camadas de imagem."""
+    regional = True
+
+    def compute(self, graph, region, scale):
+        base, shapes = (graph.evaluate(node, region, scale) for node in self.inputs)
+        return Image.alpha_composite(base, shapes)
+
+
+def layer_node(img_layer, base=None):
+    """Cadeia fonte -> tamanho -> opacidade -> posição de uma camada de imagem.
+
+    Com `base`, a camada posicionada ainda é recortada pelo alfa dela.
+
+    Etapas que não alteram o raster (tamanho original, opacidade 100) ficam
+    fora da cadeia, para não memorizar a mesma imagem duas vezes.
+    """
+    size = (img_layer.width, img_layer.height)
+    node = SourceNode(img_layer.asset)
+    if size != img_layer.asset.size or img_layer.asset.image.mode != "RGBA":
+        node = ResizeNode(node, size)
+    if img_layer.opacity < 100:
+        node = OpacityNode(node, img_layer.opacity)
+    if getattr(img_layer, "transform", None) is not None:
+        node = TransformedLayerNode(node, img_layer)
+    else:
+        node = LayerNode(node, img_layer.x, img_layer.y, img_layer.width, img_layer.height,
+                         getattr(img_layer, "blend_mode", "normal"))
+    return node if base is None else ClipNode(node, base)
+
+
+def build_scene_graph(images, shapes):
+    """Monta o grafo da cena, com os grupos desfeitos; nada é renderizado até `RenderGraph.evaluate`."""
+    images, shapes = expand_groups(images, shapes)
+    bases = clip_bases(shapes)
+    composite = CompositeNode(*(layer_node(img_layer, bases.get(id(img_layer))) for img_layer in images
+                                if not drawn_with_shapes(img_layer, bases)))
+    drawn = ShapesNode(tuple(shape for shape in shapes
+                             if not hasattr(shape, "image") or drawn_with_shapes(shape, bases)), bases)
+    return FinalNode(composite, drawn)
+
+
+class _RegionPass:
+    """Avalia nós regionais sem memorizá-los; os demais passam pelo grafo.
+
+    Usado quando o chamador guarda o resultado da região (ex.: cache de
+    tiles), para não manter duas cópias de cada região na memória.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def evaluate(self, node, region=None, scale=1.0):
+        if node.regional:
+            return node.compute(self, region, scale)
+        return self.graph.evaluate(node, region, scale)
+
+
+class RenderGraph:
+    """Avalia nós sob demanda, memorizando saídas por chave (LRU limitado em bytes)."""
+    def __init__(self, max_bytes=DEFAULT_MEMO_BYTES):
+        self.max_bytes = max_bytes
+        self._memo = OrderedDict()  # chave de memória -> (imagem, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def evaluate(self, node, region=None, scale=1.0):
+        """Saída de `node` para a região e escala pedidas, calculando só o que falta."""
+        if not node.memoize:
+            return node.compute(self, region, scale)
+        memo_key = (node.key, region, scale) if node.regional else node.key
+        with self._lock:
+            entry = self._memo.get(memo_key)
+            if entry is not None:
+                self._memo.move_to_end(memo_key)
+                return entry[0]
+        output = node.compute(self, region, scale)
+        self._store(memo_key, output)
+        return output
+
+    def render(self, images, shapes, region, scale=1.0, memo_regions=True):
+        """Renderiza a região (left, top, right, bottom), em pixels de saída, da cena.
+
+        Com `memo_regions=False` só os rasters das camadas são memorizados,
+        não as composições da região.
+        """
+        evaluator = self if memo_regions else _RegionPass(self)
+        return evaluator.evaluate(build_scene_graph(images, shapes), tuple(region), scale)
+
+    def _store(self, memo_key, output):
+        nbytes = output.width * output.height * bytes_per_pixel(output.mode)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if memo_key in self._memo:
+                return
+            self._memo[memo_key] = (output, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, (_, nbytes) = self._memo.popitem(last=False)
+        self._bytes -= nbytes
+        return nbytes
+
+    def memory_usage(self):
+        return self._bytes
+
+    def release(self, nbytes):
+        """Descarta saídas menos usadas até liberar `nbytes`. Retorna o liberado."""
+        freed = 0
+        with self._lock:
+            while self._memo and freed < nbytes:
+                freed += self._evict_oldest()
+        return freed
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+            self._bytes = 0
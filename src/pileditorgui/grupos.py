@@ -0,0 +1,149 @@
+# PIL-EditorGUI - Grupos de camadas
+# Um grupo reúne camadas, formas, textos e outros grupos em coordenadas
+# locais, com opacidade, visibilidade e deslocamento próprios. Na
+# renderização o grupo é desfeito (renderizacao.expand_groups): os membros são
+# desenhados em coordenadas absolutas, com a opacidade e o modo de mesclagem
+# do grupo aplicados como ao desagrupar, as camadas na passada das imagens e
+# as formas e textos na das formas. Assim a cena sai idêntica com ou sem o
+# grupo. Os membros absolutos ficam em cache no grupo e só são refeitos
+# quando ele muda de posição, opacidade ou modo.
+#
+# O grupo não tem um raster achatado: compor os membros numa imagem só não
+# reproduz a cena desagrupada (as duas passadas e o arredondamento do "over"
+# diferem). Mover ou esconder um grupo redesenha os membros, mas só nos
+# tiles atingidos (mosaico.scene_damage). Como as camadas, os grupos ficam
+# em `images` da cena: suas camadas entram na passada das imagens.
+
+import copy
+import logging
+
+try:
+    from .cache_exportacao import _digest, item_key
+    from .colecao_formas import ShapeCollection
+    from .renderizacao import expand_groups
+except ImportError:  # Executado como script
+    from cache_exportacao import _digest, item_key
+    from colecao_formas import ShapeCollection
+    from renderizacao import expand_groups
+
+logger = logging.getLogger(__name__)
+
+
+class LayerGroup:
+    """Grupo aninhável de itens da cena.
+
+    `images` e `shapes` seguem a mesma divisão da cena: camadas de imagem
+    (incluindo subgrupos) e a ordem de desenho de todos os membros, em
+    coordenadas relativas a (x, y).
+    """
+    def __init__(self, images, shapes, x=0, y=0, opacity=100, visible=True, name="Grupo", blend_mode="normal"):
+        self.images = tuple(images)
+        self.shapes = tuple(shapes)
+        self.x = x
+        self.y = y
+        self.opacity = opacity
+        self.visible = visible
+        self.name = name
+        self.blend_mode = blend_mode
+        self.width, self.height = self._extent()
+        self._leaves = None  # (estado do grupo, (camadas, ordem de desenho), membros)
+
+    @classmethod
+    def from_items(cls, items, name="Grupo"):
+        """Agrupa `items` (em ordem de desenho) com a origem no canto da caixa que os envolve."""
+        boxes = [item.get_bounding_box() for item in items]
+        left = int(min(box[0] for box in boxes))
+        top = int(min(box[1] for box in boxes))
+        members = []
+        for item in items:
+            member = copy.copy(item)  # Camadas continuam compartilhando o asset
+            member.x -= left
+            member.y -= top
+            members.append(member)
+        images = [member for member in members if hasattr(member, "image") or hasattr(member, "shapes")]
+        return cls(images, members, x=left, y=top, name=name)
+
+    def _extent(self):
+        # +1: o ImageDraw inclui a última coluna e a última linha da caixa
+        right = max((item.get_bounding_box()[2] for item in self.shapes), default=0)
+        bottom = max((item.get_bounding_box()[3] for item in self.shapes), default=0)
+        return int(right) + 1, int(bottom) + 1
+
+    def content_hash(self):
+        """Hash dos membros (em coordenadas locais) para o cache de exportação; não muda ao mover nem ao esconder o grupo."""
+        layers = {id(item) for item in self.images}
+        members = list(self.images) + [shape for shape in self.shapes if id(shape) not in layers]
+        return _digest("group", self.width, self.height, *(item_key(item) for item in members))
+
+    def __getstate__(self):
+        """Os membros absolutos não vão para o disco; são refeitos sob demanda."""
+        state = self.__dict__.copy()
+        state["_leaves"] = None
+        return state
+
+    def ungrouped_items(self):
+        """Cópias dos membros em coordenadas absolutas: (camadas de imagem, ordem de desenho).
+
+        A opacidade do grupo é multiplicada na de cada membro e o modo de
+        mesclagem do grupo passa às camadas que usam o modo normal.
+        """
+        moved = {}
+        for member in self.shapes:
+            clone = copy.copy(member)
+            clone.x += self.x
+            clone.y += self.y
+            if self.opacity < 100:
+                clone.opacity = round(clone.opacity * self.opacity / 100)
+            if self.blend_mode != "normal" and getattr(clone, "blend_mode", None) == "normal":
+                clone.blend_mode = self.blend_mode
+            moved[id(member)] = clone
+        return [moved[id(member)] for member in self.images], [moved[id(member)] for member in self.shapes]
+
+    def leaves(self):
+        """Membros visíveis em coordenadas absolutas, com os subgrupos também desfeitos.
+
+        Retorna (camadas de imagem, ordem de desenho), como ungrouped_items.
+        O resultado fica em cache enquanto o grupo não muda: os mesmos objetos
+        a cada chamada mantêm válidas as comparações por identidade (ex.:
+        mosaico.scene_damage).
+        """
+        state = (self.x, self.y, self.opacity, self.blend_mode)
+        if self._leaves is None or self._leaves[0] != state or self._leaves[2] is not self.shapes:
+            images, shapes = expand_groups(*self.ungrouped_items())
+            self._leaves = (state, (tuple(images), tuple(shapes)), self.shapes)
+        return self._leaves[1]
+
+    def set_opacity(self, opacity):
+        self.opacity = max(0, min(100, opacity))
+        logger.info(f"Opacidade do grupo '{self.name}' ajustada para {self.opacity}")
+
+    def set_blend_mode(self, mode):
+        self.blend_mode = mode
+        logger.info(f"Modo de mesclagem do grupo '{self.name}' ajustado para {mode}")
+
+    def set_visible(self, visible):
+        self.visible = visible
+        logger.info(f"Grupo '{self.name}' {'visível' if visible else 'oculto'}")
+
+    def get_bounding_box(self):
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+
+def flatten_leaves(images, shapes):
+    """Troca cada grupo visível pelos seus membros em coordenadas absolutas.
+
+    Usado pelos exportadores de código, que desenham item a item: os
+    membros saem como na renderização (ver LayerGroup.leaves) e grupos
+    ocultos são omitidos. Coleções de formas viram retângulos avulsos. Sem
+    grupos nem coleções, retorna as listas originais.
+    """
+    images, shapes = expand_groups(images, shapes)
+    if not any(isinstance(item, ShapeCollection) for item in shapes):
+        return images, shapes
+    expanded = []
+    for item in shapes:
+        if isinstance(item, ShapeCollection):
+            expanded.extend(item.members())
+        else:
+            expanded.append(item)
+    return images, expanded
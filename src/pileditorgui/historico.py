@@ -0,0 +1,63 @@
+# PIL-EditorGUI - Histórico de desfazer
+# Pilha de instantâneos da cena (cena.Scene), que compartilham itens e pixels
+# entre si. O pickle de estados (_StatePickler) grava os assets só pelo hash;
+# é usado para enviar a cena aos processos da composição paralela.
+
+import pickle
+
+try:
+    from .registro_assets import Asset
+except ImportError:  # Executado como script
+    from registro_assets import Asset
+
+class _StatePickler(pickle.Pickler):
+    """Grava os assets por referência (hash) em vez de copiar os pixels."""
+    def __init__(self, file, assets):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.assets = assets
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Asset):
+            self.assets[obj.content_hash] = obj
+            return ("asset", obj.content_hash)
+        return None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, assets):
+        super().__init__(file)
+        self.assets = assets
+
+    def persistent_load(self, pid):
+        return self.assets[pid[1]]
+
+
+class History:
+    """Pilha de estados para desfazer, limitada em quantidade.
+
+    `estimate(state)` informa quantos bytes um estado ocupa em memória; é o
+    que o governador de memória vê em `memory_usage()`. Os estados são
+    instantâneos que compartilham itens e pixels com a cena atual, então
+    não há o que despejar: o histórico só aparece na contabilidade.
+    """
+    def __init__(self, limit=100, estimate=None):
+        self.limit = limit
+        self.estimate = estimate or (lambda state: 0)
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def push(self, state):
+        self._entries.append(state)
+        while len(self._entries) > self.limit:
+            self._entries.pop(0)
+
+    def pop(self):
+        return self._entries.pop()
+
+    def peek(self):
+        return self._entries[-1]
+
+    def memory_usage(self):
+        return sum(self.estimate(entry) for entry in self._entries)
@@ -0,0 +1,168 @@
+# PIL-EditorGUI - Máscaras de recorte
+# Um item com `clip` ligado só aparece onde o item logo abaixo dele (a base,
+# o primeiro abaixo que não está recortado) tem alfa: a foto dentro de uma
+# moldura arredondada, a textura dentro de um texto. Vários itens seguidos
+# com `clip` usam a mesma base. A base precisa ser uma camada de imagem, uma
+# forma ou um texto; sem base válida o item é desenhado sem recorte. As bases
+# são procuradas com os grupos já desfeitos (renderizacao.expand_groups).
+#
+# As formas e textos são desenhados depois de todas as camadas de imagem;
+# uma camada recortada por uma forma ou texto sai da passada das imagens e é
+# desenhada junto com as formas, logo acima da sua base.
+#
+# O canal alfa da base é rasterizado uma vez por (versão do item, escala) e
+# guardado sem a posição; em cada redesenho o recorte custa um único
+# ImageChops.multiply no canal alfa do item recortado.
+
+from collections import OrderedDict
+from PIL import Image, ImageChops, ImageDraw
+import logging
+import math
+import threading
+
+try:
+    from .composicao import apply_opacity
+    from .transformacao import local_key, place_layer
+except ImportError:  # Executado como script
+    from composicao import apply_opacity
+    from transformacao import local_key, place_layer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MASK_BYTES = 32 * 1024 * 1024
+
+
+def _maskable(item):
+    """Camadas de imagem, formas e textos podem ser base; grupos e coleções não."""
+    return not hasattr(item, "shapes") and not hasattr(item, "fills")
+
+
+def clip_bases(items):
+    """{id(item recortado): base} para `items` em ordem de desenho."""
+    bases = {}
+    base = None
+    for item in items:
+        if getattr(item, "clip", False):
+            if base is not None:
+                bases[id(item)] = base
+        else:
+            base = item if _maskable(item) else None
+    return bases
+
+
+def drawn_with_shapes(item, bases):
+    """Se a camada de imagem `item` é recortada por uma forma ou texto (e vai na passada das formas)."""
+    base = bases.get(id(item))
+    return base is not None and hasattr(item, "image") and not hasattr(base, "image")
+
+
+def mask_key(item):
+    """Versão do alfa de uma base, sem a posição."""
+    return (local_key(item), getattr(item, "transform", None), getattr(item, "_draft", False))
+
+
+def _layer_mask(item, scale):
+    """(dx, dy, alfa) de uma camada, relativo a (int(x * escala), int(y * escala))."""
+    if getattr(item, "transform", None) is not None:
+        left, top, raster = place_layer(item, scale, lambda: apply_opacity(item.image.convert("RGBA"), item.opacity))
+        return left - int(item.x * scale), top - int(item.y * scale), raster.getchannel("A")
+    image = item.image
+    size = (int(item.width * scale), int(item.height * scale))
+    if image.size != size:
+        image = image.convert("RGBA").resize(size, Image.Resampling.LANCZOS)
+    return 0, 0, apply_opacity(image.convert("RGBA"), item.opacity).getchannel("A")
+
+
+def _shape_mask(item, scale):
+    """(dx, dy, alfa) de uma forma ou texto, relativo a (floor(x * escala), floor(y * escala))."""
+    left, top, right, bottom = item.get_bounding_box()
+    margin = getattr(item, "outline_width", 0) + getattr(item, "font_size", 0) + 1
+    box = (math.floor((left - margin) * scale), math.floor((top - margin) * scale),
+           math.ceil((right + margin) * scale) + 1, math.ceil((bottom + margin) * scale) + 1)
+    local = Image.new("RGBA", (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
+    item.draw(local, ImageDraw.Draw(local), scale=scale, offset=(-box[0], -box[1]))
+    return box[0] - math.floor(item.x * scale), box[1] - math.floor(item.y * scale), local.getchannel("A")
+
+
+class MaskCache:
+    """Alfas das bases por (versão, escala), em LRU limitado em bytes."""
+    def __init__(self, max_bytes=DEFAULT_MASK_BYTES):
+        self.max_bytes = max_bytes
+        self._masks = OrderedDict()  # chave -> (dx, dy, alfa)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def mask(self, item, scale):
+        """(left, top, alfa) da base em pixels de saída."""
+        if hasattr(item, "image"):
+            origin_x, origin_y = int(item.x * scale), int(item.y * scale)
+            key = (mask_key(item), scale)
+            build = _layer_mask
+        else:
+            # O desenho arredonda as coordenadas: a parte fracionária da posição entra na chave
+            origin_x, origin_y = math.floor(item.x * scale), math.floor(item.y * scale)
+            key = (mask_key(item), scale, item.x * scale - origin_x, item.y * scale - origin_y)
+            build = _shape_mask
+        with self._lock:
+            entry = self._masks.get(key)
+            if entry is not None:
+                self._masks.move_to_end(key)
+        if entry is None:
+            entry = build(item, scale)
+            self._store(key, entry)
+        dx, dy, alpha = entry
+        return origin_x + dx, origin_y + dy, alpha
+
+    def _store(self, key, entry):
+        nbytes = entry[2].width * entry[2].height
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._masks:
+                return
+            self._masks[key] = entry
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, _, alpha) = self._masks.popitem(last=False)
+                self._bytes -= alpha.width * alpha.height
+
+    def memory_usage(self):
+        return self._bytes
+
+    def release(self, nbytes):
+        """Descarta as máscaras menos usadas até liberar `nbytes`. Retorna o liberado."""
+        freed = 0
+        with self._lock:
+            while self._masks and freed < nbytes:
+                _, (_, _, alpha) = self._masks.popitem(last=False)
+                self._bytes -= alpha.width * alpha.height
+                freed += alpha.width * alpha.height
+        return freed
+
+
+mask_cache = MaskCache()
+
+
+def clip_image(img, box, base, scale):
+    """Cópia de `img` (que cobre `box`, em pixels de saída) recortada pelo alfa de `base`."""
+    left, top, alpha = mask_cache.mask(base, scale)
+    if left <= box[0] and top <= box[1] and left + alpha.width >= box[2] and top + alpha.height >= box[3]:
+        mask = alpha.crop((box[0] - left, box[1] - top, box[2] - left, box[3] - top))
+    else:  # Fora da base o alfa é zero
+        mask = Image.new("L", img.size, 0)
+        mask.paste(alpha, (left - box[0], top - box[1]))
+    clipped = img.copy()  # A entrada pode estar memorizada no grafo
+    clipped.putalpha(ImageChops.multiply(img.getchannel("A"), mask))
+    return clipped
+
+
+def draw_clipped(layer, shape, base, region, scale, box):
+    """Desenha uma forma recortada sobre `layer` (a região), dentro de `box` (caixa da forma na saída)."""
+    left, top = max(box[0], region[0]), max(box[1], region[1])
+    right, bottom = min(box[2], region[2]), min(box[3], region[3])
+    if left >= right or top >= bottom:
+        return
+    local = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+    shape.draw(local, ImageDraw.Draw(local), scale=scale, offset=(-left, -top))
+    layer.alpha_composite(clip_image(local, (left, top, right, bottom), base, scale),
+                          (left - region[0], top - region[1]))
@@ -0,0 +1,93 @@
+# PIL-EditorGUI - Orçamento global de memória
+# Caches e histórico se registram no governador informando quanto ocupam.
+# Quando o total passa do orçamento, ele libera memória por prioridade:
+# primeiro prévias redimensionadas, depois caches de sprites. O histórico de
+# desfazer só é contabilizado: seus estados compartilham itens e pixels com a
+# cena atual, e gravá-los em disco não liberaria quase nada.
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Ordem de despejo: menor prioridade é liberada primeiro
+PRIORITY_PREVIEWS = 0
+PRIORITY_SPRITES = 1
+PRIORITY_PINNED = None  # Apenas contabilizado (ex.: assets em uso pelas camadas)
+
+MB = 1024 * 1024
+FALLBACK_BUDGET_MB = 1024
+
+
+def _budget_from_env(value):
+    """Orçamento em MB de PILEDITOR_MEMORY_MB; valor ausente ou inválido usa FALLBACK_BUDGET_MB."""
+    if value is None:
+        return FALLBACK_BUDGET_MB
+    try:
+        budget = int(value)
+        if budget <= 0:
+            raise ValueError(value)
+    except ValueError:
+        logger.warning(f"PILEDITOR_MEMORY_MB inválido ({value!r}); usando {FALLBACK_BUDGET_MB} MB")
+        return FALLBACK_BUDGET_MB
+    return budget
+
+
+DEFAULT_BUDGET_MB = _budget_from_env(os.environ.get("PILEDITOR_MEMORY_MB"))
+
+
+class MemoryGovernor:
+    """Contabiliza consumidores de memória e aplica um orçamento único."""
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_MB * MB):
+        self.budget_bytes = budget_bytes
+        self._consumers = {}  # nome -> (prioridade, função de uso, função de liberação)
+
+    def register(self, name, usage, release=None, priority=PRIORITY_PINNED):
+        """Registra um consumidor.
+
+        `usage()` retorna os bytes ocupados; `release(nbytes)` tenta liberar
+        pelo menos `nbytes` e retorna quanto liberou. Consumidores sem
+        `release` só aparecem na contabilidade.
+        """
+        self._consumers[name] = (priority, usage, release)
+
+    def unregister(self, name):
+        self._consumers.pop(name, None)
+
+    def usage(self):
+        """Bytes ocupados por consumidor."""
+        return {name: usage() for name, (_, usage, _) in self._consumers.items()}
+
+    def total(self):
+        return sum(self.usage().values())
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = max(0, int(budget_bytes))
+        logger.info(f"Orçamento de memória ajustado para {self.budget_bytes / MB:.0f} MB")
+        self.enforce()
+
+    def enforce(self):
+        """Libera memória por prioridade até o total caber no orçamento. Retorna o total final."""
+        total = self.total()
+        if total <= self.budget_bytes:
+            return total
+        evictable = sorted(
+            (priority, name, release)
+            for name, (priority, _, release) in self._consumers.items()
+            if priority is not PRIORITY_PINNED and release is not None
+        )
+        for _, name, release in evictable:
+            excess = total - self.budget_bytes
+            if excess <= 0:
+                break
+            freed = release(excess)
+            if freed:
+                logger.info(f"Memória: {freed / MB:.1f} MB liberados de '{name}'")
+            total -= freed
+        if total > self.budget_bytes:
+            logger.warning(f"Memória acima do orçamento: {total / MB:.1f} MB de {self.budget_bytes / MB:.0f} MB")
+        return total
+
+    def summary(self):
+        """Texto curto para a interface, ex.: 'Memória: 120 / 1024 MB'."""
+        return f"Memória: {self.total() / MB:.0f} / {self.budget_bytes / MB:.0f} MB"
@@ -0,0 +1,204 @@
+# PIL-EditorGUI - Renderização em tiles
+# A área de trabalho é composta como uma grade de tiles de tamanho fixo por
+# nível de zoom. Cada tile fica num cache LRU e só é descartado quando alguma
+# das caixas do que mudou entre dois instantâneos da cena (ou das marcadas
+# com damage() durante um arraste) o atinge; ao arrastar a vista, apenas os
+# tiles recém-expostos são renderizados, em paralelo.
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import logging
+import math
+import os
+import threading
+
+try:
+    from .mascaras import clip_bases
+    from .renderizacao import _shape_box, canvas_size, expand_groups
+except ImportError:  # Executado como script
+    from mascaras import clip_bases
+    from renderizacao import _shape_box, canvas_size, expand_groups
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+DEFAULT_TILE_BYTES = 128 * 1024 * 1024
+DAMAGE_MARGIN = 2  # Pixels de saída além da caixa alterada (arredondamento e filtro)
+FULL_DAMAGE = "full"
+
+
+def _item_box(item):
+    """Caixa que um item pode pintar, em coordenadas da cena."""
+    if hasattr(item, "shapes"):  # Grupo: contornos e glifos dos membros podem passar da caixa dele
+        boxes = [_item_box(member) for member in item.leaves()[1]] or [item.get_bounding_box()]
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+    if hasattr(item, "image"):
+        return item.get_bounding_box()
+    return _shape_box(item)
+
+
+def scene_damage(old, new):
+    """Caixas (escala 1:1) do que mudou entre dois instantâneos da cena.
+
+    Uma caixa por item removido, alterado ou adicionado: itens distantes
+    editados juntos não invalidam a área entre eles. Retorna None se nada
+    mudou e FULL_DAMAGE se a ordem dos itens restantes mudou.
+    Com a cópia na escrita (cena.SceneDocument), um item alterado é sempre
+    um objeto novo, então comparar identidades basta. Um item recortado
+    depende também da base: se ela foi alterada ou se outra passou a ser a
+    base (remoção, inserção ou reordenação entre os dois), a caixa dele entra
+    no dano mesmo que ele não tenha mudado.
+    """
+    if old is None:
+        return FULL_DAMAGE
+    if old is new:
+        return None
+    old_ids = {id(item) for item in old.shapes}
+    new_ids = {id(item) for item in new.shapes}
+    for old_items, new_items in ((old.images, new.images), (old.shapes, new.shapes)):
+        kept_old = [id(item) for item in old_items if id(item) in new_ids]
+        kept_new = [id(item) for item in new_items if id(item) in old_ids]
+        if kept_old != kept_new:
+            return FULL_DAMAGE
+    damage = [_item_box(item) for item in old.shapes if id(item) not in new_ids]
+    damage += [_item_box(item) for item in new.shapes if id(item) not in old_ids]
+    # Bases na ordem de desenho com os grupos desfeitos; os membros de um grupo
+    # inalterado são os mesmos objetos nos dois instantâneos (LayerGroup.leaves)
+    old_shapes, new_shapes = expand_groups((), old.shapes)[1], expand_groups((), new.shapes)[1]
+    old_bases, new_bases = clip_bases(old_shapes), clip_bases(new_shapes)
+    old_leaf_ids = {id(item) for item in old_shapes}
+    for item in new_shapes:
+        if id(item) in old_leaf_ids and old_bases.get(id(item)) is not new_bases.get(id(item)):
+            damage.append(_item_box(item))
+    return damage or None
+
+
+def scene_size(scene):
+    return canvas_size(scene.images)
+
+
+class TileRenderer:
+    """Compõe regiões da cena a partir de tiles em cache, renderizando os que faltam em paralelo."""
+    def __init__(self, graph, tile_size=TILE_SIZE, max_bytes=DEFAULT_TILE_BYTES, workers=None):
+        self.graph = graph
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()  # (escala, coluna, linha) -> tile
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._scene = None
+        self._size = None
+        self._damage = []  # Caixas marcadas por damage() para a próxima renderização
+        self._executor = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                            thread_name_prefix="pileditorgui-tiles")
+
+    def render(self, scene, region, scale):
+        """Imagem da região (em pixels de saída) de um instantâneo `scene` na escala dada."""
+        self._invalidate(scene)
+        size = self.tile_size
+        width, height = int(self._size[0] * scale), int(self._size[1] * scale)
+        columns = range(region[0] // size, (region[2] - 1) // size + 1)
+        rows = range(region[1] // size, (region[3] - 1) // size + 1)
+
+        pending = {}
+        with self._lock:
+            cached = {}
+            for row in rows:
+                for column in columns:
+                    key = (scale, column, row)
+                    if key in self._tiles:
+                        self._tiles.move_to_end(key)
+                        cached[key] = self._tiles[key]
+        for row in rows:
+            for column in columns:
+                key = (scale, column, row)
+                if key not in cached:
+                    box = (column * size, row * size, min(width, (column + 1) * size), min(height, (row + 1) * size))
+                    pending[key] = self._executor.submit(
+                        self.graph.render, scene.images, scene.shapes, box, scale, False)
+        if pending:
+            logger.debug(f"Renderizando {len(pending)} tiles (escala {scale:.2f})")
+
+        output = Image.new("RGBA", (region[2] - region[0], region[3] - region[1]), (0, 0, 0, 0))
+        for key in [(scale, column, row) for row in rows for column in columns]:
+            tile = cached[key] if key in cached else pending[key].result()
+            if key in pending:
+                self._store(key, tile)
+            output.paste(tile, (key[1] * size - region[0], key[2] * size - region[1]))
+        return output
+
+    def damage(self, items):
+        """Marca as caixas atuais de `items` como alteradas para a próxima renderização.
+
+        Para itens alterados no lugar, que continuam o mesmo objeto e por isso
+        não aparecem em scene_damage: chame antes e depois da alteração.
+        """
+        with self._lock:
+            self._damage.extend(_item_box(item) for item in items)
+
+    def _invalidate(self, scene):
+        """Descarta os tiles atingidos pelas mudanças desde o último instantâneo renderizado."""
+        size = scene_size(scene)
+        damage = FULL_DAMAGE if size != self._size else scene_damage(self._scene, scene)
+        self._scene, self._size = scene, size
+        with self._lock:
+            marked, self._damage = self._damage, []
+        if marked and damage != FULL_DAMAGE:
+            damage = (damage or []) + marked
+        if damage is None:
+            return
+        with self._lock:
+            if damage == FULL_DAMAGE:
+                self._tiles.clear()
+                self._bytes = 0
+                return
+            size = self.tile_size
+            cached = {}  # escala -> chaves em cache
+            for key in self._tiles:
+                cached.setdefault(key[0], []).append(key)
+            for scale, keys in cached.items():
+                doomed = set()
+                for box in damage:
+                    left = max(0, math.floor(box[0] * scale) - DAMAGE_MARGIN) // size
+                    top = max(0, math.floor(box[1] * scale) - DAMAGE_MARGIN) // size
+                    right = (math.ceil(box[2] * scale) + DAMAGE_MARGIN - 1) // size
+                    bottom = (math.ceil(box[3] * scale) + DAMAGE_MARGIN - 1) // size
+                    # Percorre o menor dos dois: a faixa de tiles da caixa ou os tiles em cache
+                    if (right - left + 1) * (bottom - top + 1) <= len(keys):
+                        doomed.update((scale, column, row) for row in range(top, bottom + 1)
+                                      for column in range(left, right + 1))
+                    else:
+                        doomed.update(key for key in keys if left <= key[1] <= right and top <= key[2] <= bottom)
+                for key in doomed:
+                    tile = self._tiles.pop(key, None)
+                    if tile is not None:
+                        self._bytes -= self._tile_bytes(tile)
+        logger.debug(f"Tiles invalidados por {len(damage)} áreas alteradas")
+
+    @staticmethod
+    def _tile_bytes(tile):
+        return tile.width * tile.height * 4
+
+    def _store(self, key, tile):
+        with self._lock:
+            if key in self._tiles:
+                return
+            self._tiles[key] = tile
+            self._bytes += self._tile_bytes(tile)
+            while self._bytes > self.max_bytes and self._tiles:
+                self._bytes -= self._tile_bytes(self._tiles.popitem(last=False)[1])
+
+    def memory_usage(self):
+        return self._bytes
+
+    def release(self, nbytes):
+        """Descarta os tiles menos usados até liberar `nbytes`. Retorna o liberado."""
+        freed = 0
+        with self._lock:
+            while self._tiles and freed < nbytes:
+                tile_bytes = self._tile_bytes(self._tiles.popitem(last=False)[1])
+                self._bytes -= tile_bytes
+                freed += tile_bytes
+        return freed
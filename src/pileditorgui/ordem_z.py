@@ -0,0 +1,222 @@
+# PIL-EditorGUI - Ordem de desenho persistente
+# Treap imutável ordenado pela chave de profundidade (z) de cada item, com o
+# tamanho de cada subárvore. Inserir, remover, trocar um item e achar a
+# posição de um item custam O(log n) esperados; cada operação copia só o
+# caminho até a raiz, então instantâneos antigos da cena continuam válidos e
+# compartilham o resto da árvore.
+#
+# Os itens são identificados pelo `_id` permanente, e não pela chave z: um
+# segundo treap persistente leva cada id à chave atual do item. As chaves são
+# internas e podem mudar a qualquer momento.
+#
+# As chaves são Fraction: sempre existe uma chave entre duas vizinhas, então
+# mover um item normalmente não renumera os demais. Movimentos repetidos no
+# mesmo intervalo dobram o denominador a cada vez; passado MAX_KEY_BITS, a
+# árvore é reconstruída com chaves inteiras em O(n).
+
+from fractions import Fraction
+import random
+
+MAX_KEY_BITS = 64  # Bits do denominador de uma chave antes da renumeração
+
+
+class _Node:
+    __slots__ = ("key", "item", "priority", "left", "right", "size")
+
+    def __init__(self, key, item, priority, left=None, right=None):
+        self.key = key
+        self.item = item
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.size = 1 + _size(left) + _size(right)
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _with(node, left, right):
+    return _Node(node.key, node.item, node.priority, left, right)
+
+
+def _split(node, key, inclusive=False):
+    """Divide em (chaves < key, chaves >= key); com `inclusive`, (<= key, > key)."""
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        low, high = _split(node.right, key, inclusive)
+        return _with(node, node.left, low), high
+    low, high = _split(node.left, key, inclusive)
+    return low, _with(node, high, node.right)
+
+
+def _merge(low, high):
+    """Junta duas árvores em que todas as chaves de `low` são menores."""
+    if low is None:
+        return high
+    if high is None:
+        return low
+    if low.priority > high.priority:
+        return _with(low, low.left, _merge(low.right, high))
+    return _with(high, _merge(low, high.left), high.right)
+
+
+def _insert(node, key, item):
+    low, high = _split(node, key)
+    return _merge(_merge(low, _Node(key, item, random.random())), high)
+
+
+def _delete(node, key):
+    low, rest = _split(node, key)
+    _, high = _split(rest, key, inclusive=True)
+    return _merge(low, high)
+
+
+def _replace(node, key, item):
+    if node is None:
+        raise KeyError(key)
+    if key < node.key:
+        return _with(node, _replace(node.left, key, item), node.right)
+    if node.key < key:
+        return _with(node, node.left, _replace(node.right, key, item))
+    return _Node(key, item, node.priority, node.left, node.right)
+
+
+def _find(node, key):
+    while node is not None:
+        if key < node.key:
+            node = node.left
+        elif node.key < key:
+            node = node.right
+        else:
+            return node
+    return None
+
+
+def _build(pairs, start, stop, depth=0):
+    """Árvore balanceada com `pairs` (chave, item) já ordenados, em O(n).
+
+    As prioridades caem com a profundidade, então a árvore já é um heap;
+    inserções posteriores (prioridade em [0, 1)) se misturam à raiz.
+    """
+    if start >= stop:
+        return None
+    middle = (start + stop) // 2
+    key, item = pairs[middle]
+    return _Node(key, item, random.random() - depth,
+                 _build(pairs, start, middle, depth + 1), _build(pairs, middle + 1, stop, depth + 1))
+
+
+class ZOrder:
+    """Sequência imutável de itens com `_id`, ordenada pela chave z, com acesso por posição e por id."""
+    __slots__ = ("_root", "_keys")
+
+    def __init__(self, root=None, keys=None):
+        self._root = root  # chave z -> item
+        self._keys = keys  # id do item -> chave z
+
+    @classmethod
+    def from_items(cls, items):
+        """Árvore com os itens na ordem dada, com chaves inteiras, em O(n log n) (a ordenação dos ids)."""
+        pairs = list(enumerate(items))
+        ids = sorted((item._id, key) for key, item in pairs)
+        if len(ids) != len({item_id for item_id, _ in ids}):
+            raise ValueError("Itens com o mesmo _id na ordem de desenho")
+        return cls(_build(pairs, 0, len(pairs)), _build(ids, 0, len(ids)))
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __iter__(self):
+        """Itens em ordem de desenho (do fundo para o topo)."""
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.item
+            node = node.right
+
+    def key_of(self, item_id):
+        """Chave z atual do item com `item_id`, ou None."""
+        node = _find(self._keys, item_id)
+        return node.item if node is not None else None
+
+    def find(self, item_id):
+        """Item com o id `item_id`, ou None."""
+        key = self.key_of(item_id)
+        return _find(self._root, key).item if key is not None else None
+
+    def rank(self, item_id):
+        """Posição do item com `item_id` (0 = fundo)."""
+        key = self.key_of(item_id)
+        if key is None:
+            raise KeyError(item_id)
+        node, rank = self._root, 0
+        while node is not None:
+            if key <= node.key:
+                node = node.left
+            else:
+                rank += _size(node.left) + 1
+                node = node.right
+        return rank
+
+    def insert(self, index, items):
+        """Nova ordem com `items` (ids que não estão na árvore) a partir da posição `index`."""
+        if not items:
+            return self
+        root, keys = self._root, self._keys
+        new_keys = self._keys_between(index, len(items))
+        for key, item in zip(new_keys, items):
+            if _find(keys, item._id) is not None:
+                raise ValueError(f"Id {item._id} já está na ordem de desenho")
+            root = _insert(root, key, item)
+            keys = _insert(keys, item._id, key)
+        order = ZOrder(root, keys)
+        if any(key.denominator.bit_length() > MAX_KEY_BITS for key in new_keys):
+            return ZOrder.from_items(list(order))
+        return order
+
+    def remove(self, item_id):
+        key = self.key_of(item_id)
+        if key is None:
+            raise KeyError(item_id)
+        return ZOrder(_delete(self._root, key), _delete(self._keys, item_id))
+
+    def replace(self, item):
+        """Troca o item de mesmo `_id` (que precisa existir) mantendo a posição."""
+        key = self.key_of(item._id)
+        if key is None:
+            raise KeyError(item._id)
+        return ZOrder(_replace(self._root, key, item), self._keys)
+
+    def _key_at(self, index):
+        """Chave do item na posição `index` (0 = fundo)."""
+        node = self._root
+        while True:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node.key
+            else:
+                index -= left + 1
+                node = node.right
+
+    def _keys_between(self, index, count):
+        """`count` chaves novas que ficam, em ordem, entre as posições index - 1 e index."""
+        size = len(self)
+        if not 0 <= index <= size:
+            raise IndexError(index)
+        low = self._key_at(index - 1) if index > 0 else None
+        high = self._key_at(index) if index < size else None
+        if low is None and high is None:
+            low, high = Fraction(-1), Fraction(count)
+        elif low is None:
+            low = high - count - 1
+        elif high is None:
+            high = low + count + 1
+        step = Fraction(high - low, count + 1)
+        return [low + step * (position + 1) for position in range(count)]
@@ -0,0 +1,186 @@
+# PIL-EditorGUI - Perfis de exportação multi-resolução
+# Um perfil declara as saídas desejadas (escala ou miniatura, formato). A cena
+# é composta uma única vez na maior resolução pedida; as menores são derivadas
+# por redução em pirâmide e todas as codificações rodam em paralelo.
+
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import json
+import logging
+import os
+
+try:
+    from .cache_exportacao import scene_hash
+    from .png_paralelo import PNG_FILTERS
+    from .renderizacao import render_region
+except ImportError:  # Executado como script
+    from cache_exportacao import scene_hash
+    from png_paralelo import PNG_FILTERS
+    from renderizacao import render_region
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+
+
+class ExportOutput:
+    """Uma saída do perfil: escala fixa (`scale`) ou miniatura (`max_size` em px)."""
+    def __init__(self, name, scale=1.0, max_size=None, format="png", quality=90):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação não suportado: {format}")
+        self.name = name
+        self.scale = scale
+        self.max_size = max_size
+        self.format = format
+        self.quality = quality
+
+    def resolve_scale(self, width, height):
+        """Escala efetiva para uma cena de `width` x `height`."""
+        if self.max_size:
+            return min(self.max_size / width, self.max_size / height, 1.0)
+        return self.scale
+
+    def to_dict(self):
+        return {"name": self.name, "scale": self.scale, "max_size": self.max_size,
+                "format": self.format, "quality": self.quality}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data.get("scale", 1.0), data.get("max_size"),
+                   data.get("format", "png"), data.get("quality", 90))
+
+
+class ExportProfile:
+    """Lista declarativa de saídas, salva em JSON junto com o projeto.
+
+    `png_filter` e `verify_png` valem para os PNGs grandes, codificados em
+    faixas (ver Editor.save_project): o filtro PNG das linhas e se o arquivo
+    é relido pelo Pillow e comparado com a cena.
+    """
+    def __init__(self, outputs=None, png_compress_level=6, png_filter="up", verify_png=False):
+        if png_filter not in PNG_FILTERS:
+            raise ValueError(f"Filtro PNG desconhecido: {png_filter}")
+        self.outputs = outputs or [ExportOutput("", 1.0)]
+        self.png_compress_level = png_compress_level
+        self.png_filter = png_filter
+        self.verify_png = verify_png
+
+    @classmethod
+    def default(cls):
+        """Perfil usado pelos cartões: 1x, 2x e miniatura."""
+        return cls([
+            ExportOutput("@2x", scale=2.0),
+            ExportOutput("", scale=1.0),
+            ExportOutput("_thumb256", max_size=256, format="webp", quality=80),
+        ])
+
+    def to_spec(self):
+        """Representação curta editável, ex.: '2x:png, 1x:png, thumb256:webp'."""
+        parts = []
+        for output in self.outputs:
+            size = f"thumb{output.max_size}" if output.max_size else f"{output.scale:g}x"
+            parts.append(f"{size}:{output.format}")
+        return ", ".join(parts)
+
+    @classmethod
+    def from_spec(cls, spec, png_compress_level=6, png_filter="up", verify_png=False):
+        """Cria um perfil a partir da representação curta de `to_spec` (só as saídas)."""
+        outputs = []
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            size, _, fmt = part.partition(":")
+            fmt = (fmt or "png").lower().replace("jpeg", "jpg")
+            if size.startswith("thumb"):
+                max_size = int(size[len("thumb"):] or 256)
+                outputs.append(ExportOutput(f"_thumb{max_size}", max_size=max_size, format=fmt))
+            else:
+                scale = float(size.rstrip("x"))
+                name = "" if scale == 1.0 else f"@{scale:g}x"
+                outputs.append(ExportOutput(name, scale=scale, format=fmt))
+        if not outputs:
+            raise ValueError("Perfil de exportação vazio.")
+        return cls(outputs, png_compress_level, png_filter, verify_png)
+
+    def to_dict(self):
+        return {"outputs": [output.to_dict() for output in self.outputs],
+                "png_compress_level": self.png_compress_level,
+                "png_filter": self.png_filter, "verify_png": self.verify_png}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([ExportOutput.from_dict(item) for item in data["outputs"]],
+                   data.get("png_compress_level", 6), data.get("png_filter", "up"), data.get("verify_png", False))
+
+    def save(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _downsample(image, size):
+    """Reduz `image` para `size`, usando reduce() quando o fator é inteiro."""
+    if image.size == size:
+        return image
+    factor_x, factor_y = image.width / size[0], image.height / size[1]
+    if factor_x == factor_y and factor_x == int(factor_x):
+        return image.reduce(int(factor_x))
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+
+def _encode(image, file_path, output, png_compress_level):
+    """Codifica uma saída; roda em thread (o Pillow libera o GIL ao codificar)."""
+    if output.format == "jpg":
+        image.convert("RGB").save(file_path, "JPEG", quality=output.quality)
+    elif output.format == "webp":
+        image.save(file_path, "WEBP", quality=output.quality)
+    else:
+        image.save(file_path, "PNG", compress_level=png_compress_level)
+    return file_path
+
+
+def export_profile(images, shapes, size, profile, base_path, workers=None, cache=None):
+    """Exporta todas as saídas do perfil com uma única composição.
+
+    `base_path` é o caminho sem extensão; cada saída acrescenta seu nome e a
+    extensão do formato. Com um ExportCache, uma cena inalterada vira cópia
+    das saídas já codificadas. Retorna a lista de arquivos gerados.
+    """
+    width, height = size
+    profile.save(f"{base_path}.export.json")
+    if cache is not None:
+        key = scene_hash(images, shapes, size, json.dumps(profile.to_dict(), sort_keys=True))[0]
+        paths = [f"{base_path}{output.name}.{output.format}" for output in profile.outputs]
+        if all(cache.fetch(f"{key}{output.name}", path) for output, path in zip(profile.outputs, paths)):
+            return paths
+
+    targets = []
+    for output in profile.outputs:
+        scale = output.resolve_scale(width, height)
+        target_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        targets.append((target_size, output))
+
+    # Compõe uma vez na maior resolução; cada saída menor deriva da anterior (pirâmide)
+    targets.sort(key=lambda target: target[0][0] * target[0][1], reverse=True)
+    top_size = targets[0][0]
+    current = render_region(images, shapes, (0, 0) + top_size, top_size[0] / width,
+                            cache.layer_raster if cache is not None else None)
+
+    with ThreadPoolExecutor(max_workers=workers or min(len(targets), os.cpu_count() or 1)) as executor:
+        futures = []
+        for target_size, output in targets:
+            current = _downsample(current, target_size)
+            file_path = f"{base_path}{output.name}.{output.format}"
+            futures.append(executor.submit(_encode, current, file_path, output, profile.png_compress_level))
+        paths = [future.result() for future in futures]
+
+    if cache is not None:
+        for (target_size, output), path in zip(targets, paths):
+            cache.store(f"{key}{output.name}", path)
+    logger.info(f"Perfil exportado: {', '.join(paths)}")
+    return paths
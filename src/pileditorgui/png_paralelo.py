@@ -0,0 +1,150 @@
+# PIL-EditorGUI - Codificação PNG paralela
+# Divide a imagem em faixas de linhas e comprime cada faixa em uma thread
+# (estilo pigz). As faixas viram blocos deflate concatenados num único fluxo
+# zlib válido, então o arquivo final é um PNG comum. As exportações em faixas
+# (renderizacao.export_png_tiled, composicao_processos.export_png_parallel)
+# escolhem o filtro e podem reler o arquivo para verificação (verify_png).
+
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageChops
+import logging
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Tipo de cor PNG e bytes por pixel para os modos suportados
+PNG_COLOR_TYPES = {"L": (0, 1), "RGB": (2, 3), "LA": (4, 2), "RGBA": (6, 4)}
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2}
+ADLER_BASE = 65521
+WINDOW_SIZE = 32768  # Janela do deflate, usada como dicionário da faixa seguinte
+
+
+def adler32_combine(adler1, adler2, len2):
+    """Combina os Adler-32 de dois blocos consecutivos (como zlib.adler32_combine)."""
+    rem = len2 % ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = (rem * sum1) % ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xFFFF) + ADLER_BASE - 1) % ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - rem) % ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def _chunk(chunk_type, data):
+    """Monta um chunk PNG (tamanho, tipo, dados e CRC)."""
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def _filter_stripe(stripe, previous_row, png_filter):
+    """Aplica o filtro PNG à faixa e devolve os bytes com o byte de filtro por linha.
+
+    Os filtros 'sub' e 'up' são calculados com ImageChops.subtract_modulo sobre
+    a faixa deslocada, sem laço em Python por pixel.
+    """
+    width, height = stripe.size
+    if png_filter == "sub":
+        shifted = Image.new(stripe.mode, stripe.size)
+        shifted.paste(stripe.crop((0, 0, width - 1, height)), (1, 0))
+        stripe = ImageChops.subtract_modulo(stripe, shifted)
+    elif png_filter == "up":
+        shifted = Image.new(stripe.mode, stripe.size)
+        if previous_row is not None:
+            shifted.paste(previous_row, (0, 0))
+        shifted.paste(stripe.crop((0, 0, width, height - 1)), (0, 1))
+        stripe = ImageChops.subtract_modulo(stripe, shifted)
+
+    stride = width * PNG_COLOR_TYPES[stripe.mode][1]
+    raw = stripe.tobytes()
+    filter_byte = bytes([PNG_FILTERS[png_filter]])
+    rows = [raw[i:i + stride] for i in range(0, len(raw), stride)]
+    return filter_byte + filter_byte.join(rows)
+
+
+def _deflate_stripe(data, level, zdict, last):
+    """Comprime uma faixa como deflate bruto; roda nas threads (zlib libera o GIL)."""
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    # Z_SYNC_FLUSH alinha o fim do bloco em byte para a próxima faixa ser concatenada
+    compressed = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return compressed, zlib.adler32(data), len(data)
+
+
+def write_png_stripes(fp, size, mode, stripes, level=6, workers=None, png_filter="up", primed=True):
+    """Escreve um PNG a partir de um iterável de faixas horizontais (imagens de largura total).
+
+    As faixas são filtradas na thread principal e comprimidas em paralelo. No
+    máximo `2 * workers` faixas ficam em memória ao mesmo tempo, então quem
+    gera as faixas sob demanda mantém o uso de memória limitado.
+
+    Com `primed=True`, cada faixa usa os últimos 32 KB da anterior como
+    dicionário (como o pigz), mantendo a taxa de compressão próxima do
+    codificador sequencial. Com `primed=False`, as faixas são independentes.
+    """
+    if mode not in PNG_COLOR_TYPES:
+        raise ValueError(f"Modo {mode} não suportado pelo codificador PNG paralelo.")
+    if png_filter not in PNG_FILTERS:
+        raise ValueError(f"Filtro PNG desconhecido: {png_filter}")
+    width, height = size
+    workers = workers or os.cpu_count() or 1
+    color_type = PNG_COLOR_TYPES[mode][0]
+
+    fp.write(PNG_SIGNATURE)
+    fp.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)))
+    # Cabeçalho zlib (deflate, janela de 32 KB); o Adler-32 vai no último IDAT
+    fp.write(_chunk(b"IDAT", b"\x78\x9c"))
+
+    adler = 1
+    rows_done = 0
+    pending = []
+    previous_row = None
+    zdict = None
+
+    def flush_one():
+        nonlocal adler
+        compressed, stripe_adler, length = pending.pop(0).result()
+        adler = adler32_combine(adler, stripe_adler, length)
+        if compressed:
+            fp.write(_chunk(b"IDAT", compressed))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for stripe in stripes:
+            if stripe.mode != mode or stripe.width != width:
+                raise ValueError("Todas as faixas devem ter o modo e a largura da imagem.")
+            rows_done += stripe.height
+            data = _filter_stripe(stripe, previous_row, png_filter)
+            previous_row = stripe.crop((0, stripe.height - 1, width, stripe.height))
+            last = rows_done >= height
+            pending.append(executor.submit(_deflate_stripe, data, level, zdict if primed else None, last))
+            zdict = data[-WINDOW_SIZE:]
+            while len(pending) > 2 * workers:
+                flush_one()
+        while pending:
+            flush_one()
+
+    if rows_done != height:
+        raise ValueError(f"Faixas somam {rows_done} linhas, esperado {height}.")
+    fp.write(_chunk(b"IDAT", struct.pack(">I", adler)))
+    fp.write(_chunk(b"IEND", b""))
+
+
+def verify_png(file_path, stripes):
+    """Relê o PNG com o Pillow e confirma que os pixels são idênticos às `stripes` (em ordem).
+
+    O Pillow decodifica o arquivo inteiro: a verificação usa a memória de
+    uma imagem do tamanho do canvas, ao contrário da escrita em faixas.
+    """
+    with Image.open(file_path) as saved:
+        saved.load()
+        top = 0
+        for stripe in stripes:
+            region = saved.crop((0, top, saved.width, top + stripe.height))
+            if saved.mode != stripe.mode or saved.width != stripe.width or region.tobytes() != stripe.tobytes():
+                raise ValueError(f"Verificação do PNG falhou: {file_path} difere nas linhas {top} a {top + stripe.height}.")
+            top += stripe.height
+        if top != saved.height:
+            raise ValueError(f"Verificação do PNG falhou: {file_path} tem {saved.height} linhas, esperado {top}.")
+    logger.info(f"PNG verificado: {file_path}")
@@ -0,0 +1,124 @@
+# PIL-EditorGUI - Registro de assets (flyweight)
+# Cada imagem decodificada distinta existe uma única vez, identificada pelo
+# hash do conteúdo. As camadas guardam só a referência ao asset mais sua
+# posição, tamanho e opacidade; a memória cresce com o número de assets
+# distintos, não com o número de camadas.
+
+from PIL import Image, ImageChops
+import logging
+import threading
+import weakref
+
+try:
+    from .cache_exportacao import hash_image
+except ImportError:  # Executado como script
+    from cache_exportacao import hash_image
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional; sem ele a paleta é montada com máscaras do Pillow
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Bytes por pixel na memória do Pillow (RGB e LA também ocupam 4 bytes)
+BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "I;16": 2}
+
+
+def bytes_per_pixel(mode):
+    return BYTES_PER_PIXEL.get(mode, 4)
+
+
+def _palette_from_colors(rgba, colors):
+    """Converte RGBA com até 256 cores para P com paleta RGBA, sem perda."""
+    if np is not None:
+        packed = np.asarray(rgba).view(np.uint32).reshape(-1)
+        unique, indices = np.unique(packed, return_inverse=True)
+        paletted = Image.frombytes("P", rgba.size, indices.astype(np.uint8).tobytes())
+        paletted.putpalette(unique.view(np.uint8).tobytes(), rawmode="RGBA")
+        return paletted
+
+    # Cor mais frequente como fundo (índice 0); as demais são pintadas por máscara
+    colors = sorted(colors, reverse=True)
+    bands = rgba.split()
+    paletted = Image.new("P", rgba.size, 0)
+    palette = []
+    for index, (_, color) in enumerate(colors):
+        palette.extend(color)
+        if index == 0:
+            continue
+        mask = None
+        for band, value in zip(bands, color):
+            band_mask = band.point(lambda p, value=value: 255 if p == value else 0)
+            mask = band_mask if mask is None else ImageChops.multiply(mask, band_mask)
+        paletted.paste(index, (0, 0) + rgba.size, mask)
+    paletted.putpalette(palette, rawmode="RGBA")
+    return paletted
+
+
+def compact_image(img):
+    """Retorna a imagem no modo mais compacto que a representa sem perda.
+
+    Tons de cinza opacos viram L; imagens com até 256 cores RGBA distintas
+    (rótulos de texto, carimbos) viram P com paleta RGBA. O resto fica RGBA.
+    """
+    if img.mode in ("1", "L"):
+        return img.convert("L")
+    rgba = img if img.mode == "RGBA" else img.convert("RGBA")
+    red, green, blue, alpha = rgba.split()
+    if alpha.getextrema() == (255, 255) and ImageChops.difference(red, green).getbbox() is None \
+            and ImageChops.difference(green, blue).getbbox() is None:
+        return red
+    colors = rgba.getcolors(256)
+    if colors is not None:
+        return _palette_from_colors(rgba, colors)
+    return rgba
+
+
+class Asset:
+    """Imagem decodificada compartilhada. Nunca deve ser alterada no lugar."""
+    def __init__(self, image, content_hash):
+        self.image = image
+        self.content_hash = content_hash
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def nbytes(self):
+        return self.image.width * self.image.height * bytes_per_pixel(self.image.mode)
+
+    @property
+    def rgba_nbytes(self):
+        """Memória que o mesmo asset ocuparia se fosse mantido em RGBA."""
+        return self.image.width * self.image.height * 4
+
+
+class AssetRegistry:
+    """Mantém um Asset por conteúdo distinto enquanto alguma camada o referenciar."""
+    def __init__(self):
+        self._assets = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def acquire(self, image, content_hash=None):
+        """Retorna o Asset com os mesmos pixels de `image`, registrando-o se for novo."""
+        content_hash = content_hash or hash_image(image)
+        with self._lock:
+            asset = self._assets.get(content_hash)
+            if asset is None:
+                asset = Asset(image, content_hash)
+                self._assets[content_hash] = asset
+                logger.debug(f"Asset registrado: {content_hash[:12]} ({image.width}x{image.height})")
+            return asset
+
+    def __len__(self):
+        return len(self._assets)
+
+    def total_bytes(self):
+        """Memória ocupada pelos pixels dos assets distintos vivos."""
+        return sum(asset.nbytes for asset in list(self._assets.values()))
+
+
+# Registro padrão compartilhado por todas as camadas do processo
+asset_registry = AssetRegistry()
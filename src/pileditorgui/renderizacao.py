@@ -0,0 +1,197 @@
+# PIL-EditorGUI - Renderização por regiões
+# Compõe apenas uma região retangular da cena, usando somente as camadas e
+# formas que a interceptam. Base da exportação em faixas com memória limitada.
+#
+# Grupos são desfeitos antes da composição (ver expand_groups): a cena sai
+# igual, pixel a pixel, à cena com os grupos desfeitos.
+
+from PIL import Image, ImageDraw
+import logging
+
+try:
+    from .composicao import apply_opacity, composite_layer
+    from .mascaras import clip_bases, clip_image, draw_clipped, drawn_with_shapes
+    from .png_paralelo import verify_png, write_png_stripes
+    from .transformacao import place_layer
+except ImportError:  # Executado como script
+    from composicao import apply_opacity, composite_layer
+    from mascaras import clip_bases, clip_image, draw_clipped, drawn_with_shapes
+    from png_paralelo import verify_png, write_png_stripes
+    from transformacao import place_layer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRIPE_HEIGHT = 256
+
+
+def intersect(box_a, box_b):
+    """Interseção de duas caixas (left, top, right, bottom), ou None se vazia."""
+    left = max(box_a[0], box_b[0])
+    top = max(box_a[1], box_b[1])
+    right = min(box_a[2], box_b[2])
+    bottom = min(box_a[3], box_b[3])
+    if left >= right or top >= bottom:
+        return None
+    return (left, top, right, bottom)
+
+
+def expand_groups(images, shapes):
+    """Troca cada grupo visível pelos seus membros em coordenadas absolutas (ver LayerGroup.leaves).
+
+    As camadas dos grupos continuam na passada das imagens e as formas e
+    textos na passada das formas, na mesma ordem de desenho que teriam com o
+    grupo desfeito. Sem grupos, retorna as listas originais.
+    """
+    if not any(hasattr(item, "shapes") for item in shapes) and not any(hasattr(item, "shapes") for item in images):
+        return images, shapes
+    return _expand_groups(images, 0), _expand_groups(shapes, 1)
+
+
+def _expand_groups(items, part):
+    expanded = []
+    for item in items:
+        if not hasattr(item, "shapes"):
+            expanded.append(item)
+        elif getattr(item, "visible", True):
+            expanded.extend(item.leaves()[part])
+    return expanded
+
+
+def canvas_size(images):
+    """Tamanho da cena: a maior largura e a maior altura das camadas de imagem.
+
+    Grupos (mesmo ocultos) contam pelas camadas que contêm, não pela própria
+    caixa: agrupar ou esconder não muda o canvas.
+    """
+    width = height = 0
+    for item in images:
+        item_width, item_height = canvas_size(item.images) if hasattr(item, "shapes") else (item.width, item.height)
+        width, height = max(width, item_width), max(height, item_height)
+    return width, height
+
+
+def _shape_box(shape, scale=1.0):
+    """Caixa de desenho de uma forma ou texto, com margem para contorno e glifos."""
+    left, top, right, bottom = shape.get_bounding_box()
+    margin = getattr(shape, "outline_width", 0) + getattr(shape, "font_size", 0) + 1
+    return (int((left - margin) * scale), int((top - margin) * scale),
+            int((right + margin) * scale) + 1, int((bottom + margin) * scale) + 1)
+
+
+def _layer_region(image, box, x, y, scale):
+    """Recorta (e reamostra, fora da escala 1:1) só a parte da camada dentro de `box`.
+
+    Camadas guardadas em modo compacto (L, P) são convertidas para RGBA só
+    dentro do recorte.
+    """
+    if scale == 1.0:
+        region = image.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+        return region if region.mode == "RGBA" else region.convert("RGBA")
+    source_box = ((box[0] - x) / scale, (box[1] - y) / scale, (box[2] - x) / scale, (box[3] - y) / scale)
+    if image.mode != "RGBA":
+        # Converte só a área de origem, com margem para o suporte do filtro LANCZOS
+        margin = int(3 / min(scale, 1.0)) + 1
+        left = max(0, int(source_box[0]) - margin)
+        top = max(0, int(source_box[1]) - margin)
+        right = min(image.width, int(source_box[2]) + margin + 1)
+        bottom = min(image.height, int(source_box[3]) + margin + 1)
+        image = image.crop((left, top, right, bottom)).convert("RGBA")
+        source_box = (source_box[0] - left, source_box[1] - top, source_box[2] - left, source_box[3] - top)
+    return image.resize((box[2] - box[0], box[3] - box[1]), Image.Resampling.LANCZOS, box=source_box)
+
+
+def _transformed_region(img_layer, region, scale, layer_raster):
+    """(caixa, recorte) da parte de uma camada transformada (raster em cache) na região, ou None."""
+    if layer_raster is not None:
+        raster = lambda: layer_raster(img_layer)
+    else:
+        raster = lambda: apply_opacity(img_layer.image.convert("RGBA"), img_layer.opacity)
+    x, y, img = place_layer(img_layer, scale, raster)
+    box = intersect((x, y, x + img.width, y + img.height), region)
+    if box is None:
+        return None
+    return box, img.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+
+
+def _placed_region(img_layer, region, scale, layer_raster):
+    """(caixa, recorte) da parte de uma camada dentro da região, ou None."""
+    if getattr(img_layer, "transform", None) is not None:
+        return _transformed_region(img_layer, region, scale, layer_raster)
+    x, y = int(img_layer.x * scale), int(img_layer.y * scale)
+    width, height = img_layer.width, img_layer.height
+    if scale != 1.0:
+        width, height = int(width * scale), int(height * scale)
+    box = intersect((x, y, x + width, y + height), region)
+    if box is None:
+        return None
+    if layer_raster is not None:
+        return box, _layer_region(layer_raster(img_layer), box, x, y, scale)
+    return box, apply_opacity(_layer_region(img_layer.image, box, x, y, scale), img_layer.opacity)
+
+
+def render_region(images, shapes, region, scale=1.0, layer_raster=None):
+    """Renderiza a região (left, top, right, bottom) da cena na escala indicada.
+
+    `region` está em pixels de saída (já escalados). Em escala 1:1 o resultado
+    é idêntico ao recorte da composição completa, mas só aloca imagens do
+    tamanho da região. `layer_raster`, se dado, devolve o raster da camada com
+    a opacidade já aplicada (ex.: ExportCache.layer_raster).
+    """
+    left, top, right, bottom = region
+    size = (right - left, bottom - top)
+    images, shapes = expand_groups(images, shapes)
+    bases = clip_bases(shapes)  # Itens com máscara de recorte -> item que recorta
+
+    base_layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    for img_layer in images:
+        if drawn_with_shapes(img_layer, bases):
+            continue  # Recortada por uma forma (vai junto com as formas)
+        placed = _placed_region(img_layer, region, scale, layer_raster)
+        if placed is None:
+            continue
+        box, img = placed
+        if id(img_layer) in bases:
+            img = clip_image(img, box, bases[id(img_layer)], scale)
+        composite_layer(base_layer, img, (box[0] - left, box[1] - top), getattr(img_layer, "blend_mode", "normal"))
+
+    shape_layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(shape_layer)
+    for shape in shapes:
+        if drawn_with_shapes(shape, bases):
+            placed = _placed_region(shape, region, scale, layer_raster)
+            if placed is not None:
+                box, img = placed
+                shape_layer.alpha_composite(clip_image(img, box, bases[id(shape)], scale), (box[0] - left, box[1] - top))
+            continue
+        if hasattr(shape, "image") or intersect(_shape_box(shape, scale), region) is None:
+            continue  # Camadas de imagem já estão na base
+        if id(shape) in bases:
+            draw_clipped(shape_layer, shape, bases[id(shape)], region, scale, _shape_box(shape, scale))
+        else:
+            shape.draw(shape_layer, draw, scale=scale, offset=(-left, -top))
+
+    return Image.alpha_composite(base_layer, shape_layer)
+
+
+def iter_render_stripes(images, shapes, size, stripe_height=DEFAULT_STRIPE_HEIGHT, scale=1.0):
+    """Gera a cena em faixas horizontais de largura total, uma por vez."""
+    width, height = size
+    for top in range(0, height, stripe_height):
+        yield render_region(images, shapes, (0, top, width, min(top + stripe_height, height)), scale)
+
+
+def export_png_tiled(images, shapes, size, file_path, level=6, workers=None,
+                     stripe_height=DEFAULT_STRIPE_HEIGHT, png_filter="up", verify=False):
+    """Exporta a cena como PNG renderizando e codificando faixa a faixa.
+
+    Nenhuma imagem do tamanho do canvas é alocada: o pico de memória depende
+    da altura da faixa e do número de faixas em compressão simultânea. Com
+    `verify=True` a cena é renderizada de novo e comparada com o arquivo
+    relido pelo Pillow (png_paralelo.verify_png).
+    """
+    with open(file_path, "wb") as fp:
+        write_png_stripes(fp, size, "RGBA", iter_render_stripes(images, shapes, size, stripe_height),
+                          level=level, workers=workers, png_filter=png_filter)
+    logger.info(f"PNG exportado em faixas de {stripe_height} linhas: {file_path}")
+    if verify:
+        verify_png(file_path, iter_render_stripes(images, shapes, size, stripe_height))
@@ -0,0 +1,276 @@
+# PIL-EditorGUI - Transformações afins
+# Camadas de imagem, formas e textos podem ter uma transformação afim
+# (rotação, escala, inclinação) em `transform`: a parte linear (a, b, c, d)
+# aplicada em torno do centro do item, com x' = a*x + b*y e y' = c*x + d*y em
+# coordenadas da cena (y para baixo). None é a identidade e mantém os
+# caminhos de desenho sem transformação.
+#
+# O raster transformado de cada item fica em cache por (versão do item,
+# matriz, escala de exibição, filtro), sem a posição: arrastar um item
+# girado só muda onde o raster é colado. Durante a rotação interativa o item
+# é marcado como rascunho (`_draft`) e usa um filtro barato; o raster
+# definitivo é feito ao soltar o mouse.
+#
+# Formas e textos com transparência, transformados ou não, são compostos
+# com o operador "over" a partir de uma imagem local: o ImageDraw troca os
+# pixels de destino pela cor com alfa em vez de compor por cima.
+
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+import logging
+import math
+import threading
+
+try:
+    from .registro_assets import bytes_per_pixel
+except ImportError:  # Executado como script
+    from registro_assets import bytes_per_pixel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSFORM_BYTES = 64 * 1024 * 1024
+DRAFT_FILTER = Image.Resampling.NEAREST  # Rotação interativa
+FINAL_FILTER = Image.Resampling.BICUBIC
+IDENTITY = (1.0, 0.0, 0.0, 1.0)
+
+
+def rotation(degrees):
+    """Rotação anti-horária na tela (mesmo sentido de Image.rotate)."""
+    radians = math.radians(degrees)
+    cos, sin = math.cos(radians), math.sin(radians)
+    return (cos, sin, -sin, cos)
+
+
+def compose(first, second):
+    """Matriz que aplica `second` e depois `first`."""
+    a, b, c, d = first
+    e, f, g, h = second
+    return (a * e + b * g, a * f + b * h, c * e + d * g, c * f + d * h)
+
+
+def invert(matrix):
+    a, b, c, d = matrix
+    det = a * d - b * c
+    if abs(det) < 1e-12:
+        raise ValueError("Transformação degenerada (determinante zero)")
+    return (d / det, -b / det, -c / det, a / det)
+
+
+def normalized(matrix):
+    """`matrix`, ou None se ela for a identidade (a menos do erro de arredondamento)."""
+    if matrix is None or all(abs(m - i) < 1e-9 for m, i in zip(matrix, IDENTITY)):
+        return None
+    return matrix
+
+
+def from_params(degrees=0.0, scale_x=1.0, scale_y=1.0, skew=0.0):
+    """Matriz de rotação (graus) * inclinação horizontal (graus) * escala; None se for a identidade."""
+    skewed = (scale_x, math.tan(math.radians(skew)) * scale_y, 0.0, scale_y)
+    matrix = compose(rotation(degrees), skewed)
+    invert(matrix)  # Rejeita escala zero
+    return normalized(matrix)
+
+
+def to_params(matrix):
+    """(rotação, escala x, escala y, inclinação) de uma matriz; inverso de from_params."""
+    if matrix is None:
+        return 0.0, 1.0, 1.0, 0.0
+    a, b, c, d = matrix
+    scale_x = math.hypot(a, c)
+    radians = math.atan2(-c, a)
+    cos, sin = math.cos(radians), math.sin(radians)
+    scale_y = sin * b + cos * d
+    skew = math.degrees(math.atan2(cos * b - sin * d, scale_y))
+    return math.degrees(radians), scale_x, scale_y, skew
+
+
+def corners(item):
+    """Cantos do item transformado, em coordenadas da cena (sentido horário a partir do topo esquerdo)."""
+    a, b, c, d = item.transform or IDENTITY
+    center_x, center_y = item.x + item.width / 2, item.y + item.height / 2
+    half_w, half_h = item.width / 2, item.height / 2
+    return [(center_x + a * dx + b * dy, center_y + c * dx + d * dy)
+            for dx, dy in ((-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h))]
+
+
+def transformed_box(item):
+    """Caixa alinhada aos eixos que contém o item transformado."""
+    points = corners(item)
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def contains_point(item, x, y):
+    """Se o ponto (x, y) da cena cai dentro do item, considerando a transformação."""
+    matrix = getattr(item, "transform", None)
+    if matrix is None:
+        box = item.get_bounding_box()
+        return box[0] <= x <= box[2] and box[1] <= y <= box[3]
+    a, b, c, d = invert(matrix)
+    dx, dy = x - item.x - item.width / 2, y - item.y - item.height / 2
+    local_x, local_y = a * dx + b * dy, c * dx + d * dy
+    return abs(local_x) <= item.width / 2 and abs(local_y) <= item.height / 2
+
+
+def local_key(item):
+    """Versão do conteúdo do item, sem posição nem transformação."""
+    if hasattr(item, "image"):
+        return ("image", item.content_hash(), item.width, item.height, item.opacity)
+    if hasattr(item, "text"):
+        return ("text", item.text, item.font_path, item.font_size, item.fill, item.opacity, item.width, item.height)
+    return ("shape", item.width, item.height, item.fill, item.opacity, item.outline_width, item.corner_radius)
+
+
+def _transform(source, linear, anchor, resample):
+    """Aplica `linear` (pixels da origem -> pixels de saída) em torno de `anchor`.
+
+    Retorna (dx, dy, raster): a posição do raster em relação ao ponto para
+    onde `anchor` é levado.
+    """
+    a, b, c, d = linear
+    points = [(a * (x - anchor[0]) + b * (y - anchor[1]), c * (x - anchor[0]) + d * (y - anchor[1]))
+              for x, y in ((0, 0), (source.width, 0), (source.width, source.height), (0, source.height))]
+    left = math.floor(min(point[0] for point in points))
+    top = math.floor(min(point[1] for point in points))
+    right = math.ceil(max(point[0] for point in points))
+    bottom = math.ceil(max(point[1] for point in points))
+    ia, ib, ic, id_ = invert(linear)
+    data = (ia, ib, anchor[0] + ia * left + ib * top,
+            ic, id_, anchor[1] + ic * left + id_ * top)
+    raster = source.transform((max(1, right - left), max(1, bottom - top)), Image.Transform.AFFINE, data,
+                              resample=resample, fillcolor=(0, 0, 0, 0))
+    return left, top, raster
+
+
+class TransformCache:
+    """Rasters transformados por (versão, matriz, escala, filtro), em LRU limitado em bytes.
+
+    Rascunhos da rotação interativa ocupam uma única vaga: cada ângulo é
+    usado em um quadro só e não deve expulsar os rasters definitivos.
+    """
+    def __init__(self, max_bytes=DEFAULT_TRANSFORM_BYTES):
+        self.max_bytes = max_bytes
+        self._rasters = OrderedDict()  # chave -> (dx, dy, raster)
+        self._bytes = 0
+        self._draft = None  # (chave, (dx, dy, raster))
+        self._lock = threading.Lock()
+
+    def get(self, key, make_source, linear, anchor, draft=False):
+        """(dx, dy, raster) para `key`; `make_source()` só é chamado se faltar no cache."""
+        key = key + (draft,)
+        with self._lock:
+            if draft and self._draft is not None and self._draft[0] == key:
+                return self._draft[1]
+            entry = self._rasters.get(key)
+            if entry is not None:
+                self._rasters.move_to_end(key)
+                return entry
+        entry = _transform(make_source(), linear, anchor, DRAFT_FILTER if draft else FINAL_FILTER)
+        with self._lock:
+            if draft:
+                self._draft = (key, entry)
+            elif key not in self._rasters:
+                self._rasters[key] = entry
+                self._bytes += self._entry_bytes(entry)
+                while self._bytes > self.max_bytes and self._rasters:
+                    self._bytes -= self._entry_bytes(self._rasters.popitem(last=False)[1])
+        return entry
+
+    @staticmethod
+    def _entry_bytes(entry):
+        raster = entry[2]
+        return raster.width * raster.height * bytes_per_pixel(raster.mode)
+
+    def memory_usage(self):
+        return self._bytes + (self._entry_bytes(self._draft[1]) if self._draft else 0)
+
+    def release(self, nbytes):
+        """Descarta rasters menos usados até liberar `nbytes`. Retorna o liberado."""
+        freed = 0
+        with self._lock:
+            if self._draft is not None:
+                freed += self._entry_bytes(self._draft[1])
+                self._draft = None
+            while self._rasters and freed < nbytes:
+                entry_bytes = self._entry_bytes(self._rasters.popitem(last=False)[1])
+                self._bytes -= entry_bytes
+                freed += entry_bytes
+        return freed
+
+
+transform_cache = TransformCache()
+
+
+def place_layer(img_layer, scale, raster):
+    """(left, top, raster) de uma camada transformada, em pixels de saída.
+
+    `raster()` devolve os pixels da camada no tamanho dela, em RGBA e com a
+    opacidade aplicada; só é chamado quando o resultado não está em cache.
+    """
+    matrix = img_layer.transform
+    linear = tuple(m * scale for m in matrix)
+    # Afastado, reduz a origem antes (a transformação afim não filtra a redução)
+    factor = max(1, int(1 / (scale * max(math.hypot(matrix[0], matrix[2]), math.hypot(matrix[1], matrix[3])))))
+    if factor > 1:
+        linear = tuple(m * factor for m in linear)
+        make_source = lambda: raster().reduce(factor)
+    else:
+        make_source = raster
+    key = (local_key(img_layer), matrix, scale)
+    anchor = (img_layer.width / factor / 2, img_layer.height / factor / 2)
+    dx, dy, output = transform_cache.get(key, make_source, linear, anchor,
+                                         draft=getattr(img_layer, "_draft", False))
+    center_x = round((img_layer.x + img_layer.width / 2) * scale)
+    center_y = round((img_layer.y + img_layer.height / 2) * scale)
+    return center_x + dx, center_y + dy, output
+
+
+def _paint_margin(item, scale):
+    """Margem (pixels de saída) da imagem local para o contorno e os glifos."""
+    return int((getattr(item, "outline_width", 0) + getattr(item, "font_size", 0) / 2) * scale) + 2
+
+
+def draw_composited(item, target, scale, offset, paint):
+    """Desenha uma forma ou texto sem transformação sobre `target` com o operador "over".
+
+    `paint(draw, scale, offset)` pinta só a parte do item dentro de
+    `target` numa imagem local transparente, que é composta em seguida.
+    """
+    margin = _paint_margin(item, scale)
+    left = max(0, math.floor(item.x * scale + offset[0]) - margin)
+    top = max(0, math.floor(item.y * scale + offset[1]) - margin)
+    right = min(target.width, math.ceil((item.x + item.width) * scale + offset[0]) + margin)
+    bottom = min(target.height, math.ceil((item.y + item.height) * scale + offset[1]) + margin)
+    if left >= right or top >= bottom:
+        return
+    local = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+    paint(ImageDraw.Draw(local), scale, (offset[0] - left, offset[1] - top))
+    target.alpha_composite(local, (left, top))
+
+
+def draw_transformed(item, target, scale, offset, paint):
+    """Desenha uma forma ou texto transformado sobre a imagem RGBA `target`.
+
+    `paint(draw, scale, offset)` desenha o item sem transformação; ele é
+    pintado numa imagem local (com margem para contorno e glifos), que é
+    transformada e composta na posição do item.
+    """
+    margin = _paint_margin(item, scale)
+    width, height = math.ceil(item.width * scale), math.ceil(item.height * scale)
+
+    def make_source():
+        local = Image.new("RGBA", (width + 2 * margin, height + 2 * margin), (0, 0, 0, 0))
+        paint(ImageDraw.Draw(local), scale, (margin - item.x * scale, margin - item.y * scale))
+        return local
+
+    key = (local_key(item), item.transform, scale)
+    anchor = (margin + item.width * scale / 2, margin + item.height * scale / 2)
+    dx, dy, raster = transform_cache.get(key, make_source, item.transform, anchor,
+                                         draft=getattr(item, "_draft", False))
+    left = round((item.x + item.width / 2) * scale + offset[0]) + dx
+    top = round((item.y + item.height / 2) * scale + offset[1]) + dy
+    # Só a parte do raster dentro da imagem de destino é composta
+    crop = (max(0, -left), max(0, -top), min(raster.width, target.width - left), min(raster.height, target.height - top))
+    if crop[0] < crop[2] and crop[1] < crop[3]:
+        target.alpha_composite(raster, (left + crop[0], top + crop[1]), crop)
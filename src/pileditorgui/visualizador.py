@@ -4,8 +4,22 @@ from PIL import Image, ImageDraw, ImageTk
 import os
 import sys
 import importlib.util
+import json
 import re
 
+try:
+    from .cache_pixels import PixelCache
+    from .composicao import apply_opacity, composite_layer
+except ImportError:  # Executado como script (python visualizador.py)
+    from cache_pixels import PixelCache
+    from composicao import apply_opacity, composite_layer
+
+
+def _lua_string(literal):
+    """Conteúdo de um literal Lua entre aspas duplas (inverso de exportacao._lua)."""
+    return re.sub(r"\\(.)", lambda match: "\n" if match.group(1) == "n" else match.group(1), literal)
+
+
 class ImageViewer:
     def __init__(self, root):
         self.root = root
@@ -27,6 +41,7 @@ class ImageViewer:
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
         self.image_tk = None  # Para manter a referência da imagem exibida
+        self.pixel_cache = PixelCache()  # Compartilha os pixels decodificados com o editor
 
     def load_and_display(self):
         """Carrega o arquivo e exibe a imagem gerada."""
@@ -74,6 +89,12 @@ class ImageViewer:
 
     def handle_javascript(self, code):
         """Converte código JavaScript em imagem usando PIL."""
+        scene_match = re.search(r"^const scene = (\{.*\});$", code, re.MULTILINE)
+        if scene_match:
+            self.handle_javascript_scene(json.loads(scene_match.group(1)))
+            return
+
+        # Formato antigo: um drawImage por camada
         # Extrai dimensões do canvas
         width_match = re.search(r"canvas\.width\s*=\s*(\d+);", code)
         height_match = re.search(r"canvas\.height\s*=\s*(\d+);", code)
@@ -94,19 +115,35 @@ class ImageViewer:
             alpha = float(alphas[i]) if i < len(alphas) else 1.0
 
             if path:
-                adjusted_path = f"img/{os.path.basename(path)}"
-                layer_img = Image.open(adjusted_path).convert('RGBA')
-                layer_img = layer_img.resize((w, h), Image.Resampling.LANCZOS)
-                if alpha < 1.0:
-                    alpha_channel = layer_img.split()[3]
-                    new_alpha = alpha_channel.point(lambda p: int(p * alpha))
-                    layer_img.putalpha(new_alpha)
-                img.paste(layer_img, (x, y), layer_img)
+                self.paste_layer(img, path, x, y, w, h, alpha)
+
+        self.display_image(img)
 
+    def handle_javascript_scene(self, scene):
+        """Desenha a cena descrita pelo JavaScript com pré-carregamento."""
+        img = Image.new('RGBA', (scene["width"], scene["height"]), (0, 0, 0, 0))
+        for item in scene["items"]:
+            if item["type"] == "image":
+                path = scene["assets"][item["asset"]]
+                self.paste_layer(img, path, item["x"], item["y"], item["width"], item["height"], item["alpha"],
+                                 item.get("blend", "normal"))
         self.display_image(img)
 
+    def paste_layer(self, img, path, x, y, w, h, alpha, blend_mode="normal"):
+        """Carrega uma imagem de 'img/' e cola na posição indicada com opacidade e modo de mesclagem."""
+        adjusted_path = f"img/{os.path.basename(path)}"
+        layer_img = self.pixel_cache.open_image(adjusted_path)
+        layer_img = layer_img.resize((w, h), Image.Resampling.LANCZOS)
+        layer_img = apply_opacity(layer_img, alpha * 100)
+        composite_layer(img, layer_img, (x, y), blend_mode)
+
     def handle_lua(self, code):
-        """Converte código Lua (MTA GUI) em imagem usando PIL."""
+        """Converte código Lua (MTA GUI ou DX) em imagem usando PIL."""
+        size_match = re.search(r"local SCENE_W, SCENE_H = (\d+), (\d+)", code)
+        if size_match:
+            self.handle_lua_dx(code, int(size_match.group(1)), int(size_match.group(2)))
+            return
+
         # Tenta estimar as dimensões baseadas nas imagens (não há canvas explícito)
         img_calls = re.findall(r"guiCreateStaticImage\((\d+),\s*(\d+),\s*(\d+),\s*(\d+),\s*'([^']+)',\s*false\)", code)
         alpha_calls = re.findall(r"guiSetAlpha\([^,]+,\s*([\d.]+)\)", code)
@@ -119,7 +156,6 @@ class ImageViewer:
         width, height = max_x or 800, max_y or 600
 
         img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
 
         # Processa cada imagem
         for i, (x, y, w, h, path) in enumerate(img_calls):
@@ -127,14 +163,22 @@ class ImageViewer:
             alpha = float(alpha_calls[i]) if i < len(alpha_calls) else 1.0
 
             if path and path != ":guieditor/images/rect.png":  # Ignora retângulos genéricos
-                adjusted_path = f"img/{path}"
-                layer_img = Image.open(adjusted_path).convert('RGBA')
-                layer_img = layer_img.resize((w, h), Image.Resampling.LANCZOS)
-                if alpha < 1.0:
-                    alpha_channel = layer_img.split()[3]
-                    new_alpha = alpha_channel.point(lambda p: int(p * alpha))
-                    layer_img.putalpha(new_alpha)
-                img.paste(layer_img, (x, y), layer_img)
+                self.paste_layer(img, path, x, y, w, h, alpha)
+
+        self.display_image(img)
+
+    def handle_lua_dx(self, code, width, height):
+        """Converte código Lua (MTA DX com render target) em imagem usando PIL."""
+        textures = {index: _lua_string(literal) for index, literal in
+                    re.findall(r'textures\[(\d+)\] = dxCreateTexture\("((?:[^"\\]|\\.)*)"\)', code)}
+        draw_calls = re.findall(
+            r"dxDrawImage\((-?\d+), (-?\d+), (\d+), (\d+), textures\[(\d+)\], 0, 0, 0, tocolor\(255, 255, 255, (\d+)\)\)", code)
+
+        img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        for x, y, w, h, texture, alpha in draw_calls:
+            path = textures.get(texture)
+            if path:
+                self.paste_layer(img, path, int(x), int(y), int(w), int(h), int(alpha) / 255)
 
         self.display_image(img)
 
@@ -0,0 +1,29 @@
+from pileditorgui.alinhamento import SMALL_EDIT, SnapIndex
+from pileditorgui.editor import Shape
+
+
+def _shapes(count):
+    return [Shape(i * 7 % 500, i * 13 % 300, 10 + i % 5, 8) for i in range(count)]
+
+
+def test_without_and_add_boxes_match_a_rebuild():
+    shapes = _shapes(300)
+    for selected in (shapes[:3], shapes[:SMALL_EDIT + 10]):
+        boxes = [shape.get_bounding_box() for shape in selected]
+        rest = [shape for shape in shapes if shape not in selected]
+        index = SnapIndex(shapes, (640, 480)).without(boxes)
+        expected = SnapIndex(rest, (640, 480))
+        assert (index.xs, index.ys) == (expected.xs, expected.ys)
+        for shape in selected:
+            shape.x += 3
+        index.add_boxes([shape.get_bounding_box() for shape in selected])
+        expected = SnapIndex(shapes, (640, 480))
+        assert (index.xs, index.ys) == (expected.xs, expected.ys)
+
+
+def test_without_leaves_the_original_untouched():
+    shapes = _shapes(20)
+    index = SnapIndex(shapes)
+    before = list(index.xs)
+    index.without([shapes[0].get_bounding_box()])
+    assert index.xs == before
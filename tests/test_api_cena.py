@@ -0,0 +1,50 @@
+import pytest
+
+from pileditorgui.api_cena import SceneAPI
+from pileditorgui.grupos import LayerGroup
+
+
+def test_removed_item_is_not_confused_with_new_item():
+    api = SceneAPI()
+    a = api.add_shape(0, 0, fill="red")
+    api.remove(a)
+    b = api.add_shape(10, 10, fill="green")
+    with pytest.raises(KeyError):
+        api.update(a, fill="blue")
+    assert api.items == (b,)
+    assert b.fill == "green"
+
+
+def test_stale_reference_after_move_finds_the_moved_item():
+    api = SceneAPI()
+    a = api.add_shape(0, 0, fill="red")
+    b = api.add_shape(10, 10, fill="green")
+    moved = api.move_to(b, 0)
+    c = api.add_shape(20, 20, fill="yellow")
+    updated = api.update(b, fill="blue")
+    assert updated is api.find_one(fill="blue")
+    assert [item.fill for item in api.items] == ["blue", "red", "yellow"]
+    assert moved._id == updated._id
+    assert a.fill == "red" and c.fill == "yellow"
+
+
+def test_ids_survive_group_and_ungroup():
+    api = SceneAPI()
+    a = api.add_shape(0, 0, fill="red")
+    b = api.add_shape(10, 10, fill="green")
+    document = api.document
+    document.group([a, b], LayerGroup.from_items([a, b]))
+    with pytest.raises(KeyError):
+        api.update(a, fill="blue")
+    group = api.items[0]
+    document.ungroup(group)
+    assert api.update(a, fill="blue").fill == "blue"
+    assert [item.fill for item in api.items] == ["blue", "green"]
+
+
+def test_undo_restores_removed_item():
+    api = SceneAPI()
+    a = api.add_shape(0, 0, fill="red")
+    api.remove(a)
+    api.undo()
+    assert api.update(a, fill="blue").fill == "blue"
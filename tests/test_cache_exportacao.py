@@ -0,0 +1,73 @@
+import os
+
+from PIL import Image
+
+from pileditorgui import perfil_exportacao
+from pileditorgui.cache_exportacao import ExportCache, scene_hash
+from pileditorgui.composicao import apply_opacity
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.perfil_exportacao import ExportProfile, export_profile
+from pileditorgui.renderizacao import render_region
+
+SIZE = (120, 80)
+
+
+def build(**changes):
+    """Cena nova a cada chamada (objetos diferentes, mesmo conteúdo), com `changes` aplicados."""
+    layer = ImageLayer(Image.new("RGBA", SIZE, changes.get("pixels", (10, 20, 30, 255))), changes.get("path", "fundo.png"))
+    shape = Shape(changes.get("x", 10), 10, 40, 30, fill=changes.get("fill", "#3366cc"))
+    text = TextShape(15, 50, changes.get("text", "Nome"), font_size=14)
+    images = [layer]
+    return images, images + [shape, text]
+
+
+def test_scene_hash_is_stable_and_tracks_content():
+    reference = scene_hash(*build(), SIZE)[0]
+    assert scene_hash(*build(), SIZE)[0] == reference
+    assert scene_hash(*build(path="outro/fundo.png"), SIZE)[0] == reference  # Só os pixels contam
+    for changes in ({"x": 11}, {"fill": "#3366cd"}, {"text": "Nomes"}, {"pixels": (10, 20, 31, 255)}):
+        assert scene_hash(*build(**changes), SIZE)[0] != reference, changes
+    assert scene_hash(*build(), (121, 80))[0] != reference
+    assert scene_hash(*build(), SIZE, "png:9")[0] != reference
+
+
+def test_fetch_store_and_prune(tmp_path):
+    cache = ExportCache(str(tmp_path / "cache"), max_bytes=10)
+    target = tmp_path / "saida.png"
+    assert not cache.fetch("chave", str(target))
+    source = tmp_path / "origem.png"
+    source.write_bytes(b"12345678")
+    cache.store("chave", str(source))
+    assert cache.fetch("chave", str(target)) and target.read_bytes() == b"12345678"
+    os.utime(cache._output_path("chave", ".png"), (0, 0))  # A mais antiga sai primeiro
+    cache.store("outra", str(source))
+    assert not cache.fetch("chave", str(target))
+    assert cache.fetch("outra", str(target))
+
+
+def test_unchanged_profile_export_is_copied_from_the_cache(tmp_path, monkeypatch):
+    cache = ExportCache(str(tmp_path / "cache"))
+    profile = ExportProfile.from_spec("1x:png, thumb32:webp")
+    first = export_profile(*build(), SIZE, profile, str(tmp_path / "a"), cache=cache)
+    renders = []
+    monkeypatch.setattr(perfil_exportacao, "render_region", lambda *args: renders.append(args) or render_region(*args))
+    second = export_profile(*build(), SIZE, profile, str(tmp_path / "b"), cache=cache)
+    assert renders == []
+    for a, b in zip(first, second):
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            assert fa.read() == fb.read()
+    export_profile(*build(text="Outro"), SIZE, profile, str(tmp_path / "c"), cache=cache)
+    assert len(renders) == 1
+
+
+def test_layer_rasters_are_shared_by_content_and_bounded():
+    cache = ExportCache(max_layer_rasters=2)
+    first = ImageLayer(Image.new("RGBA", (8, 8), (255, 0, 0, 255)), "a.png", opacity=50)
+    same = ImageLayer(Image.new("RGBA", (8, 8), (255, 0, 0, 255)), "b.png", opacity=50)
+    raster = cache.layer_raster(first)
+    assert cache.layer_raster(same) is raster
+    assert raster.tobytes() == apply_opacity(first.image, 50).tobytes()
+    for color in ((0, 255, 0, 255), (0, 0, 255, 255)):
+        cache.layer_raster(ImageLayer(Image.new("RGBA", (8, 8), color), "c.png"))
+    assert cache.memory_usage() == 2 * 8 * 8 * 4
+    assert cache.layer_raster(first) is not raster  # Saiu do LRU e foi refeito
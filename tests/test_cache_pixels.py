@@ -0,0 +1,28 @@
+import os
+
+from PIL import Image
+
+from pileditorgui.cache_pixels import PixelCache
+
+
+def test_index_drops_entries_for_changed_or_missing_files(tmp_path):
+    sources = []
+    for i in range(3):
+        path = tmp_path / f"img{i}.png"
+        Image.new("RGBA", (4, 4), (i, 0, 0, 255)).save(path)
+        sources.append(path)
+    cache = PixelCache(str(tmp_path / "cache"))
+    for path in sources:
+        cache.open_image(str(path))
+    assert len(cache._load_index()) == 3
+
+    os.remove(sources[0])
+    Image.new("RGBA", (5, 5)).save(sources[1])
+    os.utime(sources[1], ns=(0, 0))
+    index = PixelCache(str(tmp_path / "cache"))._load_index()
+    assert list(index) == [key for key in cache._index if key.startswith(os.path.abspath(sources[2]))]
+
+    for name in os.listdir(tmp_path / "cache"):
+        if name.endswith(".raw"):
+            os.remove(tmp_path / "cache" / name)
+    assert PixelCache(str(tmp_path / "cache"))._load_index() == {}
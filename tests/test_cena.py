@@ -0,0 +1,60 @@
+from PIL import Image
+
+from pileditorgui.cena import SceneDocument
+from pileditorgui.editor import ImageLayer, Shape
+
+
+def test_snapshot_of_unchanged_scene_keeps_the_generation():
+    document = SceneDocument()
+    document.add(Shape(0, 0, 10, 10))
+    first = document.snapshot()
+    generation = document.generation
+    assert document.snapshot() is first
+    assert document.generation == generation
+
+
+def test_edits_copy_once_per_changed_snapshot():
+    document = SceneDocument()
+    shape = document.add(Shape(0, 0, 10, 10))
+    frozen = document.snapshot()
+    moved = document.edit(shape)
+    assert moved is not shape
+    moved.x += 5
+    assert document.edit(moved) is moved  # Sem instantâneo novo, a cópia é alterada no lugar
+    assert frozen.shapes[0].x == 0
+    document.snapshot()
+    document.snapshot()  # Redesenhos sem alteração não congelam de novo
+    assert document.edit(moved) is not moved
+
+
+def test_snapshots_are_isolated_from_later_edits():
+    document = SceneDocument()
+    layer = document.add(ImageLayer(Image.new("RGBA", (8, 8), (1, 2, 3, 255)), "fundo.png"))
+    shapes = [document.add(Shape(i * 10, 0, 5, 5)) for i in range(3)]
+    frozen = document.snapshot()
+    before = [(item._id, item.x) for item in frozen.shapes]
+
+    moved = document.edit(layer)
+    moved.x = 40
+    document.remove(shapes[0])
+    document.move(shapes[2], 0)
+    document.add(Shape(0, 0, 1, 1))
+
+    assert [(item._id, item.x) for item in frozen.shapes] == before
+    assert frozen.images == (layer,) and layer.x == 0
+    assert moved.asset is layer.asset  # A cópia de edição compartilha os pixels
+    current = document.current
+    assert [item._id for item in current.shapes[:2]] == [shapes[2]._id, layer._id]
+    assert current.find(layer._id) is moved and moved not in frozen and layer in frozen
+    assert len(current) == 4 and current.index(moved) == 1
+
+
+def test_restore_freezes_the_restored_scene():
+    document = SceneDocument()
+    shape = document.add(Shape(0, 0, 5, 5))
+    frozen = document.snapshot()
+    document.edit(shape).x = 7
+    document.restore(frozen)
+    assert document.current.shapes[0].x == 0
+    document.edit(document.current.shapes[0]).x = 9
+    assert frozen.shapes[0].x == 0
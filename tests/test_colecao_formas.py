@@ -0,0 +1,13 @@
+from PIL import Image, ImageDraw
+
+from pileditorgui.colecao_formas import ShapeCollection
+from pileditorgui.composicao import opacity_alpha
+
+
+def test_members_and_draw_use_the_same_alpha():
+    collection = ShapeCollection(5, 5, opacity=67)
+    collection.extend([(i * 4, 0, 3, 3, "#336699", opacity) for i, opacity in enumerate((1, 33, 50, 99, 100))])
+    image = Image.new("RGBA", (40, 10), (0, 0, 0, 0))
+    collection.draw(image, ImageDraw.Draw(image))
+    for member in collection.members():
+        assert image.getpixel((int(member.x) + 1, int(member.y) + 1))[3] == opacity_alpha(member.opacity)
@@ -0,0 +1,93 @@
+import pytest
+from PIL import Image
+
+from pileditorgui import composicao
+from pileditorgui.composicao import BLEND_MODES, available_blend_modes, blend_colors, composite_layer
+from pileditorgui.composicao import apply_opacity, opacity_alpha
+from pileditorgui.editor import ImageLayer
+from pileditorgui.renderizacao import render_region
+
+BACKDROP = (200, 120, 30)
+SOURCE = (60, 180, 250)
+
+# B(Cb, Cs) do W3C em inteiros de 0 a 255
+REFERENCE = {
+    "multiply": lambda cb, cs: cb * cs / 255,
+    "screen": lambda cb, cs: 255 - (255 - cb) * (255 - cs) / 255,
+    "overlay": lambda cb, cs: 2 * cb * cs / 255 if cb < 128 else 255 - 2 * (255 - cb) * (255 - cs) / 255,
+    "darken": min,
+    "lighten": max,
+    "hard-light": lambda cb, cs: 2 * cb * cs / 255 if cs < 128 else 255 - 2 * (255 - cb) * (255 - cs) / 255,
+    "difference": lambda cb, cs: abs(cb - cs),
+    "exclusion": lambda cb, cs: cb + cs - 2 * cb * cs / 255,
+}
+# A exclusão é screen - multiply, que arredondam em sentidos opostos
+TOLERANCE = {"exclusion": 2}
+
+
+def blended(mode, source_alpha=255, backdrop_alpha=255):
+    base = Image.new("RGBA", (6, 4), BACKDROP + (backdrop_alpha,))
+    composite_layer(base, Image.new("RGBA", (2, 2), SOURCE + (source_alpha,)), (3, 1), mode)
+    return base
+
+
+@pytest.mark.parametrize("mode", sorted(REFERENCE))
+def test_blend_modes_follow_the_reference_formulas(mode):
+    expected = [REFERENCE[mode](cb, cs) for cb, cs in zip(BACKDROP, SOURCE)]
+    tolerance = TOLERANCE.get(mode, 1)
+    result = blended(mode)
+    assert all(abs(got - want) <= tolerance for got, want in zip(result.getpixel((3, 1))[:3], expected))
+    assert result.getpixel((0, 0)) == BACKDROP + (255,)  # Fora da camada o fundo não muda
+    # Com alfa parcial, a cor misturada é composta com "over"
+    half = blended(mode, source_alpha=128).getpixel((4, 2))
+    assert all(abs(got - (cb * 127 + want * 128) / 255) <= tolerance for got, cb, want in zip(half[:3], BACKDROP, expected))
+    # Sobre fundo transparente vale a cor da camada
+    assert blended(mode, backdrop_alpha=0).getpixel((3, 1)) == SOURCE + (255,)
+
+
+def test_numpy_only_modes_depend_on_numpy():
+    modes = available_blend_modes()
+    assert set(REFERENCE) | {"normal"} <= set(modes) <= set(BLEND_MODES)
+    if composicao.np is None:
+        assert "soft-light" not in modes
+        with pytest.raises(ValueError):
+            blend_colors(Image.new("RGB", (1, 1)), Image.new("RGB", (1, 1)), "soft-light")
+    else:
+        assert modes == BLEND_MODES
+    with pytest.raises(ValueError):
+        blend_colors(Image.new("RGB", (1, 1)), Image.new("RGB", (1, 1)), "hue")
+
+
+def test_apply_opacity_scales_only_alpha():
+    img = Image.new("RGBA", (2, 2), (10, 200, 30, 200))
+    assert apply_opacity(img, 100) is img
+    assert apply_opacity(img, 40).getpixel((0, 0)) == (10, 200, 30, 80)
+    assert opacity_alpha(40) == 102
+
+
+def test_normal_composite_applies_alpha_once():
+    base = Image.new("RGBA", (4, 4), (0, 0, 0, 0))
+    layer = Image.new("RGBA", (2, 2), SOURCE + (128,))
+    composite_layer(base, layer, (1, 1))
+    assert base.getpixel((1, 1)) == SOURCE + (128,)  # A colagem antiga dava α²/255 = 64
+    opaque = Image.new("RGBA", (4, 4), BACKDROP + (255,))
+    composite_layer(opaque, layer, (1, 1))
+    pixel = opaque.getpixel((2, 2))
+    assert pixel[3] == 255
+    assert all(abs(got - (cs * 128 + cb * 127) / 255) <= 1 for got, cs, cb in zip(pixel, SOURCE, BACKDROP))
+
+
+def test_layers_partially_outside_the_base_are_clipped():
+    layer = Image.linear_gradient("L").resize((6, 6)).convert("RGBA")
+    base = Image.new("RGBA", (4, 4), (0, 0, 0, 0))
+    composite_layer(base, layer, (-2, -3))
+    assert base.crop((0, 0, 4, 3)).tobytes() == layer.crop((2, 3, 6, 6)).tobytes()
+    assert base.getchannel("A").getbbox() == (0, 0, 4, 3)
+    composite_layer(base, layer, (10, 10))  # Fora da base: nada muda
+    assert base.getchannel("A").getbbox() == (0, 0, 4, 3)
+
+
+def test_layer_opacity_renders_once_through_the_pipeline():
+    layer = ImageLayer(Image.new("RGBA", (4, 4), SOURCE + (200,)), "camada.png", x=1, y=1, opacity=50)
+    pixel = render_region([layer], [layer], (0, 0, 6, 6)).getpixel((2, 2))
+    assert pixel == SOURCE + (100,)
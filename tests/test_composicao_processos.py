@@ -0,0 +1,47 @@
+from PIL import Image
+
+from pileditorgui.cena import SceneDocument
+from pileditorgui.composicao_processos import export_png_parallel, render_parallel
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.grupos import LayerGroup
+from pileditorgui.renderizacao import render_region
+
+SIZE = (160, 120)
+
+
+def build():
+    """Cena com camadas em modo compacto (L, P), mesclagem, grupo, recorte e rotação."""
+    document = SceneDocument()
+    document.add(ImageLayer(Image.linear_gradient("L").resize(SIZE), "gradiente.png"))
+    palette = Image.new("RGB", (60, 40), (10, 200, 90)).convert("P", palette=Image.Palette.ADAPTIVE)
+    document.add(ImageLayer(palette, "paleta.png", x=-10, y=30, opacity=70))
+    stamp = ImageLayer(Image.new("RGBA", (50, 50), (200, 20, 20, 160)), "carimbo.png", x=90, y=50)
+    stamp.blend_mode = "multiply"
+    document.add(stamp)
+    frame = document.add(Shape(20, 10, 70, 50, fill="#3366cc", corner_radius=12, outline_width=2))
+    photo = document.add(ImageLayer(Image.new("RGBA", (80, 60), (250, 250, 0, 255)), "foto.png", x=10, y=5))
+    document.edit(photo).clip = True
+    document.add(TextShape(30, 80, "Faixas", font_size=18, fill="#ffffff"))
+    turned = document.add(Shape(110, 10, 30, 20, fill="#00aa00", opacity=60, outline_width=0))
+    document.edit(turned).transform = (0.0, 1.0, -1.0, 0.0)
+    members = [document.add(Shape(100, 90, 40, 20, fill="#aa00aa", outline_width=1))]
+    document.group(members, LayerGroup.from_items(members))
+    assert frame is not None
+    return document.snapshot()
+
+
+def test_parallel_render_matches_render_region():
+    scene = build()
+    expected = render_region(scene.images, scene.shapes, (0, 0) + SIZE)
+    # Faixas que não dividem a altura e mais faixas que vagas no anel de saída
+    result = render_parallel(scene.images, scene.shapes, SIZE, workers=2, stripe_height=25)
+    assert result.tobytes() == expected.tobytes()
+
+
+def test_parallel_png_export_decodes_to_render_region(tmp_path):
+    scene = build()
+    path = tmp_path / "cena.png"
+    export_png_parallel(scene.images, scene.shapes, SIZE, str(path), level=1, workers=2, stripe_height=32)
+    with Image.open(path) as saved:
+        assert saved.mode == "RGBA" and saved.size == SIZE
+        assert saved.tobytes() == render_region(scene.images, scene.shapes, (0, 0) + SIZE).tobytes()
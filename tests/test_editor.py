@@ -0,0 +1,54 @@
+from pileditorgui import editor as editor_module
+from pileditorgui.cena import SceneDocument
+from pileditorgui.editor import Editor, Shape, TextShape
+from pileditorgui.historico import History
+from pileditorgui.memoria import MemoryGovernor
+from pileditorgui.mosaico import _item_box, scene_damage
+
+
+def _editor():
+    """Editor sem janela; cada redesenho guarda a cena atual em `redraws`."""
+    editor = Editor.__new__(Editor)
+    editor.document = SceneDocument()
+    editor.selection = []
+    editor.history = History()
+    editor.memory = MemoryGovernor()
+    editor.redraws = []
+    editor.update_canvas = lambda: editor.redraws.append(editor.document.current)
+    return editor
+
+
+def test_batched_edit_of_a_selection_is_one_undo_step_and_one_redraw(monkeypatch):
+    editor = _editor()
+    items = [editor.document.add(Shape(10, 10, 20, 20)), editor.document.add(TextShape(300, 200, "Nome")),
+             editor.document.add(Shape(600, 400, 20, 20))]
+    editor.save_state()
+    before = editor.history.peek()["scene"]
+    editor.selection = list(items)
+
+    monkeypatch.setattr(editor_module.simpledialog, "askinteger", lambda *args, **kwargs: 40)
+    editor.set_opacity()
+    assert len(editor.history) == 2 and len(editor.redraws) == 1
+    assert [item.opacity for item in editor.document.current.shapes] == [40, 40, 40]
+    assert [item.opacity for item in before.shapes] == [100, 100, 100]
+    # Uma caixa por item alterado, sem a área entre os itens distantes
+    damage = scene_damage(before, editor.document.current)
+    assert sorted(damage) == sorted([_item_box(item) for item in items] + [_item_box(item) for item in editor.selection])
+
+    monkeypatch.setattr(editor_module.colorchooser, "askcolor", lambda *args, **kwargs: ((0, 255, 0), "#00ff00"))
+    editor.set_color()
+    assert len(editor.history) == 3 and len(editor.redraws) == 2
+    assert [item.fill for item in editor.document.current.shapes] == ["#00ff00"] * 3
+    assert editor.selection == list(editor.document.current.shapes)
+
+
+def test_undo_restores_the_whole_selection_edit(monkeypatch):
+    editor = _editor()
+    items = [editor.document.add(Shape(i * 50, 0, 20, 20)) for i in range(3)]
+    editor.selection = list(items)
+    editor.save_state()
+    monkeypatch.setattr(editor_module.simpledialog, "askinteger", lambda *args, **kwargs: 10)
+    editor.set_opacity()
+    editor.undo(None)
+    assert [item.opacity for item in editor.document.current.shapes] == [100, 100, 100]
+    assert [item._id for item in editor.selection] == [item._id for item in items]
@@ -0,0 +1,84 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+from PIL import Image
+
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.exportacao import build_js_scene, generate_javascript, generate_lua_dx
+from pileditorgui.grupos import LayerGroup
+
+# DOM mínimo para rodar o runtime exportado no Node: registra as chamadas de
+# desenho e a ordem em que as imagens terminam de decodificar.
+FAKE_DOM = """
+const calls = [];
+let canvases = 0;
+class Context {
+    constructor(name) { this.name = name; }
+    drawImage(source) { calls.push([this.name, 'drawImage', source.label]); }
+    clearRect() { calls.push([this.name, 'clear']); }
+    fillText(text) { calls.push([this.name, 'text', text]); }
+    beginPath() {} rect() {} fill() { calls.push([this.name, 'fill', this.fillStyle]); } stroke() {}
+}
+class Canvas {
+    constructor() { this.label = 'canvas' + canvases++; this.ctx = new Context(this.label); }
+    getContext() { return this.ctx; }
+}
+class Image {
+    set src(value) { this.label = value; }
+    decode() { return new Promise(resolve => setTimeout(() => { calls.push(['decoded', this.label]); resolve(); }, 5)); }
+}
+globalThis.Image = Image;
+globalThis.createImageBitmap = img => Promise.resolve({ label: img.label });
+globalThis.document = { createElement: () => new Canvas(), body: { appendChild() {} } };
+globalThis.window = {};
+"""
+
+
+def test_lua_dx_escapes_texture_names_and_notes_dropped_style():
+    layer = ImageLayer(Image.new("RGBA", (4, 4)), "img/it's \"a\".png")
+    code = generate_lua_dx([layer], [Shape(1, 2, 3, 4, corner_radius=2)], 10, 10)
+    assert 'dxCreateTexture("it\'s \\"a\\".png")' in code
+    assert "-- dxDrawRectangle não tem cantos arredondados (raio 2)" in code
+
+
+def test_lua_dx_keeps_same_named_files_apart():
+    layers = [ImageLayer(Image.new("RGBA", (4, 4)), path) for path in ("a/logo.png", "b/logo.png", "a/fundo.png")]
+    code = generate_lua_dx(layers, [], 10, 10)
+    assert 'textures[1] = dxCreateTexture("a/logo.png")' in code
+    assert 'textures[2] = dxCreateTexture("b/logo.png")' in code
+    assert 'textures[3] = dxCreateTexture("fundo.png")' in code
+    assert "textures[2], 0, 0, 0" in code
+
+
+def test_js_scene_loads_each_file_once_and_flattens_groups():
+    layers = [ImageLayer(Image.new("RGBA", (4, 4)), path, x=i) for i, path in enumerate(("a.png", "b.png", "a.png"))]
+    members = [Shape(1, 1, 2, 2, fill="#ff0000")]
+    scene = build_js_scene(layers, [LayerGroup.from_items(members)], 10, 10)
+    assert scene["assets"] == ["a.png", "b.png"]
+    assert [item["asset"] for item in scene["items"] if item["type"] == "image"] == [0, 1, 0]
+    assert [item["type"] for item in scene["items"]] == ["image", "image", "image", "rect"]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="Node.js não instalado")
+def test_js_runtime_draws_after_every_bitmap_and_caches_the_background():
+    layers = [ImageLayer(Image.new("RGBA", (4, 4)), path) for path in ("fundo.png", "logo.png")]
+    shapes = [Shape(0, 0, 5, 5, fill="#112233"), TextShape(1, 1, "Nome"), Shape(2, 2, 3, 3, fill="#445566")]
+    code = FAKE_DOM + generate_javascript(layers, shapes, 20, 20) + """
+window.pilEditor.ready.then(() => {
+    window.pilEditor.setText(0, 'Outro');
+    console.log(JSON.stringify(calls));
+});
+"""
+    result = subprocess.run(["node"], input=code, capture_output=True, text=True, check=True)
+    calls = json.loads(result.stdout)
+    first_draw = next(i for i, call in enumerate(calls) if call[1:2] == ["drawImage"])
+    assert {tuple(call) for call in calls[:first_draw]} == {("decoded", "fundo.png"), ("decoded", "logo.png")}
+    # O fundo (canvas1) recebe as imagens e a forma antes do texto uma única vez
+    assert [call for call in calls if call[0] == "canvas1"] == [
+        ["canvas1", "drawImage", "fundo.png"], ["canvas1", "drawImage", "logo.png"], ["canvas1", "fill", "#112233"]]
+    # Cada renderização copia o fundo e redesenha só o texto e o que vem depois
+    assert [call for call in calls if call[0] == "canvas0"] == [
+        ["canvas0", "clear"], ["canvas0", "drawImage", "canvas1"], ["canvas0", "text", "Nome"], ["canvas0", "fill", "#445566"],
+        ["canvas0", "clear"], ["canvas0", "drawImage", "canvas1"], ["canvas0", "text", "Outro"], ["canvas0", "fill", "#445566"]]
@@ -0,0 +1,122 @@
+import copy
+from collections import Counter
+
+from PIL import Image, ImageChops
+
+from pileditorgui.editor import ImageLayer, Shape
+from pileditorgui.grafo_renderizacao import OpacityNode, PyramidNode, RenderGraph, ResizeNode, SourceNode, ZoomNode, pyramid_level
+from pileditorgui.renderizacao import render_region
+
+REGION = (0, 0, 120, 90)
+
+
+def build():
+    layer = ImageLayer(Image.linear_gradient("L").convert("RGBA"), "gradiente.png", x=5, y=5, opacity=60)
+    layer.width, layer.height = 100, 70
+    frame = Shape(10, 10, 50, 40, fill="#3366cc", corner_radius=6)
+    photo = ImageLayer(Image.new("RGBA", (40, 30), (250, 250, 0, 255)), "foto.png", x=20, y=20)
+    photo.clip = True
+    return layer, [layer, photo], [layer, frame, photo]
+
+
+def count_computes(monkeypatch):
+    counts = Counter()
+    for node_class in (ResizeNode, OpacityNode):
+        compute = node_class.compute
+
+        def counted(self, graph, region, scale, compute=compute, name=node_class.__name__):
+            counts[name] += 1
+            return compute(self, graph, region, scale)
+        monkeypatch.setattr(node_class, "compute", counted)
+    return counts
+
+
+def test_graph_matches_render_region():
+    _, images, shapes = build()
+    graph = RenderGraph()
+    assert graph.render(images, shapes, REGION).tobytes() == render_region(images, shapes, REGION).tobytes()
+    assert graph.render(images, shapes, (30, 15, 90, 60)).tobytes() == \
+        render_region(images, shapes, (30, 15, 90, 60)).tobytes()
+
+
+def test_only_nodes_whose_parameters_changed_are_recomputed(monkeypatch):
+    layer, images, shapes = build()
+    counts = count_computes(monkeypatch)
+    graph = RenderGraph()
+    graph.render(images, shapes, REGION)
+    graph.render(images, shapes, REGION)
+    assert counts == {"ResizeNode": 1, "OpacityNode": 1}
+
+    moved = copy.copy(layer)
+    moved.x += 7  # A posição não entra nas chaves do tamanho nem da opacidade
+    graph.render([moved, images[1]], [moved] + shapes[1:], REGION)
+    assert counts == {"ResizeNode": 1, "OpacityNode": 1}
+
+    faded = copy.copy(layer)
+    faded.opacity = 30
+    graph.render([faded, images[1]], [faded] + shapes[1:], REGION)
+    assert counts == {"ResizeNode": 1, "OpacityNode": 2}
+
+
+def test_region_pass_memoizes_only_layer_rasters():
+    _, images, shapes = build()
+    graph = RenderGraph()
+    graph.render(images, shapes, REGION, memo_regions=False)
+    assert graph.memory_usage() == 2 * 100 * 70 * 4  # Tamanho e opacidade da camada grande
+    graph.render(images, shapes, REGION)
+    assert graph.memory_usage() > 2 * 100 * 70 * 4
+    assert graph.release(1) > 0
+    graph.clear()
+    assert graph.memory_usage() == 0
+
+
+def test_memo_stays_within_its_byte_budget():
+    _, images, shapes = build()
+    graph = RenderGraph(max_bytes=100 * 70 * 4)
+    for left in range(0, 60, 10):
+        graph.render(images, shapes, (left, 0, left + 60, 90))
+        assert graph.memory_usage() <= graph.max_bytes
+
+
+def zoom_scene():
+    layer = ImageLayer(Image.radial_gradient("L").convert("RGBA"), "radial.png", x=3, y=2, opacity=80)
+    return [layer], [layer, Shape(20, 30, 60, 40, fill="#ff0000", outline_width=2)]
+
+
+def max_difference(a, b):
+    return max(high for _, high in ImageChops.difference(a, b).getextrema())
+
+
+def test_zoomed_regions_match_the_whole_view():
+    images, shapes = zoom_scene()
+    for scale in (2.0, 3.0, 0.5, 0.25):
+        size = int(300 * scale)
+        whole = RenderGraph().render(images, shapes, (0, 0, size, size), scale)
+        for region in ((10, 10, size // 2, size // 3), (size // 3, size // 4, size, size)):
+            part = RenderGraph().render(images, shapes, region, scale)
+            # Afastado, o recorte reamostra a partir de um nível da pirâmide: diferença de arredondamento
+            assert max_difference(part, whole.crop(region)) <= (0 if scale > 1 else 1), (scale, region)
+
+
+def test_zoom_resamples_only_the_visible_area(monkeypatch):
+    images, shapes = zoom_scene()
+    sizes = []
+    compute = ZoomNode.compute
+
+    def recorded(self, graph, region, scale):
+        output = compute(self, graph, region, scale)
+        sizes.append(output.size)
+        return output
+
+    monkeypatch.setattr(ZoomNode, "compute", recorded)
+    region = (500, 400, 600, 480)
+    RenderGraph().render(images, shapes, region, 4.0)
+    assert sizes == [(100, 80)]  # Não os 1200 x 1200 da camada inteira
+
+
+def test_zoomed_out_layers_start_from_the_nearest_pyramid_level():
+    source = SourceNode(ImageLayer(Image.new("RGBA", (1024, 1024)), "grande.png").asset)
+    assert pyramid_level(source, (1024, 1024), (1024, 1024)) is source
+    level = pyramid_level(source, (1024, 1024), (200, 200))
+    assert isinstance(level, PyramidNode) and level.level == 2
+    assert RenderGraph().evaluate(level).size == (256, 256)
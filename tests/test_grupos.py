@@ -0,0 +1,73 @@
+from PIL import Image
+
+from pileditorgui.cache_exportacao import scene_hash
+from pileditorgui.cena import SceneDocument
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.grafo_renderizacao import RenderGraph
+from pileditorgui.grupos import LayerGroup, flatten_leaves
+from pileditorgui.mosaico import TileRenderer, scene_size
+from pileditorgui.renderizacao import render_region
+
+
+def build():
+    document = SceneDocument()
+    document.add(ImageLayer(Image.new("RGBA", (300, 200), (255, 255, 255, 255)), "fundo.png"))
+    document.add(ImageLayer(Image.new("RGBA", (80, 60), (200, 30, 30, 180)), "a.png", x=20, y=30, opacity=80))
+    document.add(Shape(50, 40, 120, 80, fill="green", opacity=60, outline_width=3, corner_radius=8))
+    document.add(TextShape(60, 60, "Grupo", font_size=20, fill="white"))
+    document.add(ImageLayer(Image.new("RGBA", (90, 90), (30, 30, 200, 128)), "b.png", x=100, y=50))
+    return document
+
+
+def group_middle(document):
+    members = list(document.shapes[1:4])
+    return document.group(members, LayerGroup.from_items(members))
+
+
+def test_grouped_scene_renders_like_ungrouped():
+    plain = build().snapshot()
+    document = build()
+    group_middle(document)
+    grouped = document.snapshot()
+    assert scene_size(grouped) == scene_size(plain)
+    for scale in (0.5, 1.0, 1.5):
+        region = (0, 0, int(300 * scale), int(200 * scale))
+        expected = render_region(plain.images, plain.shapes, region, scale)
+        assert render_region(grouped.images, grouped.shapes, region, scale).tobytes() == expected.tobytes()
+        graph = RenderGraph().render(grouped.images, grouped.shapes, region, scale)
+        assert graph.tobytes() == RenderGraph().render(plain.images, plain.shapes, region, scale).tobytes()
+        assert TileRenderer(RenderGraph()).render(grouped, region, scale).tobytes() == graph.tobytes()
+
+
+def test_group_opacity_and_blend_match_ungroup():
+    document = build()
+    group = document.edit(group_middle(document))
+    group.set_opacity(50)
+    group.set_blend_mode("multiply")
+    grouped = document.snapshot()
+    _, leaves = flatten_leaves(grouped.images, grouped.shapes)
+    assert [getattr(item, "blend_mode", None) for item in leaves] == ["normal", "multiply", None, None, "normal"]
+    document.ungroup(group)
+    ungrouped = document.snapshot()
+    region = (0, 0, 300, 200)
+    assert render_region(grouped.images, grouped.shapes, region).tobytes() == \
+        render_region(ungrouped.images, ungrouped.shapes, region).tobytes()
+
+
+def test_hidden_group_keeps_canvas_size():
+    document = build()
+    document.edit(group_middle(document)).set_visible(False)
+    assert scene_size(document.snapshot()) == (300, 200)
+
+
+
+def test_groups_stay_in_the_image_pass_and_in_the_export_hash():
+    document = build()
+    group = group_middle(document)
+    scene = document.snapshot()
+    assert group in scene.images and not hasattr(group, "image")
+    faded = build()
+    faded.edit(faded.shapes[1]).opacity = 10
+    group_middle(faded)
+    assert scene_hash(scene.images, scene.shapes, (300, 200))[0] != \
+        scene_hash(faded.current.images, faded.current.shapes, (300, 200))[0]
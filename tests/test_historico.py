@@ -0,0 +1,36 @@
+import io
+
+from PIL import Image
+
+from pileditorgui.historico import History, _StatePickler, _StateUnpickler
+from pileditorgui.registro_assets import AssetRegistry
+
+
+def test_history_keeps_only_the_newest_states():
+    history = History(limit=3)
+    for state in range(5):
+        history.push(state)
+    assert len(history) == 3
+    assert history.peek() == 4
+    assert history.pop() == 4
+    assert history.pop() == 3
+    assert history.peek() == 2
+
+
+def test_memory_usage_sums_the_estimate():
+    history = History(limit=10, estimate=len)
+    history.push("abc")
+    history.push("de")
+    assert history.memory_usage() == 5
+    history.pop()
+    assert history.memory_usage() == 3
+
+
+def test_state_pickler_keeps_assets_by_reference():
+    asset = AssetRegistry().acquire(Image.new("RGBA", (4, 4), (255, 0, 0, 255)))
+    buffer, assets = io.BytesIO(), {}
+    _StatePickler(buffer, assets).dump({"layers": [asset]})
+    assert list(assets) == [asset.content_hash]
+    buffer.seek(0)
+    state = _StateUnpickler(buffer, assets).load()
+    assert state["layers"][0] is asset
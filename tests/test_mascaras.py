@@ -0,0 +1,63 @@
+from PIL import Image
+
+from pileditorgui import mascaras
+from pileditorgui.colecao_formas import ShapeCollection
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.grafo_renderizacao import RenderGraph
+from pileditorgui.mascaras import MaskCache, clip_bases
+from pileditorgui.renderizacao import render_region
+
+YELLOW = (250, 250, 0, 255)
+
+
+def clipped(item):
+    item.clip = True
+    return item
+
+
+def test_clip_bases_follow_the_drawing_order():
+    frame, text = Shape(0, 0, 10, 10), TextShape(0, 0, "A")
+    photo, texture = clipped(ImageLayer(Image.new("RGBA", (4, 4)), "foto.png")), clipped(Shape(1, 1, 2, 2))
+    orphan = clipped(Shape(5, 5, 2, 2))
+    collection = ShapeCollection.grid(0, 0, 2, 2)
+    assert clip_bases([orphan, frame, photo, texture, text]) == {id(photo): frame, id(texture): frame}
+    assert clip_bases([collection, photo]) == {}  # Coleções não servem de base
+
+
+def test_photo_clipped_by_a_rounded_frame():
+    background = ImageLayer(Image.new("RGBA", (100, 80), (0, 0, 0, 255)), "fundo.png")
+    frame = Shape(20, 10, 60, 50, fill="#ffffff", corner_radius=20, outline_width=0)
+    photo = clipped(ImageLayer(Image.new("RGBA", (100, 80), YELLOW), "foto.png"))
+    images, shapes = [background, photo], [background, frame, photo]
+    result = render_region(images, shapes, (0, 0, 100, 80))
+    assert result.getpixel((50, 35)) == YELLOW  # Dentro da moldura
+    assert result.getpixel((5, 5)) == (0, 0, 0, 255)  # Fora: só o fundo
+    assert result.getpixel((21, 11)) != YELLOW  # Canto arredondado
+    assert RenderGraph().render(images, shapes, (0, 0, 100, 80)).tobytes() == result.tobytes()
+    frame.clip = False
+    photo.clip = False
+    assert render_region(images, shapes, (0, 0, 100, 80)).getpixel((5, 5)) == YELLOW
+
+
+def test_base_masks_are_cached_per_version_and_scale(monkeypatch):
+    builds = []
+    shape_mask = mascaras._shape_mask
+    monkeypatch.setattr(mascaras, "_shape_mask", lambda item, scale: builds.append(scale) or shape_mask(item, scale))
+    cache = MaskCache()
+    frame = Shape(20, 10, 60, 50, corner_radius=20)
+    left, top, alpha = cache.mask(frame, 1.0)
+    frame.x += 30  # Só a posição muda: a mesma máscara, deslocada
+    assert cache.mask(frame, 1.0) == (left + 30, top, alpha)
+    cache.mask(frame, 0.5)
+    frame.set_corner_radius(5)
+    cache.mask(frame, 1.0)
+    assert builds == [1.0, 0.5, 1.0]
+    assert cache.memory_usage() > 0
+    assert cache.release(cache.memory_usage()) > 0 and cache.memory_usage() == 0
+
+
+def test_mask_cache_stays_within_its_budget():
+    cache = MaskCache(max_bytes=80 * 70)
+    for radius in range(5):
+        cache.mask(Shape(0, 0, 60, 50, corner_radius=radius), 1.0)
+        assert cache.memory_usage() <= cache.max_bytes
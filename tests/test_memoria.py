@@ -0,0 +1,8 @@
+from pileditorgui.memoria import FALLBACK_BUDGET_MB, _budget_from_env
+
+
+def test_budget_from_env_falls_back_on_bad_values():
+    assert _budget_from_env(None) == FALLBACK_BUDGET_MB
+    assert _budget_from_env("512") == 512
+    for value in ("", "1.5G", "abc", "0", "-3"):
+        assert _budget_from_env(value) == FALLBACK_BUDGET_MB
@@ -0,0 +1,105 @@
+from PIL import Image
+
+from pileditorgui.cena import SceneDocument
+from pileditorgui.editor import ImageLayer, Shape
+from pileditorgui.grafo_renderizacao import RenderGraph
+from pileditorgui.mosaico import FULL_DAMAGE, TileRenderer, _item_box, scene_damage
+
+SIZE = (200, 150)
+REGION = (0, 0) + SIZE
+
+
+def expected(scene):
+    return RenderGraph().render(scene.images, scene.shapes, REGION).tobytes()
+
+
+def test_drag_in_place_with_marked_damage_matches_a_fresh_render():
+    document = SceneDocument()
+    document.add(ImageLayer(Image.linear_gradient("L").resize(SIZE), "fundo.png"))
+    shape = document.add(Shape(20, 20, 40, 30, fill="#cc3333"))
+    renderer = TileRenderer(RenderGraph(), tile_size=64, workers=1)
+    renderer.render(document.snapshot(), REGION, 1.0)
+
+    # Arraste como no editor: marca, altera, marca de novo e desenha a cena atual
+    for _ in range(3):
+        renderer.damage([shape])
+        shape = document.edit(shape)
+        shape.x += 50
+        shape.y += 10
+        renderer.damage([shape])
+        assert renderer.render(document.current, REGION, 1.0).tobytes() == expected(document.current)
+    assert document.edit(shape) is shape  # Copiado uma vez só, no primeiro movimento
+
+
+def tiled_document():
+    document = SceneDocument()
+    document.add(ImageLayer(Image.linear_gradient("L").resize(SIZE), "fundo.png"))
+    shape = document.add(Shape(10, 10, 30, 20, fill="#cc3333"))
+    far = document.add(Shape(150, 100, 30, 30, fill="#3333cc"))
+    return document, shape, far
+
+
+def counted_renderer(monkeypatch, **options):
+    graph = RenderGraph()
+    boxes = []
+    render = graph.render
+
+    def recorded(images, shapes, box, *args):
+        boxes.append(box)
+        return render(images, shapes, box, *args)
+
+    monkeypatch.setattr(graph, "render", recorded)
+    return TileRenderer(graph, tile_size=64, workers=1, **options), boxes
+
+
+def test_scene_damage_boxes():
+    document, shape, far = tiled_document()
+    before = document.snapshot()
+    assert scene_damage(None, before) == FULL_DAMAGE
+    assert scene_damage(before, before) is None
+    moved = document.edit(shape)
+    moved.x += 5
+    assert scene_damage(before, document.snapshot()) == [_item_box(shape), _item_box(moved)]
+    assert _item_box(moved)[0] == _item_box(shape)[0] + 5
+    after = document.snapshot()
+    document.move(far, 1)  # A troca de ordem só atinge a caixa do item movido (copiado por move)
+    assert set(scene_damage(after, document.snapshot())) == {_item_box(far)}
+
+
+def test_scene_damage_includes_items_clipped_by_a_changed_base():
+    document, shape, _ = tiled_document()
+    photo = document.add(ImageLayer(Image.new("RGBA", (20, 20), (0, 200, 0, 255)), "foto.png", x=100, y=40))
+    document.edit(photo).clip = True
+    document.move(photo, 2)  # Logo acima de `shape`, que passa a ser a base
+    before = document.snapshot()
+    document.edit(shape).fill = "#00ff00"
+    damage = scene_damage(before, document.snapshot())
+    assert photo.get_bounding_box() in damage
+
+
+def test_cached_tiles_are_reused_and_only_damaged_ones_rerendered(monkeypatch):
+    document, shape, _ = tiled_document()
+    renderer, boxes = counted_renderer(monkeypatch)
+    renderer.render(document.snapshot(), (0, 0, 128, 128), 1.0)
+    assert len(boxes) == 4
+    renderer.render(document.snapshot(), (0, 0, 128, 128), 1.0)
+    assert len(boxes) == 4
+    renderer.render(document.snapshot(), (64, 0, 192, 128), 1.0)  # Arraste da vista: só a coluna exposta
+    assert boxes[4:] == [(128, 0, 192, 64), (128, 64, 192, 128)]
+    del boxes[:]
+    document.edit(shape).x += 5
+    scene = document.snapshot()
+    output = renderer.render(scene, (0, 0, 192, 128), 1.0)
+    assert boxes == [(0, 0, 64, 64)]
+    assert output.tobytes() == RenderGraph().render(scene.images, scene.shapes, (0, 0, 192, 128)).tobytes()
+
+
+def test_tile_cache_is_bounded_and_releasable(monkeypatch):
+    document, _, _ = tiled_document()
+    renderer, boxes = counted_renderer(monkeypatch, max_bytes=3 * 64 * 64 * 4)
+    scene = document.snapshot()
+    renderer.render(scene, REGION, 1.0)
+    assert renderer.memory_usage() <= renderer.max_bytes
+    assert renderer.release(1) == 64 * 64 * 4
+    renderer.render(scene, (0, 0, 64, 64), 2.0)  # Outro zoom: tiles próprios
+    assert boxes[-1] == (0, 0, 64, 64)
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from pileditorgui.ordem_z import MAX_KEY_BITS, ZOrder
+
+
+class Item:
+    def __init__(self, item_id):
+        self._id = item_id
+
+    def __repr__(self):
+        return f"Item({self._id})"
+
+
+def ids(order):
+    return [item._id for item in order]
+
+
+def test_from_items_keeps_order():
+    items = [Item(i) for i in (5, 3, 9, 1)]
+    order = ZOrder.from_items(items)
+    assert ids(order) == [5, 3, 9, 1]
+    assert [order.rank(i) for i in (5, 3, 9, 1)] == [0, 1, 2, 3]
+    assert order.find(9) is items[2]
+    assert order.find(4) is None
+
+
+def test_from_items_rejects_duplicate_ids():
+    with pytest.raises(ValueError):
+        ZOrder.from_items([Item(1), Item(1)])
+
+
+def test_insert_remove_replace_are_persistent():
+    order = ZOrder.from_items([Item(1), Item(2)])
+    inserted = order.insert(1, [Item(3), Item(4)])
+    assert ids(inserted) == [1, 3, 4, 2]
+    assert ids(order) == [1, 2]
+    removed = inserted.remove(3)
+    assert ids(removed) == [1, 4, 2]
+    assert removed.find(3) is None
+    new = Item(4)
+    replaced = removed.replace(new)
+    assert replaced.find(4) is new
+    assert removed.find(4) is not new
+    assert replaced.rank(4) == 1
+
+
+def test_insert_rejects_existing_id():
+    order = ZOrder.from_items([Item(1)])
+    with pytest.raises(ValueError):
+        order.insert(0, [Item(1)])
+
+
+def test_missing_id_raises():
+    order = ZOrder.from_items([Item(1)])
+    with pytest.raises(KeyError):
+        order.remove(2)
+    with pytest.raises(KeyError):
+        order.rank(2)
+    with pytest.raises(KeyError):
+        order.replace(Item(2))
+
+
+def test_alternating_moves_keep_keys_bounded():
+    items = [Item(i) for i in range(3)]
+    order = ZOrder.from_items(items)
+    for step in range(2000):
+        moved = items[step % 2]
+        order = order.remove(moved._id).insert(1, [moved])
+        key = order.key_of(moved._id)
+        assert key.denominator.bit_length() <= MAX_KEY_BITS
+    assert sorted(ids(order)) == [0, 1, 2]
+    assert len(order) == 3
+
+
+def test_random_operations_match_list():
+    rng = random.Random(7)
+    expected = [Item(i) for i in range(50)]
+    order = ZOrder.from_items(expected)
+    next_id = 50
+    for _ in range(2000):
+        operation = rng.random()
+        if operation < 0.3 and expected:
+            item = expected.pop(rng.randrange(len(expected)))
+            order = order.remove(item._id)
+        elif operation < 0.6:
+            item = Item(next_id)
+            next_id += 1
+            index = rng.randint(0, len(expected))
+            expected.insert(index, item)
+            order = order.insert(index, [item])
+        elif expected:
+            item = expected.pop(rng.randrange(len(expected)))
+            index = rng.randint(0, len(expected))
+            expected.insert(index, item)
+            order = order.remove(item._id).insert(index, [item])
+    assert list(order) == expected
+    assert all(order.rank(item._id) == index for index, item in enumerate(expected))
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from PIL import Image
+
+from pileditorgui import perfil_exportacao
+from pileditorgui.editor import ImageLayer, Shape
+from pileditorgui.perfil_exportacao import ExportProfile, export_profile
+from pileditorgui.renderizacao import render_region
+
+
+def test_png_options_survive_the_saved_profile(tmp_path):
+    profile = ExportProfile.from_spec("2x:png, thumb64:webp", png_compress_level=3, png_filter="sub", verify_png=True)
+    profile.save(str(tmp_path / "cartao.export.json"))
+    loaded = ExportProfile.load(str(tmp_path / "cartao.export.json"))
+    assert (loaded.to_spec(), loaded.png_compress_level, loaded.png_filter, loaded.verify_png) == \
+        ("2x:png, thumb64:webp", 3, "sub", True)
+    assert ExportProfile.from_dict({"outputs": []}).png_filter == "up"
+
+
+def build():
+    images = [ImageLayer(Image.linear_gradient("L").resize((160, 120)), "gradiente.png")]
+    return images, images + [Shape(20, 10, 70, 50, fill="#3366cc", corner_radius=8)]
+
+
+def test_profile_composites_once_and_derives_the_smaller_outputs(tmp_path, monkeypatch):
+    images, shapes = build()
+    calls = []
+
+    def counted(*args):
+        calls.append(args[2])
+        return render_region(*args)
+
+    monkeypatch.setattr(perfil_exportacao, "render_region", counted)
+    profile = ExportProfile.from_spec("1x:png, 2x:png, thumb64:png")
+    paths = export_profile(images, shapes, (160, 120), profile, str(tmp_path / "cartao"))
+    assert calls == [(0, 0, 320, 240)]
+    assert sorted(os.path.basename(path) for path in paths) == ["cartao.png", "cartao@2x.png", "cartao_thumb64.png"]
+    with Image.open(tmp_path / "cartao@2x.png") as big, Image.open(tmp_path / "cartao.png") as normal, \
+            Image.open(tmp_path / "cartao_thumb64.png") as thumb:
+        assert (big.size, normal.size, thumb.size) == ((320, 240), (160, 120), (64, 48))
+        assert normal.tobytes() == big.reduce(2).tobytes()
+
+
+def test_spec_parsing_and_unknown_formats():
+    profile = ExportProfile.from_spec(" 0.5x:JPEG , thumb:webp,")
+    assert [(output.name, output.scale, output.max_size, output.format) for output in profile.outputs] == [
+        ("@0.5x", 0.5, None, "jpg"), ("_thumb256", 1.0, 256, "webp")]
+    assert profile.outputs[1].resolve_scale(1024, 512) == 0.25
+    with pytest.raises(ValueError):
+        ExportProfile.from_spec("1x:gif")
+    with pytest.raises(ValueError):
+        ExportProfile.from_spec(" , ")
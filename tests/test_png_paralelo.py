@@ -0,0 +1,78 @@
+import io
+import zlib
+
+import pytest
+from PIL import Image
+
+from pileditorgui.png_paralelo import PNG_FILTERS, WINDOW_SIZE, adler32_combine, verify_png, write_png_stripes
+
+
+def _image(mode, size=(97, 61)):
+    """Ruído com gradiente: nem trivial de comprimir nem incompressível."""
+    noise = Image.effect_noise(size, 40)
+    gradient = Image.linear_gradient("L").resize(size)
+    bands = [noise, gradient, Image.merge("L", [noise]).transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient]
+    return Image.merge(mode, bands[:len(mode)])
+
+
+def _stripes(image, height):
+    return [image.crop((0, top, image.width, min(top + height, image.height)))
+            for top in range(0, image.height, height)]
+
+
+def _encode(image, stripe_height, **options):
+    output = io.BytesIO()
+    write_png_stripes(output, image.size, image.mode, _stripes(image, stripe_height), **options)
+    output.seek(0)
+    with Image.open(output) as decoded:
+        decoded.load()
+        return decoded
+
+
+@pytest.mark.parametrize("png_filter", sorted(PNG_FILTERS))
+@pytest.mark.parametrize("stripe_height", [1, 7, 16, 61, 200])
+@pytest.mark.parametrize("primed", [True, False])
+def test_round_trip_through_pillow(png_filter, stripe_height, primed):
+    image = _image("RGBA")
+    decoded = _encode(image, stripe_height, png_filter=png_filter, primed=primed, workers=3, level=6)
+    assert decoded.mode == "RGBA" and decoded.size == image.size
+    assert decoded.tobytes() == image.tobytes()
+
+
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+def test_round_trip_for_every_mode(mode):
+    image = _image(mode)
+    assert _encode(image, 10, png_filter="sub").tobytes() == image.tobytes()
+
+
+def test_primed_stripes_span_more_than_the_window():
+    # Faixas maiores que a janela do deflate: o dicionário é só o fim da anterior
+    image = _image("RGBA", (300, 90))
+    assert len(_stripes(image, 40)[0].tobytes()) > WINDOW_SIZE
+    for level in (0, 1, 9):
+        assert _encode(image, 40, level=level).tobytes() == image.tobytes()
+
+
+def test_adler32_combine_matches_zlib():
+    first, second = b"faixa de cima" * 1000, b"faixa de baixo" * 7000
+    combined = adler32_combine(zlib.adler32(first), zlib.adler32(second), len(second))
+    assert combined == zlib.adler32(first + second)
+    assert adler32_combine(1, zlib.adler32(second), len(second)) == zlib.adler32(second)
+
+
+def test_stripes_must_cover_the_image():
+    image = _image("RGB")
+    with pytest.raises(ValueError):
+        write_png_stripes(io.BytesIO(), image.size, "RGB", _stripes(image, 10)[:-1])
+
+
+def test_verify_png_detects_a_different_image(tmp_path):
+    image = _image("RGBA")
+    path = tmp_path / "faixas.png"
+    with open(path, "wb") as fp:
+        write_png_stripes(fp, image.size, "RGBA", _stripes(image, 16))
+    verify_png(str(path), _stripes(image, 16))
+    changed = image.copy()
+    changed.putpixel((5, 40), (0, 0, 0, 0))
+    with pytest.raises(ValueError):
+        verify_png(str(path), _stripes(changed, 16))
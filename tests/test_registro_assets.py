@@ -0,0 +1,66 @@
+import copy
+import gc
+
+from PIL import Image
+
+from pileditorgui import registro_assets
+from pileditorgui.editor import ImageLayer
+from pileditorgui.registro_assets import AssetRegistry, asset_registry, compact_image
+from pileditorgui.renderizacao import render_region
+
+
+def test_equal_pixels_share_one_asset_until_released():
+    registry = AssetRegistry()
+    first = registry.acquire(Image.new("RGBA", (8, 8), (1, 2, 3, 255)))
+    assert registry.acquire(Image.new("RGBA", (8, 8), (1, 2, 3, 255))) is first
+    other = registry.acquire(Image.new("RGBA", (8, 8), (1, 2, 4, 255)))
+    assert other is not first
+    assert len(registry) == 2 and registry.total_bytes() == 2 * 8 * 8 * 4
+    del first, other
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_layers_loaded_twice_and_their_copies_share_the_pixels():
+    a = ImageLayer(Image.new("RGBA", (8, 8), (9, 9, 9, 255)), "a/rotulo.png")
+    b = ImageLayer(Image.new("RGBA", (8, 8), (9, 9, 9, 255)), "b/rotulo.png", x=30)
+    assert a.asset is b.asset and a.image is b.image
+    assert copy.copy(a).asset is a.asset and copy.deepcopy(a).asset is a.asset
+    b.image = Image.new("RGBA", (4, 4), (1, 1, 1, 255))  # Troca o asset, não altera o compartilhado
+    assert a.asset is not b.asset and a.image.size == (8, 8)
+    assert asset_registry.acquire(Image.new("RGBA", (8, 8), (9, 9, 9, 255))) is a.asset
+
+
+def label_image():
+    """Rótulo com poucas cores e alfa parcial, como os PNGs de texto."""
+    img = Image.new("RGBA", (40, 20), (0, 0, 0, 0))
+    img.paste((255, 255, 255, 255), (2, 2, 30, 10))
+    img.paste((200, 30, 30, 128), (10, 12, 38, 18))
+    return img
+
+
+def test_compact_modes_are_lossless(monkeypatch):
+    grey = Image.linear_gradient("L").convert("RGBA")
+    noisy = Image.effect_noise((32, 32), 60).convert("RGB").convert("RGBA")
+    noisy.putalpha(Image.linear_gradient("L").resize((32, 32)))
+    for source, mode in ((grey, "L"), (label_image(), "P"), (noisy, "RGBA"), (Image.new("1", (8, 8), 1), "L")):
+        compact = compact_image(source)
+        assert compact.mode == mode
+        assert compact.convert("RGBA").tobytes() == source.convert("RGBA").tobytes()
+    monkeypatch.setattr(registro_assets, "np", None)  # Caminho sem NumPy
+    compact = compact_image(label_image())
+    assert compact.mode == "P" and compact.convert("RGBA").tobytes() == label_image().tobytes()
+
+
+def test_compact_layers_render_like_rgba_layers():
+    for source in (label_image(), Image.linear_gradient("L").resize((40, 20)).convert("RGBA")):
+        layers = []
+        for img in (compact_image(source), source):
+            layer = ImageLayer(img, "rotulo.png", x=5, y=3, opacity=70)
+            layer.width, layer.height = 60, 30  # Redimensionada: reamostra em RGBA
+            layers.append(layer)
+        compact, rgba = layers
+        assert compact.memory_usage()[0] < rgba.memory_usage()[0] == compact.memory_usage()[1]
+        for scale in (1.0, 0.5):
+            assert render_region([compact], [compact], (0, 0, 70, 40), scale).tobytes() == \
+                render_region([rgba], [rgba], (0, 0, 70, 40), scale).tobytes()
@@ -0,0 +1,62 @@
+from PIL import Image
+
+from pileditorgui import renderizacao
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.renderizacao import export_png_tiled, iter_render_stripes, render_region
+
+SIZE = (160, 120)
+
+
+def build():
+    """Camadas parcialmente fora do canvas, formas com contorno, texto e rotação."""
+    images = [ImageLayer(Image.linear_gradient("L").resize(SIZE), "gradiente.png"),
+              ImageLayer(Image.new("RGBA", (70, 50), (200, 30, 30, 180)), "faixa.png", x=-20, y=60, opacity=80)]
+    turned = Shape(100, 15, 40, 20, fill="#00aa00", outline_width=2)
+    turned.transform = (0.0, 1.0, -1.0, 0.0)
+    shapes = images + [Shape(20, 10, 70, 50, fill="#3366cc", corner_radius=12, outline_width=2),
+                       TextShape(30, 80, "Faixas", font_size=18, fill="#ffffff"), turned]
+    return images, shapes
+
+
+def test_region_matches_the_crop_of_the_full_render():
+    images, shapes = build()
+    full = render_region(images, shapes, (0, 0) + SIZE)
+    for region in ((0, 0, 37, 29), (25, 50, 160, 77), (90, 0, 160, 120), (10, 100, 11, 101)):
+        assert render_region(images, shapes, region).tobytes() == full.crop(region).tobytes()
+
+
+def test_stripes_that_do_not_divide_the_height_rebuild_the_image():
+    images, shapes = build()
+    stripes = list(iter_render_stripes(images, shapes, SIZE, stripe_height=37))
+    assert [stripe.height for stripe in stripes] == [37, 37, 37, 9]
+    assert b"".join(stripe.tobytes() for stripe in stripes) == render_region(images, shapes, (0, 0) + SIZE).tobytes()
+
+
+def test_tiled_export_allocates_only_stripe_sized_images(tmp_path, monkeypatch):
+    images, shapes = build()
+    expected = render_region(images, shapes, (0, 0) + SIZE).tobytes()
+    heights = []
+    new = renderizacao.Image.new
+
+    def tracked_new(mode, size, *args, **kwargs):
+        heights.append(size[1])
+        return new(mode, size, *args, **kwargs)
+
+    monkeypatch.setattr(renderizacao.Image, "new", tracked_new)
+    path = tmp_path / "cena.png"
+    export_png_tiled(images, shapes, SIZE, str(path), stripe_height=16)
+    monkeypatch.undo()
+    assert heights and max(heights) <= 16
+    with Image.open(path) as saved:
+        assert saved.size == SIZE
+        assert saved.tobytes() == expected
+
+
+def test_tiled_png_export_with_filter_and_verification(tmp_path):
+    images = [ImageLayer(Image.radial_gradient("L").convert("RGBA"), "radial.png")]
+    shapes = images + [Shape(30, 20, 100, 60, fill="#ff8800", opacity=70)]
+    for png_filter in ("none", "sub", "up"):
+        path = tmp_path / f"{png_filter}.png"
+        export_png_tiled(images, shapes, (256, 256), str(path), stripe_height=100, png_filter=png_filter, verify=True)
+        with Image.open(path) as saved:
+            assert saved.tobytes() == render_region(images, shapes, (0, 0, 256, 256)).tobytes()
@@ -0,0 +1,33 @@
+from PIL import Image, ImageDraw
+
+from pileditorgui.editor import Shape
+from pileditorgui.exportacao import unsupported_effects
+from pileditorgui.transformacao import compose, normalized, rotation
+
+
+def _render(shape):
+    image = Image.new("RGBA", (60, 60), (255, 0, 0, 255))
+    shape.draw(image, ImageDraw.Draw(image))
+    return image
+
+
+def test_full_turn_collapses_to_identity():
+    assert normalized(compose(rotation(90), rotation(270))) is None
+    assert normalized(rotation(30)) is not None
+
+
+def test_translucent_shape_composites_over_the_target():
+    plain = Shape(10, 10, 30, 30, fill="#0000ff", opacity=50, outline_width=0)
+    turned = Shape(10, 10, 30, 30, fill="#0000ff", opacity=50, outline_width=0)
+    turned.transform = rotation(90)
+    for image in (_render(plain), _render(turned)):
+        red, _, blue, alpha = image.getpixel((25, 25))
+        assert alpha == 255 and red > 0 and blue > 0
+
+
+def test_export_lists_dropped_effects():
+    shape = Shape(0, 0, 10, 10)
+    assert unsupported_effects([], [shape]) == []
+    shape.transform = rotation(15)
+    shape.clip = True
+    assert len(unsupported_effects([], [shape])) == 2
@@ -0,0 +1,33 @@
+from PIL import Image
+
+from pileditorgui.cache_pixels import PixelCache
+from pileditorgui.editor import ImageLayer
+from pileditorgui.exportacao import generate_lua_dx
+from pileditorgui.visualizador import ImageViewer
+
+
+def _viewer(tmp_path):
+    """Visualizador sem janela; as imagens exibidas ficam em `shown`."""
+    viewer = ImageViewer.__new__(ImageViewer)
+    viewer.pixel_cache = PixelCache(str(tmp_path / "cache"))
+    viewer.shown = []
+    viewer.display_image = viewer.shown.append
+    return viewer
+
+
+def test_lua_dx_export_reads_back_in_the_viewer(tmp_path, monkeypatch):
+    (tmp_path / "img").mkdir()
+    Image.new("RGBA", (20, 10), (255, 0, 0, 255)).save(tmp_path / "img" / "it's.png")
+    Image.new("RGBA", (10, 10), (0, 0, 255, 255)).save(tmp_path / "img" / "azul.png")
+    layers = [ImageLayer(Image.open(tmp_path / "img" / "it's.png"), str(tmp_path / "img" / "it's.png"), x=-5, y=2),
+              ImageLayer(Image.open(tmp_path / "img" / "azul.png"), str(tmp_path / "img" / "azul.png"), x=20, y=0,
+                         opacity=50)]
+    code = generate_lua_dx(layers, [], 40, 20)
+    monkeypatch.chdir(tmp_path)
+    viewer = _viewer(tmp_path)
+    viewer.handle_lua(code)
+    image = viewer.shown[0]
+    assert image.size == (40, 20)
+    assert image.getpixel((0, 5)) == (255, 0, 0, 255)  # Camada em x negativo
+    assert image.getpixel((25, 5))[2] == 255 and image.getpixel((25, 5))[3] in (127, 128)
+    assert image.getpixel((0, 0))[3] == 0
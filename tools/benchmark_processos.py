@@ -0,0 +1,54 @@
+# PIL-EditorGUI - Benchmark da composição em vários processos
+# Mede composicao_processos.render_parallel com 1, 2, 4... processos sobre
+# um cartão de exemplo ampliado e mostra o ganho em relação à composição na
+# thread principal (renderizacao.render_region). Rode da raiz do projeto com
+# o pacote instalado (pip install -e .):
+#
+#     python tools/benchmark_processos.py [escala do cartão] [máximo de processos]
+
+from PIL import Image
+import os
+import sys
+import time
+
+from pileditorgui.cena import SceneDocument
+from pileditorgui.composicao_processos import render_parallel
+from pileditorgui.editor import ImageLayer, Shape, TextShape
+from pileditorgui.renderizacao import render_region
+
+
+def build_scene(factor):
+    """Cartão de exemplo (img/) ampliado `factor` vezes, com formas e textos por cima."""
+    document = SceneDocument()
+    background = Image.open("img/fundo.png")
+    width, height = background.width * factor, background.height * factor
+    document.add(ImageLayer(background, "img/fundo.png", x=0, y=0))
+    document.edit(document.shapes[0]).resize(width, height)
+    for i, name in enumerate(sorted(os.listdir("img"))):
+        layer = ImageLayer(Image.open(os.path.join("img", name)), f"img/{name}",
+                           x=(i * 397) % max(1, width - 400), y=(i * 251) % max(1, height - 300), opacity=90)
+        document.add(layer)
+    for i in range(200):
+        document.add(Shape((i * 53) % width, (i * 97) % height, 120, 40, fill="#336699", opacity=70))
+        document.add(TextShape((i * 71) % width, (i * 37) % height, f"Campo {i}", font_size=24))
+    return document.snapshot(), (width, height)
+
+
+def benchmark(factor=3, max_workers=None):
+    scene, size = build_scene(factor)
+    print(f"Cena {size[0]}x{size[1]}, {len(scene.shapes)} itens")
+    start = time.perf_counter()
+    render_region(scene.images, scene.shapes, (0, 0) + size)
+    single = time.perf_counter() - start
+    print(f"{'render_region':>16}: {single:7.2f} s")
+    workers = 1
+    while workers <= (max_workers or os.cpu_count() or 1):
+        start = time.perf_counter()
+        render_parallel(scene.images, scene.shapes, size, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{f'{workers} processo(s)':>16}: {elapsed:7.2f} s  ({single / elapsed:5.2f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))